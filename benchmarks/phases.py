@@ -0,0 +1,196 @@
+"""
+Benchmark of `rut`'s phases on a synthetic project (see synthetic.py).
+
+Measures, in fresh processes, the total time of `python -m unittest` and of
+`rut` (with and without the import graph), and inside rut: discovery, import
+graph build, `_filter_modified`, and the per-test overhead of reporting
+(`RichTestRunner` over a plain `unittest.TestResult`, without the cost of
+output capture) and of output capture.
+
+    python benchmarks/phases.py --modules 200 --tests 20
+    python benchmarks/phases.py --save   # append to benchmarks/results.jsonl
+
+With `--save`, results are appended as a JSON line, with the commit and
+Python version. They are compared with the last saved result for the same
+parameters.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import synthetic
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(ROOT, 'benchmarks', 'results.jsonl')
+REPEATS = 5
+
+
+def measure_phases():
+    """Time rut's phases in this process (cwd: the synthetic project).
+
+    Return {phase: seconds, or microseconds per test for *_us}.
+    """
+    from io import StringIO
+
+    from rich.console import Console
+
+    from rutlib.output import RichTestResult, RichTestRunner
+    from rutlib.runner import RutRunner
+
+    results = {}
+    runner = RutRunner('tests', None, False, False, [], alpha=True, source_dirs=['src', 'tests'])
+    start = time.perf_counter()
+    suite = runner.load_tests()
+    results['discovery'] = time.perf_counter() - start
+
+    modules = {test.__module__ for test in suite}
+    start = time.perf_counter()
+    runner._get_topological_order(modules)
+    results['graph'] = time.perf_counter() - start
+
+    # Worst case: a module imported by everything was modified.
+    modified = {runner.module_filepaths['synth.mod_0000']}
+    start = time.perf_counter()
+    runner._filter_modified(suite, modified)
+    results['filter_modified'] = time.perf_counter() - start
+
+    def run(result_runner):
+        tests = unittest.TestSuite(list(suite))
+        start = time.perf_counter()
+        result_runner(tests)
+        return (time.perf_counter() - start) / tests.countTestCases() * 1e6
+
+    def rich(tests):
+        # As in normal runs: output captured, progress rendered off-thread.
+        rich_runner = RichTestRunner(buffer=True)
+        rich_runner.console.file.close()
+        rich_runner.console = Console(file=StringIO(), width=120, force_terminal=True)
+        rich_runner.run(tests)
+
+    def capture(tests):
+        # Capture around each test (sys.stdout/sys.stderr buffers and file
+        # descriptors), timed on its own. Without it (-s), RichTestRunner
+        # renders progress synchronously and would not compare.
+        result = RichTestResult(Console(file=StringIO()), buffer=True)
+        result.buffer = True
+        for _ in range(tests.countTestCases()):
+            result._setupStdout()
+            result._restoreStdout()
+        result._close_capture()
+
+    # Interleaved repeats, keeping the best: the cost of capture is a few
+    # microseconds, below the noise of a single run.
+    run(rich)  # warm-up: lazy imports, caches
+    timings = {'plain': [], 'rich': [], 'capture': []}
+    for _ in range(REPEATS):
+        timings['plain'].append(run(lambda tests: tests.run(unittest.TestResult())))
+        timings['rich'].append(run(rich))
+        timings['capture'].append(run(capture))
+    plain, rich_us, capture_us = (min(timings[name]) for name in ('plain', 'rich', 'capture'))
+    results['reporting_us'] = rich_us - plain - capture_us
+    results['capture_us'] = capture_us
+    return results
+
+
+def wall_time(cmd, cwd, env, runs):
+    times = []
+    for _ in range(runs):
+        subprocess.run(['rm', '-rf', os.path.join(cwd, '.rut_cache')], check=True)
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=cwd, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def benchmark(project, runs):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYTHONPATH=os.pathsep.join(
+        [os.path.join(project, 'src'), os.path.join(ROOT, 'src'), os.path.join(ROOT, 'benchmarks')]))
+    rut = [sys.executable, '-m', 'rutlib', '--no-live']
+    results = {
+        'unittest': wall_time([sys.executable, '-m', 'unittest', 'discover', '-s', 'tests', '-t', '.'],
+                              project, env, runs),
+        'rut': wall_time(rut, project, env, runs),
+        'rut_alpha': wall_time(rut + ['-a'], project, env, runs),
+    }
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', 'import json, phases; print(json.dumps(phases.measure_phases()))'],
+                             cwd=project, env=env, check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(out.splitlines()[-1]))
+    for phase in samples[0]:
+        results[phase] = statistics.median(sample[phase] for sample in samples)
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _previous(record):
+    if not os.path.exists(RESULTS_FILE):
+        return None
+    previous = None
+    with open(RESULTS_FILE) as f:
+        for line in f:
+            saved = json.loads(line)
+            if saved['params'] == record['params'] and saved['python'] == record['python']:
+                previous = saved
+    return previous
+
+
+def _format(phase, value):
+    if phase.endswith('_us'):
+        return f"{value:9.2f} us/test"
+    return f"{value * 1000:9.1f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    synthetic.add_arguments(parser)
+    parser.add_argument('--runs', type=int, default=3, help='Runs per measurement (default: 3).')
+    parser.add_argument('--save', action='store_true', help=f'Append results to {RESULTS_FILE}.')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        project = synthetic.generate(os.path.join(tmpdir, 'project'), **synthetic.params(args))
+        results = benchmark(project, args.runs)
+
+    record = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'params': synthetic.params(args),
+        'results': results,
+    }
+    previous = _previous(record)
+    n_tests = args.modules * args.tests
+    print(f"{args.modules} modules x {args.tests} tests ({n_tests} tests), python {record['python']}")
+    for phase, value in results.items():
+        line = f"  {phase + ':':<17}{_format(phase, value)}"
+        if phase.startswith('rut'):
+            line += f"  ({value / results['unittest']:.2f}x unittest)"
+        if previous and phase in previous['results'] and previous['results'][phase]:
+            change = (value / previous['results'][phase] - 1) * 100
+            line += f"  [{change:+.0f}% vs {previous['commit']}]"
+        print(line)
+    if args.save:
+        with open(RESULTS_FILE, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Per-test reporting overhead of `RichTestResult`.
+
+Runs a suite of empty tests through a plain `unittest.TestResult` and through
+`RichTestResult` (synchronous and with the background `ProgressRenderer`), and
+prints the cost per test in microseconds. Output goes to a real file so that
+terminal writes are part of the measurement.
+
+    python benchmarks/reporting.py --tests 20000
+"""
+
+import argparse
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+
+class _Empty(unittest.TestCase):
+    def test_empty(self):
+        pass
+
+
+def run_suite(result, n_tests):
+    """Run `n_tests` empty tests. The time includes rendering what the renderer still has queued."""
+    suite = unittest.TestSuite(_Empty('test_empty') for _ in range(n_tests))
+    start = time.perf_counter()
+    suite.run(result)
+    renderer = getattr(result, '_renderer', None)
+    if renderer:
+        renderer.stop()
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    from rich.console import Console
+
+    from rutlib.output import ProgressRenderer, RichTestResult
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tests', type=int, default=20000, help='Number of tests (default: 20000).')
+    parser.add_argument('--output', default=os.devnull,
+                        help='File progress is written to (default: os.devnull). '
+                             'Use /dev/tty to include real terminal cost.')
+    args = parser.parse_args(argv)
+
+    baseline = run_suite(unittest.TestResult(), args.tests)
+    print(f"unittest.TestResult:          {baseline / args.tests * 1e6:7.2f} us/test")
+
+    with open(args.output, 'w') as out:
+        console = Console(file=out, width=120, force_terminal=True)
+        result = RichTestResult(console, buffer=False)
+        sync = run_suite(result, args.tests)
+
+        result = RichTestResult(console, buffer=False)
+        result._renderer = ProgressRenderer(console)
+        result._renderer.start()
+        threaded = run_suite(result, args.tests)
+
+    for name, elapsed in (('synchronous', sync), ('ProgressRenderer', threaded)):
+        overhead = (elapsed - baseline) / args.tests * 1e6
+        print(f"RichTestResult {name + ':':<16} {elapsed / args.tests * 1e6:7.2f} us/test "
+              f"(+{overhead:.2f} us reporting overhead)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Startup-time benchmark for the `rut` entry point.
+
+Measures wall time of fresh `rut` processes and compares it to a bare
+interpreter start. Exits with status 1 when the overhead of any case
+exceeds its budget, so it can be used as a regression check:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --version-budget 40
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE = os.path.join('tests', 'samples', 'discovery', 'sample_one.py')
+
+
+def measure(cmd, runs, env):
+    """Return median wall time (seconds) of running `cmd` `runs` times."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='Runs per case (default: 10).')
+    parser.add_argument('--version-budget', type=float, default=50,
+                        help='Max overhead in ms of `rut --version` (default: 50).')
+    parser.add_argument('--list-budget', type=float, default=250,
+                        help='Max overhead in ms of listing a single test file (default: 250).')
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, PYTHONPATH=os.path.join(ROOT, 'src'), PYTHONDONTWRITEBYTECODE='1')
+    rut = [sys.executable, '-m', 'rutlib']
+    baseline = measure([sys.executable, '-c', 'pass'], args.runs, env)
+    cases = [
+        ('rut --version', rut + ['--version'], args.version_budget),
+        (f'rut --dry-run -a {SAMPLE}', rut + ['--dry-run', '-a', SAMPLE], args.list_budget),
+    ]
+
+    print(f"python startup: {baseline * 1000:7.1f} ms")
+    failed = False
+    for name, cmd, budget in cases:
+        overhead = (measure(cmd, args.runs, env) - baseline) * 1000
+        status = 'ok' if overhead <= budget else 'OVER BUDGET'
+        failed = failed or overhead > budget
+        print(f"{name}: +{overhead:7.1f} ms (budget {budget:.0f} ms) {status}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
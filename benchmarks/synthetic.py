@@ -0,0 +1,87 @@
+"""
+Synthetic project generator for benchmarks.
+
+Creates a project with a `src/synth` package of source modules and a
+`tests` directory with one test module per source module:
+
+- each source module imports `fan_out` random lower numbered modules
+  (so the import graph is a DAG), plus every one of the `hubs` first
+  modules (fan-in: modules imported by everything);
+- each test module imports its source module and has `tests` tests, each
+  taking `duration` seconds.
+
+    python benchmarks/synthetic.py /tmp/synth --modules 200 --tests 20
+"""
+
+import argparse
+import os
+import random
+import shutil
+import textwrap
+
+
+def generate(root, modules=100, fan_out=3, hubs=2, tests=10, duration=0.0, seed=0):
+    """Write the project to `root` (replacing it). Return `root`."""
+    rng = random.Random(seed)
+    shutil.rmtree(root, ignore_errors=True)
+    src = os.path.join(root, 'src', 'synth')
+    test_dir = os.path.join(root, 'tests')
+    os.makedirs(src)
+    os.makedirs(test_dir)
+    with open(os.path.join(root, 'pyproject.toml'), 'w') as f:
+        f.write('[tool.rut]\nsource_dirs = ["src", "tests"]\n')
+    open(os.path.join(src, '__init__.py'), 'w').close()
+    open(os.path.join(test_dir, '__init__.py'), 'w').close()
+
+    for i in range(modules):
+        deps = set(range(min(hubs, i)))
+        if i:
+            deps.update(rng.sample(range(i), min(fan_out, i)))
+        imports = ''.join(f'from synth import mod_{d:04}\n' for d in sorted(deps))
+        with open(os.path.join(src, f'mod_{i:04}.py'), 'w') as f:
+            f.write(f'{imports}\n\ndef value():\n    return {i}\n')
+
+        body = f'time.sleep({duration})' if duration else 'pass'
+        methods = ''.join(
+            f'\n    def test_{t:03}(self):\n        {body}\n        self.assertEqual(mod.value(), {i})\n'
+            for t in range(tests))
+        with open(os.path.join(test_dir, f'test_mod_{i:04}.py'), 'w') as f:
+            f.write(textwrap.dedent(f'''\
+                import time
+                import unittest
+
+                from synth import mod_{i:04} as mod
+
+
+                class TestMod{i:04}(unittest.TestCase):'''))
+            f.write(methods)
+    return root
+
+
+def add_arguments(parser):
+    parser.add_argument('--modules', type=int, default=100, help='Number of source/test modules (default: 100).')
+    parser.add_argument('--fan-out', type=int, default=3, help='Random imports per source module (default: 3).')
+    parser.add_argument('--hubs', type=int, default=2,
+                        help='Modules imported by every other module (default: 2).')
+    parser.add_argument('--tests', type=int, default=10, help='Tests per module (default: 10).')
+    parser.add_argument('--duration', type=float, default=0.0, help='Seconds per test (default: 0).')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0).')
+
+
+def params(args):
+    """Generator parameters from parsed arguments."""
+    return {'modules': args.modules, 'fan_out': args.fan_out, 'hubs': args.hubs,
+            'tests': args.tests, 'duration': args.duration, 'seed': args.seed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root', help='Directory to create (replaced if it exists).')
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    generate(args.root, **params(args))
+    print(f"generated {args.modules} modules x {args.tests} tests in {args.root}")
+
+
+if __name__ == '__main__':
+    main()
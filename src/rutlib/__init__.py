@@ -1,6 +1,15 @@
-__all__ = ["RutCLI", "RutRunner", "WarningCollector", "RutError", "InvalidAsyncTestError"]
+__all__ = ["InvalidAsyncTestError", "RutCLI", "RutError", "RutRunner", "WarningCollector"]
 __version__ = "0.4.0"
 __license__ = "MIT"
 
-from .cli import RutCLI
-from .runner import RutRunner, WarningCollector, RutError, InvalidAsyncTestError
+
+def __getattr__(name):
+    # Public names are resolved lazily so that `rut --version` does not pay
+    # for importing the runner (and its dependencies).
+    if name == "RutCLI":
+        from .cli import RutCLI
+        return RutCLI
+    if name in __all__:
+        from . import runner
+        return getattr(runner, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,7 @@
 import os
 import sys
-import shutil
-import coverage
-from rich import print
 from . import __version__
-from .cache import update_cache
 from .cli import RutCLI
-from .output import RichTestRunner
-from .runner import RutRunner
 
 
 def should_update_cache(result, keyword) -> bool:
@@ -21,6 +15,14 @@ def should_update_cache(result, keyword) -> bool:
     return result.wasSuccessful() and result.testsRun > 0 and not keyword
 
 
+def should_save_durations(result, keyword) -> bool:
+    """Per-module durations are saved only when every selected module ran in full.
+
+    Partial runs (-k filter, stopped by -x) would record misleading durations.
+    """
+    return hasattr(result, 'module_durations') and not keyword and not result.shouldStop
+
+
 def find_package_root():
     """Walk up from cwd while __init__.py exists to find the package root parent."""
     path = os.getcwd()
@@ -35,12 +37,25 @@ def main():
     cli = RutCLI()
     cli.parse_args()
     cli.setup()
-    print(f"[dim]rut {__version__}: test_dir={cli.test_dir}  source_dirs={', '.join(cli.source_dirs)}[/dim]")
+    # Heavy imports (rich, coverage, import_deps) are deferred to the code
+    # paths that need them. See benchmarks/startup.py.
+    banner = f"rut {__version__}: test_dir={cli.test_dir}  source_dirs={', '.join(cli.source_dirs)}"
+    if cli.args.no_color:
+        print(banner)
+    else:
+        from rich import print as rich_print
+        rich_print(f"[dim]{banner}[/dim]")
 
+    cov = None
     if cli.args.cov:
-        cov = coverage.Coverage(source=cli.source_dirs)
+        from .cov import CoverageRun
+        # Lines per test module are stored only by runs of all the selected tests
+        cov = CoverageRun(cli.source_dirs, per_module=not (cli.args.keyword or cli.args.ids))
         cov.start()
 
+    from .capture import DEFAULT_CAPTURE_LIMIT
+    from .runner import MAX_WARNINGS, RutRunner
+
     runner = RutRunner(
         test_dir=cli.test_dir,
         test_path=cli.args.test_path,
@@ -48,13 +63,38 @@ def main():
         failfast=cli.args.exitfirst,
         capture=cli.args.capture,
         warning_filters=cli.warning_filters(cli.config.get("warning_filters", [])),
+        warning_categories=cli.warning_categories(cli.config.get("collect_warnings", ["RuntimeWarning"])),
+        max_warnings=cli.config.get("max_warnings", MAX_WARNINGS),
         alpha=cli.args.alpha,
+        failure_first=cli.args.failure_first,
+        short_circuit=cli.args.short_circuit,
+        reruns=cli.args.reruns,
+        rerun_fresh=cli.args.rerun_fresh,
+        quarantine=cli.config.get("quarantine", []),
         source_dirs=cli.source_dirs,
         verbose=cli.args.verbose,
         debug=cli.args.debug,
         changed=cli.args.changed,
+        live=not cli.args.no_live,
+        capture_limit=cli.config.get("capture_limit", DEFAULT_CAPTURE_LIMIT),
+        junit_xml=cli.args.junit_xml,
+        report_jsonl=cli.args.report_jsonl,
+        durations=cli.args.durations,
+        max_failures_per_group=cli.config.get("max_failures_per_group"),
+        evict_modules=cli.config.get("evict_modules", False),
+        leaks=cli.args.leaks,
+        leak_threshold_kb=cli.config.get("leak_threshold_kb"),
+        profile=cli.args.profile,
+        sample_profile=cli.args.sample_profile,
+        timeout=cli.config.get("timeout"),
+        module_timeout=cli.config.get("module_timeout"),
+        memory_limit_mb=cli.config.get("memory_limit_mb"),
+        bench=cli.args.bench,
+        bench_rounds=cli.config.get("bench_rounds"),
+        bench_tolerance=cli.config.get("bench_tolerance"),
+        coverage=cov,
     )
-    suite = runner.load_tests()
+    suite = runner.load_ids(cli.args.ids) if cli.args.ids else runner.load_tests()
 
     if cli.args.dry_run:
         print(f"Would run {suite.countTestCases()} tests:")
@@ -62,23 +102,70 @@ def main():
             print(f"  {test.id()}")
         sys.exit(0)
 
-    runner_class = RichTestRunner if not cli.args.no_color else None
+    if cli.args.bisect:
+        from .isolated import command
+        from .runner import RutError
+        try:
+            culprits = runner.bisect(suite, cli.args.bisect)
+        except RutError as exc:
+            print(f"Bisect: {exc}")
+            sys.exit(1)
+        print(f"{cli.args.bisect} fails after {len(culprits)} tests:")
+        for test_id in culprits:
+            print(f"  {test_id}")
+        print(f"Reproduce with:\n  {command(culprits + [cli.args.bisect], cli.args.test_path)}")
+        sys.exit(0)
+
+    if cli.args.no_color:
+        runner_class = None
+    else:
+        from .output import RichTestRunner
+        runner_class = RichTestRunner
     result = runner.run_tests(suite, runner_class=runner_class)
 
-    if cli.args.cov:
-        cov.stop()
-        cov.save()
-        cov.report(show_missing=True)
+    if cov:
+        modules = cov.modules_run | set(runner.uptodate_modules)
+        cov.finish(runner.dependency_hashes(modules), runner.uptodate_modules,
+                   store=not (cli.args.keyword or cli.args.ids) and not result.shouldStop)
+        print(cov.overhead_message(getattr(result, 'module_durations', {})))
 
-    if result.wasSuccessful():
-        if should_update_cache(result, cli.args.keyword):
-            update_cache(cli.source_dirs)
-        sys.exit(0)
-    else:
-        sys.exit(1)
+    if cli.args.bench or cli.args.ids:
+        # Benchmark runs and runs of given tests (e.g. started by --rerun-fresh or --bisect)
+        # don't update durations, history or the cache of tested files.
+        sys.exit(0 if result.wasSuccessful() else 1)
+
+    from .cache import save_durations, save_fixture_costs, update_cache
+    # Durations under coverage are not representative.
+    full_run = should_save_durations(result, cli.args.keyword) and not cov
+    if full_run:
+        save_durations(result.module_durations)
+    if not cov:
+        save_fixture_costs(runner.fixture_timer.fixture_costs())
+
+    slowdowns = []
+    if hasattr(result, 'test_durations') and not cov:
+        from . import history
+        slowdowns = history.record_durations(
+            result.test_durations,
+            result.module_durations if full_run else {},
+            threshold=cli.config.get("slowdown_threshold", history.DEFAULT_THRESHOLD),
+            min_seconds=cli.config.get("slowdown_min_seconds", history.DEFAULT_MIN_SECONDS),
+        )
+        if slowdowns:
+            from rich import print as rich_print
+            rich_print(history.slowdowns_table(slowdowns))
+
+    from .ordering import failed_names, record_run
+    success = result.wasSuccessful() and not (slowdowns and cli.args.fail_on_slowdown)
+    changed_files = set()
+    if success and should_update_cache(result, cli.args.keyword):
+        changed_files = update_cache(cli.source_dirs)
+    record_run(failed_names(result), changed_files)
+    sys.exit(0 if success else 1)
 
 
 if __name__ == "__main__":
+    import shutil
     if 'PYTHONBREAKPOINT' not in os.environ and shutil.which('ipdb'):
         os.environ['PYTHONBREAKPOINT'] = 'ipdb.set_trace'
     main()
\ No newline at end of file
@@ -0,0 +1,156 @@
+"""
+Microbenchmarks (`--bench`).
+
+Methods named `bench_*` of TestCase classes are benchmarks. They are not run
+by default: `--bench` runs them instead of the tests, with their class and
+module fixtures, and setUp/tearDown around each benchmark (not each call).
+
+A benchmark is calibrated first: its number of loops is doubled until a
+round takes at least `MIN_ROUND_TIME`. After `WARMUP_ROUNDS`, `rounds`
+rounds are timed with the garbage collector disabled (a collection runs
+before each round), giving the min, median and standard deviation of the
+time per call.
+
+Baselines are stored in `.rut_cache/benchmarks.json`: the first result of
+each benchmark, or every result with `--bench=save`. A benchmark whose median
+is slower than its baseline by more than `tolerance` fails.
+"""
+
+import contextlib
+import gc
+import inspect
+import statistics
+import sys
+import time
+import unittest
+from typing import NamedTuple
+
+from . import cache
+from .internals import patched
+
+PREFIX = 'bench_'
+DEFAULT_ROUNDS = 10
+DEFAULT_TOLERANCE = 0.2
+MIN_ROUND_TIME = 0.05  # seconds
+MAX_LOOPS = 1 << 24
+WARMUP_ROUNDS = 1
+
+
+class Stats(NamedTuple):
+    loops: int
+    rounds: int
+    min: float  # seconds per call
+    median: float
+    stddev: float
+
+
+def _round(fn, loops):
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return time.perf_counter() - start
+
+
+def measure(fn, rounds=DEFAULT_ROUNDS, min_time=MIN_ROUND_TIME):
+    """Time calls to `fn` (see module docstring). Return Stats."""
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        loops = 1
+        while _round(fn, loops) < min_time and loops < MAX_LOOPS:
+            loops *= 2
+        for _ in range(WARMUP_ROUNDS):
+            _round(fn, loops)
+        times = [_round(fn, loops) / loops for _ in range(rounds)]
+    finally:
+        if gc_enabled:
+            gc.enable()
+    stddev = statistics.stdev(times) if len(times) > 1 else 0.0
+    return Stats(loops, rounds, min(times), statistics.median(times), stddev)
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3g} {unit}"
+    return f"{seconds / 1e-9:.3g} ns"
+
+
+class Benchmarker:
+    def __init__(self, save=False, rounds=DEFAULT_ROUNDS, tolerance=DEFAULT_TOLERANCE):
+        self.save = save
+        self.rounds = rounds
+        self.tolerance = tolerance
+        self.results = {}  # benchmark id -> Stats
+        self.baselines = {}  # benchmark id -> Stats._asdict()
+
+    @contextlib.contextmanager
+    def running(self):
+        """Run bench_* methods through `measure` while running the suite."""
+        self.baselines = cache.load_benchmarks()
+        benchmarker = self
+
+        def wrap(original):
+            def _callTestMethod(self, method):
+                if not self._testMethodName.startswith(PREFIX):
+                    return original(self, method)
+                return benchmarker._run(self, method)
+            return _callTestMethod
+
+        test_classes = [unittest.TestCase]
+        async_case = sys.modules.get('unittest.async_case')
+        if async_case:
+            test_classes.append(async_case.IsolatedAsyncioTestCase)
+        try:
+            with patched(*((cls, '_callTestMethod', wrap) for cls in test_classes)):
+                yield
+        finally:
+            self._save()
+
+    def _run(self, test, method):
+        if inspect.iscoroutinefunction(method):
+            raise TypeError(f"{test.id()}: benchmarks can't be coroutines")
+        stats = measure(method, self.rounds, MIN_ROUND_TIME)
+        self.results[test.id()] = stats
+        baseline = self.baselines.get(test.id())
+        if baseline and not self.save:
+            change = stats.median / baseline['median'] - 1
+            if change > self.tolerance:
+                raise test.failureException(
+                    f"median {format_time(stats.median)} is {change:.0%} slower than the baseline"
+                    f" {format_time(baseline['median'])} (tolerance {self.tolerance:.0%})")
+
+    def _save(self):
+        baselines = dict(self.baselines)
+        for bench_id, stats in self.results.items():
+            if self.save or bench_id not in baselines:
+                baselines[bench_id] = stats._asdict()
+        if baselines != self.baselines:
+            cache.save_benchmarks(baselines)
+
+
+def bench_table(benchmarker):
+    from rich.table import Table
+    from rich.text import Text
+    table = Table(title=f"{len(benchmarker.results)} benchmarks (time per call)",
+                  title_justify="left", box=None, pad_edge=False)
+    table.add_column("benchmark", overflow="fold")
+    table.add_column("rounds x loops", justify="right", style="dim")
+    table.add_column("min", justify="right")
+    table.add_column("median", justify="right", style="bold")
+    table.add_column("stddev", justify="right")
+    table.add_column("baseline", justify="right", style="dim")
+    table.add_column("change", justify="right")
+    for bench_id, stats in benchmarker.results.items():
+        baseline = benchmarker.baselines.get(bench_id)
+        if baseline is None:
+            base, change = "", Text("new", style="cyan")
+        else:
+            base = format_time(baseline['median'])
+            ratio = stats.median / baseline['median'] - 1
+            style = "bold red" if ratio > benchmarker.tolerance else "green" if ratio < 0 else ""
+            change = Text(f"{ratio:+.0%}", style=style)
+        table.add_row(Text(bench_id), f"{stats.rounds} x {stats.loops}", format_time(stats.min),
+                      format_time(stats.median), format_time(stats.stddev), base, change)
+    return table
@@ -0,0 +1,83 @@
+"""
+Bisection of order-dependent failures (`--bisect TEST_ID`).
+
+The target test is run in new processes (see isolated.py) after subsets of
+the tests that precede it in the run order (the order of `sort_tests`, or
+of the ordering options). Delta debugging (ddmin) reduces the preceding
+tests to a minimal set that still makes the target fail: removing any one
+of them makes it pass.
+
+Before the search, the target must fail after all the preceding tests and
+pass alone. Runs that don't complete (crash, missing report) count as not
+reproducing the failure. The output of the tests that fail in these runs is
+not saved: the target's saved output is the one of the run investigated.
+"""
+
+import itertools
+
+from . import isolated
+from .runner import RutError
+
+
+def ddmin(items, fails):
+    """Return a 1-minimal sublist of `items` (order kept) for which `fails(sublist)` is true.
+
+    `fails(items)` must be true.
+    """
+    n = 2
+    while len(items) >= 2:
+        bounds = [len(items) * i // n for i in range(n + 1)]
+        chunks = [items[start:end] for start, end in itertools.pairwise(bounds)]
+        reduced = None
+        for chunk in chunks:
+            if fails(chunk):
+                reduced, n = chunk, 2
+                break
+        else:
+            if n > 2:  # with 2 chunks, the complements are the chunks
+                for i in range(n):
+                    complement = [item for j, chunk in enumerate(chunks) if j != i for item in chunk]
+                    if fails(complement):
+                        reduced, n = complement, n - 1
+                        break
+        if reduced is not None:
+            items = reduced
+        elif n >= len(items):
+            break
+        else:
+            n = min(2 * n, len(items))
+    return items
+
+
+def _run(test_ids, test_path):
+    return isolated.run(test_ids, test_path, save_captures=False)
+
+
+def bisect(order, target, test_path=None, run=_run, log=print):
+    """Return the minimal set of the tests preceding `target` in `order` that make it fail.
+
+    `run(test_ids, test_path)` returns the ids of the tests that passed, or None.
+    Raise RutError if the failure doesn't depend on the preceding tests.
+    """
+    if target not in order:
+        raise RutError(f"{target} is not in the selected tests")
+    preceding = order[:order.index(target)]
+    runs = {}
+
+    def fails(tests):
+        key = tuple(tests)
+        if key not in runs:
+            passed = run(list(tests) + [target], test_path)
+            runs[key] = passed is not None and target not in passed
+            log(f"bisect: {len(tests)} preceding tests, target {'fails' if runs[key] else 'passes'}")
+        return runs[key]
+
+    if not preceding:
+        raise RutError(f"{target} runs first, no tests precede it")
+    if not fails(preceding):
+        raise RutError(f"{target} does not fail after the {len(preceding)} tests preceding it")
+    if fails([]):
+        raise RutError(f"{target} fails when run alone")
+    culprits = ddmin(preceding, fails)
+    log(f"bisect: done in {len(runs)} runs")
+    return culprits
@@ -0,0 +1,47 @@
+"""
+Dependency-aware short-circuit (`--short-circuit[=skip|defer]`).
+
+Before a test module starts, it is "blocked" if a test module that already
+failed is a foundation of it: every source module the failing test module
+imports (transitively, test modules excluded) is also imported by the
+blocked one. Its failures would most likely be the same cascade.
+
+Blocked modules are skipped (their tests reported as skipped, their module
+fixtures not run) or deferred: run after all the other modules.
+"""
+
+from .internals import fixture_error
+
+
+def _failed_module(test):
+    test = getattr(test, 'test_case', test)  # sub-test
+    error = fixture_error(test.id())
+    if error is None:
+        return test.__module__
+    fixture, name = error
+    return name if fixture.endswith('Module') else name.rpartition('.')[0]
+
+
+class Blocker:
+    def __init__(self, dependencies, mode='skip'):
+        # test module -> source modules it imports
+        self.dependencies = dependencies
+        self.mode = mode  # "skip" or "defer"
+        self.blocked = {}  # blocked test module -> failing test module
+
+    def blocked_by(self, module, result):
+        """Return the failing test module blocking `module`, or None."""
+        deps = self.dependencies.get(module, set())
+        failing = dict.fromkeys(_failed_module(test) for test, _ in result.errors + result.failures)
+        for failed in failing:
+            foundation = self.dependencies.get(failed)
+            if failed != module and foundation and foundation <= deps:
+                self.blocked[module] = failed
+                return failed
+        return None
+
+    def summary(self):
+        action = "skipped" if self.mode == 'skip' else "deferred"
+        lines = [f"{len(self.blocked)} modules {action}, blocked by failing foundation modules:"]
+        lines += [f"  {module} (blocked by {failed})" for module, failed in self.blocked.items()]
+        return "\n".join(lines)
@@ -3,15 +3,38 @@ File hash caching for incremental testing.
 
 Stores SHA256 hashes of source files after successful test runs.
 On subsequent runs with --changed, compares current hashes to detect modifications.
+
+Also stores per-module test durations, used to estimate the remaining time of a run,
+module and class fixture costs (see timing.py), failures and file changes (see
+ordering.py), flake statistics (see reruns.py), the duration history of tests and
+modules (see history.py), benchmark baselines (see bench.py), the lines covered by
+each test module (see cov.py), and the full captured output of failing tests whose
+output was truncated.
 """
 
 import hashlib
 import json
+import os
+import shutil
 from pathlib import Path
 
 
 CACHE_DIR = Path('.rut_cache')
 CACHE_FILE = CACHE_DIR / 'file_hashes.json'
+DURATIONS_FILE = CACHE_DIR / 'durations.json'
+FIXTURES_FILE = CACHE_DIR / 'fixtures.json'
+FAILURES_FILE = CACHE_DIR / 'failures.json'
+FLAKES_FILE = CACHE_DIR / 'flakes.json'
+HISTORY_FILE = CACHE_DIR / 'history.json'
+# Set in the processes started by a run to run some of its tests (isolated.py):
+# they keep the captures saved by that run, or save theirs elsewhere.
+KEEP_CAPTURES_ENV = 'RUT_KEEP_CAPTURES'
+CAPTURES_DIR_ENV = 'RUT_CAPTURES_DIR'
+CAPTURES_DIR = Path(os.environ.get(CAPTURES_DIR_ENV) or CACHE_DIR / 'captures')
+PROFILES_DIR = CACHE_DIR / 'profiles'
+SAMPLES_DIR = CACHE_DIR / 'samples'
+BENCHMARKS_FILE = CACHE_DIR / 'benchmarks.json'
+COVERAGE_FILE = CACHE_DIR / 'coverage.json'
 
 
 def compute_hash(file_path: Path) -> str:
@@ -50,8 +73,12 @@ def get_modified_files(source_dirs: list[str]) -> set[str]:
     return modified
 
 
-def update_cache(source_dirs: list[str]):
-    """Update cache with current file hashes (call after successful run)."""
+def update_cache(source_dirs: list[str]) -> set[str]:
+    """Update cache with current file hashes (call after successful run).
+
+    Return the files changed since the previous update (none on the first one).
+    """
+    cached = load_cache()
     hashes = {}
     for source_dir in source_dirs:
         source_path = Path(source_dir)
@@ -60,3 +87,101 @@ def update_cache(source_dirs: list[str]):
         for py_file in source_path.rglob('*.py'):
             hashes[str(py_file)] = compute_hash(py_file)
     save_cache(hashes)
+    if not cached:
+        return set()
+    return {path for path, file_hash in hashes.items() if cached.get(path) != file_hash}
+
+
+def load_durations() -> dict[str, float]:
+    """Load per-module test durations (seconds) recorded by previous runs."""
+    if not DURATIONS_FILE.exists():
+        return {}
+    return json.loads(DURATIONS_FILE.read_text())
+
+
+def save_durations(durations: dict[str, float]):
+    """Merge per-module durations of this run into the stored ones."""
+    stored = load_durations()
+    stored.update({module: round(seconds, 4) for module, seconds in durations.items()})
+    CACHE_DIR.mkdir(exist_ok=True)
+    DURATIONS_FILE.write_text(json.dumps(stored, indent=2, sort_keys=True))
+
+
+def load_fixture_costs() -> dict[str, float]:
+    """Load module and class fixture costs (seconds) recorded by previous runs."""
+    if not FIXTURES_FILE.exists():
+        return {}
+    return json.loads(FIXTURES_FILE.read_text())
+
+
+def save_fixture_costs(costs: dict[str, float]):
+    """Merge the fixture costs of this run into the stored ones."""
+    stored = load_fixture_costs()
+    stored.update({name: round(seconds, 4) for name, seconds in costs.items()})
+    CACHE_DIR.mkdir(exist_ok=True)
+    FIXTURES_FILE.write_text(json.dumps(stored, indent=2, sort_keys=True))
+
+
+def load_failures() -> dict:
+    """Load the recorded failures and file changes (see ordering.py)."""
+    if not FAILURES_FILE.exists():
+        return {}
+    return json.loads(FAILURES_FILE.read_text())
+
+
+def save_failures(stats: dict):
+    CACHE_DIR.mkdir(exist_ok=True)
+    FAILURES_FILE.write_text(json.dumps(stats, separators=(',', ':'), sort_keys=True))
+
+
+def load_flakes() -> dict:
+    """Load the flake statistics of tests (see reruns.py)."""
+    if not FLAKES_FILE.exists():
+        return {}
+    return json.loads(FLAKES_FILE.read_text())
+
+
+def save_flakes(stats: dict):
+    CACHE_DIR.mkdir(exist_ok=True)
+    FLAKES_FILE.write_text(json.dumps(stats, indent=1, sort_keys=True))
+
+
+def load_history() -> dict:
+    """Load the duration history (see history.py)."""
+    if not HISTORY_FILE.exists():
+        return {}
+    return json.loads(HISTORY_FILE.read_text())
+
+
+def save_history(history: dict):
+    CACHE_DIR.mkdir(exist_ok=True)
+    HISTORY_FILE.write_text(json.dumps(history, separators=(',', ':'), sort_keys=True))
+
+
+def load_benchmarks() -> dict:
+    """Load the benchmark baselines (see bench.py)."""
+    if not BENCHMARKS_FILE.exists():
+        return {}
+    return json.loads(BENCHMARKS_FILE.read_text())
+
+
+def save_benchmarks(baselines: dict):
+    CACHE_DIR.mkdir(exist_ok=True)
+    BENCHMARKS_FILE.write_text(json.dumps(baselines, indent=1, sort_keys=True))
+
+
+def load_coverage() -> dict:
+    """Load the lines covered by each test module (see cov.py)."""
+    if not COVERAGE_FILE.exists():
+        return {}
+    return json.loads(COVERAGE_FILE.read_text())
+
+
+def save_coverage(coverage: dict):
+    CACHE_DIR.mkdir(exist_ok=True)
+    COVERAGE_FILE.write_text(json.dumps(coverage, separators=(',', ':')))
+
+
+def clear_captures():
+    """Remove captured output saved by a previous run."""
+    shutil.rmtree(CAPTURES_DIR, ignore_errors=True)
@@ -0,0 +1,213 @@
+"""
+Output capture.
+
+unittest's `buffer` only replaces `sys.stdout`/`sys.stderr`. Output written
+directly to file descriptors 1 and 2 (subprocesses, C extensions) is captured
+by `FdCapture`, by redirecting the descriptors to temporary files.
+
+Captured output is bounded: only the head and tail of a stream (`limit`
+characters/bytes each) are shown. The full output of a failing test is saved,
+compressed, to a file whose path is given in the truncation marker.
+"""
+
+import collections
+import gzip
+import io
+import os
+import shutil
+import tempfile
+
+DEFAULT_CAPTURE_LIMIT = 50_000
+
+
+def _truncation_marker(dropped, unit, path):
+    where = f", full output in {path}" if path else ""
+    return f"\n[... {dropped:,} {unit} truncated{where} ...]\n"
+
+
+class BoundedCapture(io.TextIOBase):
+    """In-memory text stream (like StringIO) that keeps only head and tail.
+
+    The first `limit` characters are kept, and the last `limit` ones in a ring
+    buffer of chunks. Once the output no longer fits, everything written is
+    also spilled to an unnamed temporary file, so `save()` can still write out
+    the full output. `limit=0` disables the bound.
+
+    Used to replace unittest's `_stdout_buffer`/`_stderr_buffer`, which rely on
+    `seek(0)`, `truncate()` and `getvalue()`.
+    """
+
+    def __init__(self, limit=DEFAULT_CAPTURE_LIMIT):
+        super().__init__()
+        self.limit = limit
+        self.saved_path = None
+        self._spill = None
+        self._reset()
+
+    def _reset(self):
+        self._head = []
+        self._head_len = 0
+        self._tail = collections.deque()
+        self._tail_len = 0
+        self._total = 0
+        self.saved_path = None
+        if self._spill:
+            self._spill.seek(0)
+            self._spill.truncate()
+        self._spilling = False
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        n = len(s)
+        if not self.limit:
+            self._head.append(s)
+            self._head_len += n
+            self._total += n
+            return n
+        if not self._spilling and self._total + n > 2 * self.limit:
+            # Nothing was dropped so far: head and tail hold all the output.
+            if self._spill is None:
+                # Reused by the next tests (see _reset), for the life of the capture
+                self._spill = tempfile.TemporaryFile(  # noqa: SIM115
+                    'w+', encoding='utf-8', errors='replace')
+            self._spill.writelines(self._head)
+            self._spill.writelines(self._tail)
+            self._spilling = True
+        if self._spilling:
+            self._spill.write(s)
+        self._total += n
+        if self._head_len < self.limit:
+            chunk = s[:self.limit - self._head_len]
+            self._head.append(chunk)
+            self._head_len += len(chunk)
+            s = s[len(chunk):]
+            if not s:
+                return n
+        if len(s) >= self.limit:
+            self._tail.clear()
+            s = s[-self.limit:]
+            self._tail_len = 0
+        self._tail.append(s)
+        self._tail_len += len(s)
+        while self._tail_len - len(self._tail[0]) >= self.limit:
+            self._tail_len -= len(self._tail.popleft())
+        return n
+
+    @property
+    def truncated(self):
+        return self._total > self._head_len + self._tail_len
+
+    def getvalue(self):
+        head = ''.join(self._head)
+        if not self.truncated:
+            return head + ''.join(self._tail)
+        # The tail ring buffer may hold slightly more than `limit`.
+        tail = ''.join(self._tail)[-self.limit:]
+        dropped = self._total - len(head) - len(tail)
+        return head + _truncation_marker(dropped, 'characters', self.saved_path) + tail
+
+    def save(self, path):
+        """Write the full output, gzip compressed, to `path` (if truncated)."""
+        if not self.truncated:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._spill.seek(0)
+        with gzip.open(path, 'wt', encoding='utf-8') as out:
+            shutil.copyfileobj(self._spill, out)
+        self._spill.seek(0, io.SEEK_END)
+        self.saved_path = path
+
+    def seek(self, pos, whence=io.SEEK_SET):
+        # unittest only rewinds before truncate(); positions are not supported.
+        return 0
+
+    def truncate(self, size=None):
+        self._reset()
+        return 0
+
+    def close(self):
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+        super().close()
+
+
+class FdCapture:
+    """Redirect file descriptors 1 and 2 to capture files while a test runs.
+
+    The saved descriptors and the capture files are created on the first
+    `start()` and reused for every test: per test only `dup2()` is needed to
+    redirect and restore, and a file is rewound only if something was written
+    to it. Captured output is read only on demand (i.e. when a test fails),
+    and then only its first and last `limit` bytes.
+    """
+
+    def __init__(self, limit=DEFAULT_CAPTURE_LIMIT):
+        self.limit = limit
+        self._saved = None  # (stdout, stderr) descriptors to restore
+        self._files = None  # (stdout, stderr) capture files
+
+    def start(self):
+        if self._files is None:
+            self._saved = (os.dup(1), os.dup(2))
+            self._files = (tempfile.TemporaryFile(buffering=0),
+                           tempfile.TemporaryFile(buffering=0))
+        os.dup2(self._files[0].fileno(), 1)
+        os.dup2(self._files[1].fileno(), 2)
+
+    def stop(self):
+        """Restore the original descriptors and discard captured output."""
+        os.dup2(self._saved[0], 1)
+        os.dup2(self._saved[1], 2)
+        for capture_file in self._files:
+            # Descriptors share the file offset with the capture file,
+            # so a non-zero position means something was written.
+            if capture_file.tell():
+                capture_file.seek(0)
+                capture_file.truncate()
+
+    def read(self, save_prefix=None):
+        """Return (stdout, stderr) captured since `start()`.
+
+        Streams over the limit are truncated. If `save_prefix` is given, their
+        full content is saved to `<save_prefix>.fd-stdout.gz` (resp. stderr).
+        """
+        captured = []
+        for name, capture_file in zip(('stdout', 'stderr'), self._files):
+            save_path = None
+            if save_prefix:
+                save_path = save_prefix.parent / f"{save_prefix.name}.fd-{name}.gz"
+            captured.append(self._read(capture_file, save_path))
+        return tuple(captured)
+
+    def _read(self, capture_file, save_path):
+        size = capture_file.tell()
+        if not size:
+            return ''
+        capture_file.seek(0)
+        if not self.limit or size <= 2 * self.limit:
+            # Reading to the end leaves the shared offset where it was.
+            return capture_file.read(size).decode('utf-8', errors='replace')
+        head = capture_file.read(self.limit)
+        capture_file.seek(size - self.limit)
+        tail = capture_file.read(self.limit)
+        if save_path:
+            save_path.parent.mkdir(parents=True, exist_ok=True)
+            capture_file.seek(0)
+            with gzip.open(save_path, 'wb') as out:
+                shutil.copyfileobj(capture_file, out)
+        capture_file.seek(size)
+        marker = _truncation_marker(size - 2 * self.limit, 'bytes', save_path)
+        return (head.decode('utf-8', errors='replace') + marker
+                + tail.decode('utf-8', errors='replace'))
+
+    def close(self):
+        if self._files is None:
+            return
+        for fd in self._saved:
+            os.close(fd)
+        for capture_file in self._files:
+            capture_file.close()
+        self._saved = self._files = None
@@ -1,21 +1,15 @@
 import argparse
 import builtins
-import importlib.metadata
 import os
-import pathlib
 import sys
-try:
-    import tomllib
-except ModuleNotFoundError:
-    import tomli as tomllib
-from rich.console import Console
+from . import __version__
 
 
 class RutCLI:
     def parse_args(self, argv=None):
         parser = argparse.ArgumentParser(description="RUT")
         parser.add_argument('-V', '--version', action='version',
-                            version=f"rut {importlib.metadata.version('rut')}")
+                            version=f"rut {__version__}")
         parser.add_argument('-k', '--keyword', type=str, help='Only run tests that match.')
         parser.add_argument('-x', '--exitfirst', action='store_true', help='Exit on first failure.')
         parser.add_argument('-s', '--capture', action='store_true', help='Disable all capturing')
@@ -29,8 +23,28 @@ class RutCLI:
             help='Path to test directory or file. Overrides --test-base-dir and config.'
         )
         parser.add_argument('--no-color', action='store_true', help='Disable color output.')
+        parser.add_argument('--no-live', action='store_true',
+                            help='Disable the live status bar (counts, current test, ETA).')
         parser.add_argument('-a', '--alpha', action='store_true',
                             help='Sort tests alphabetically instead of by import dependencies')
+        parser.add_argument('--failure-first', action='store_true',
+                            help='Run first the tests most likely to fail (failure history, '
+                                 'changed dependencies, churn).')
+        parser.add_argument('--short-circuit', nargs='?', const='skip', choices=['skip', 'defer'],
+                            default=None,
+                            help='Skip (or defer to the end) test modules that depend on the '
+                                 'source modules of a test module that failed.')
+        parser.add_argument('--reruns', metavar='N', type=int, default=0,
+                            help='Rerun failing tests up to N times; tests passing on a rerun '
+                                 'are reported as flaky and do not fail the run.')
+        parser.add_argument('--rerun-fresh', action='store_true',
+                            help='Run each rerun of --reruns in a new process.')
+        parser.add_argument('--ids', metavar='ID[,ID...]', type=lambda value: value.split(','),
+                            default=None,
+                            help='Run exactly these tests (comma-separated ids), in this order.')
+        parser.add_argument('--bisect', metavar='TEST_ID', default=None,
+                            help='Find the minimal set of preceding tests that makes TEST_ID '
+                                 'fail, and print a command reproducing the failure.')
         parser.add_argument('--dry-run', action='store_true',
                             help='List tests in execution order without running them')
         parser.add_argument('-v', '--verbose', action='store_true',
@@ -42,6 +56,29 @@ class RutCLI:
         # Think through -k interaction with -c.
         parser.add_argument('-c', '--changed', action='store_true',
                             help='Run tests only from files changed since last successful run')
+        parser.add_argument('--durations', metavar='N', type=int, default=None,
+                            help='Show the N slowest modules, classes and tests with a '
+                                 'breakdown per phase (import, setUp, call...). 0 shows all.')
+        parser.add_argument('--leaks', nargs='?', const='test', choices=['test', 'module'],
+                            default=None,
+                            help='Report tests (or modules) that retain memory, using tracemalloc.')
+        parser.add_argument('--profile', nargs='?', const='test', choices=['test', 'module'],
+                            default=None,
+                            help='Profile tests with cProfile, writing a .pstats file per test '
+                                 '(or module) to .rut_cache/profiles.')
+        parser.add_argument('--sample-profile', action='store_true',
+                            help='Sample the stack of running tests at a fixed interval, writing '
+                                 'collapsed stacks (flamegraph input) to .rut_cache/samples.')
+        parser.add_argument('--bench', nargs='?', const='run', choices=['run', 'save'], default=None,
+                            help='Run the bench_* benchmark methods instead of the tests, failing on '
+                                 'regressions from the baselines in .rut_cache. --bench=save '
+                                 'stores the results as new baselines.')
+        parser.add_argument('--fail-on-slowdown', action='store_true',
+                            help='Fail the run if a test or module got slower than in previous runs.')
+        parser.add_argument('--junit-xml', metavar='PATH', default=None,
+                            help='Write a JUnit XML report, updated as each test finishes.')
+        parser.add_argument('--report-jsonl', metavar='PATH', default=None,
+                            help='Write test results as JSON lines, one per test as it finishes.')
         self.args = parser.parse_args(argv)
 
     def setup(self):
@@ -49,8 +86,18 @@ class RutCLI:
         self.test_dir = self._resolve_test_dir()
         self.source_dirs = self._resolve_source_dirs()
 
+    @staticmethod
+    def _warn(message):
+        from rich.console import Console
+        Console(stderr=True).print(message)
+
     def load_config(self):
-        stderr = Console(stderr=True)
+        # Imported here rather than at the top: `rut --version` doesn't need them.
+        import pathlib
+        try:
+            import tomllib
+        except ModuleNotFoundError:
+            import tomli as tomllib
         cwd = pathlib.Path.cwd()
         # Look in cwd, then parent if cwd is "tests/"
         candidates = [cwd]
@@ -66,10 +113,10 @@ class RutCLI:
                     pyproject_data = tomllib.load(f)
                     config = pyproject_data.get("tool", {}).get("rut", {})
                     if not config:
-                        stderr.print("[yellow]Warning: no \\[tool.rut] section in pyproject.toml. Defaults: test_dir=tests  source_dirs=src, tests[/yellow]")
+                        self._warn("[yellow]Warning: no \\[tool.rut] section in pyproject.toml. Defaults: test_dir=tests  source_dirs=src, tests[/yellow]")
                     return config
         self.project_root = cwd
-        stderr.print("[yellow]Warning: no pyproject.toml found. Defaults: test_dir=.  source_dirs=.[/yellow]")
+        self._warn("[yellow]Warning: no pyproject.toml found. Defaults: test_dir=.  source_dirs=.[/yellow]")
         return {}
 
     def _resolve_test_dir(self):
@@ -130,3 +177,19 @@ class RutCLI:
                     print(f"Warning: Could not find warning category '{category_name}'. Defaulting to 'Warning'.", file=sys.stderr)
             filters.append(filter_dict)
         return filters
+
+    def warning_categories(self, names):
+        """
+        Parses the `collect_warnings` categories from pyproject.toml: names of
+        builtin warning classes, "Warning" collects all warnings.
+        """
+        categories = []
+        for name in names:
+            category = getattr(builtins, name, None)
+            if not (isinstance(category, type) and issubclass(category, Warning)):
+                print(f"Error: invalid collect_warnings entry '{name}' "
+                      "(expected a builtin warning category, e.g. 'DeprecationWarning').",
+                      file=sys.stderr)
+                sys.exit(1)
+            categories.append(category)
+        return categories
@@ -0,0 +1,176 @@
+"""
+Code coverage (`--cov`).
+
+On Python 3.12+ the `sys.monitoring` based core of coverage.py ("sysmon") is
+used, unless a core is configured (`[tool.coverage.run] core`, or the
+COVERAGE_CORE environment variable): it costs a fraction of the default
+tracer. On 3.12 and 3.13 sysmon can't measure branches, branch coverage
+keeps the default core. Sysmon doesn't support dynamic contexts either (it
+records a line once, in the context of the first module that runs it):
+runs storing the lines of each test module (see below) use the C tracer.
+
+Data is written in parallel mode, one file per process, and combined before
+the report: the data of Python subprocesses started by tests is included
+when they are measured too (e.g. `[tool.coverage.run] patch = ["subprocess"]`
+with coverage.py 7.10+).
+
+Durations of a covered run are not stored (see __main__); they are compared
+with the stored ones of the same modules to report the overhead of coverage.
+
+Incremental coverage: the lines run by each test module (its fixtures and
+tests, recorded in a coverage context named after the module) are stored in
+`.rut_cache/coverage.json`, with a hash of the module's dependency closure,
+by runs of all the selected tests (not with -k or given test ids).
+On `--changed` runs, the stored lines of the up-to-date modules whose hash
+still matches are merged in before the report. Lines run at import time are
+measured on every run: discovery imports all test modules. Only line
+coverage is stored, not branches.
+"""
+
+import contextlib
+import os
+import sys
+import time
+import unittest.suite
+
+from . import cache
+from .internals import patched
+
+
+def _core(cov, per_module):
+    """Core to use, or None for the configured or default one of coverage.py."""
+    if os.environ.get('COVERAGE_CORE') or cov.get_option('run:core'):
+        return None
+    if per_module:
+        # Contexts are switched per module, not supported by sysmon (the
+        # default of coverage.py on 3.14+).
+        return 'ctrace'
+    if sys.version_info < (3, 12):
+        return None
+    # sys.monitoring can measure branches only from 3.14
+    if not cov.get_option('run:branch') or sys.version_info >= (3, 14):
+        return 'sysmon'
+    return None
+
+
+class CoverageRun:
+    """Coverage of a run. With `per_module`, the lines run by each test module
+    are recorded in its own context, to be stored (see finish())."""
+
+    def __init__(self, source_dirs, per_module=True):
+        import coverage
+        self.source_dirs = source_dirs
+        self.per_module = per_module
+        self.cov = coverage.Coverage(source=source_dirs)
+        self.cov.set_option('run:parallel', True)
+        self.core = _core(self.cov, per_module)
+        if self.core:
+            self.cov.set_option('run:core', self.core)
+        self.finish_time = 0.0
+        self.modules_run = set()
+        self.merged = 0  # up-to-date modules with stored data merged
+
+    def start(self):
+        self.cov.erase()  # previous data, including parallel files
+        self.cov.start()
+
+    @contextlib.contextmanager
+    def running(self):
+        """Switch the coverage context to each test module before its fixtures run."""
+        if not self.per_module:
+            yield
+            return
+        run = self
+        TestSuite = unittest.suite.TestSuite
+        switch_to = []
+
+        def wrap_module_setup(original):
+            def _handleModuleFixture(self, test, result):
+                module = test.__class__.__module__
+                if module != self._get_previous_module(result):
+                    switch_to.append(module)  # after the previous module teardown
+                try:
+                    return original(self, test, result)
+                finally:
+                    switch_to.clear()
+            return _handleModuleFixture
+
+        def wrap_module_teardown(original):
+            def _handleModuleTearDown(self, result):
+                try:
+                    return original(self, result)
+                finally:
+                    if switch_to:
+                        run.cov.switch_context(switch_to[0])
+                        run.modules_run.add(switch_to.pop())
+            return _handleModuleTearDown
+
+        try:
+            with patched((TestSuite, '_handleModuleFixture', wrap_module_setup),
+                         (TestSuite, '_handleModuleTearDown', wrap_module_teardown)):
+                yield
+        finally:
+            self.cov.switch_context('')
+
+    def finish(self, dependency_hashes=None, uptodate=(), store=False):
+        """Stop, combine the data files, print the report. Return the total percentage.
+
+        `dependency_hashes`: {test module: hash of its dependency closure}, for
+        the modules run and the `uptodate` ones. The lines of the modules run are
+        stored if `store` (they ran in full) and `per_module`, the stored lines of
+        up-to-date modules are merged.
+        """
+        import coverage
+        start = time.perf_counter()
+        self.cov.stop()
+        self.cov.save()
+        # Not in parallel mode: the combined data goes to .coverage
+        combined = coverage.Coverage(source=self.source_dirs)
+        combined.combine()
+        combined.save()
+        if dependency_hashes:
+            self._update_stored(combined.get_data(), dependency_hashes, uptodate,
+                                store and self.per_module)
+        total = combined.report(show_missing=True)
+        self.finish_time = time.perf_counter() - start
+        return total
+
+    def _update_stored(self, data, dependency_hashes, uptodate, store):
+        if data.has_arcs():
+            return
+        stored = cache.load_coverage()
+        if store:
+            lines_by_module = {module: {} for module in self.modules_run if module in dependency_hashes}
+            for filename in data.measured_files():
+                for lineno, contexts in data.contexts_by_lineno(filename).items():
+                    for context in contexts:
+                        if context in lines_by_module:
+                            lines_by_module[context].setdefault(filename, []).append(lineno)
+            for module, lines in lines_by_module.items():
+                stored[module] = {'key': dependency_hashes[module],
+                                  'lines': {filename: sorted(linenos) for filename, linenos in lines.items()}}
+            cache.save_coverage(stored)
+        for module in uptodate:
+            entry = stored.get(module)
+            if entry is None or entry['key'] != dependency_hashes.get(module):
+                continue
+            data.set_context(module)
+            data.add_lines(entry['lines'])
+            self.merged += 1
+        data.set_context(None)
+
+    def overhead_message(self, module_durations):
+        """Summary of the coverage overhead of the run, from the stored durations."""
+        parts = [f"coverage core: {self.core or 'default'}"]
+        expected = cache.load_durations()
+        modules = [module for module in module_durations if module in expected]
+        if modules:
+            covered = sum(module_durations[module] for module in modules)
+            usual = sum(expected[module] for module in modules)
+            if usual > 0:
+                parts.append(f"{len(modules)} modules took {covered:.2f}s, {covered / usual:.2f}x"
+                             f" their usual {usual:.2f}s")
+        if self.merged:
+            parts.append(f"stored coverage of {self.merged} up-to-date modules merged")
+        parts.append(f"saving, combining and reporting took {self.finish_time:.2f}s")
+        return ", ".join(parts)
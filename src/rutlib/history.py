@@ -0,0 +1,95 @@
+"""
+Duration history and slowdown detection.
+
+`.rut_cache/history.json` keeps the last HISTORY_SIZE durations of each test
+(passed tests only) and module (full runs only). Entries not updated for
+MAX_AGE are dropped, so removed or renamed tests don't accumulate.
+
+Before a run's durations are added, each one is compared with its history:
+it is a slowdown when it exceeds the median by more than `threshold` times
+the spread (MAD scaled to a standard deviation, at least 5% of the median)
+and by at least `min_seconds`.
+"""
+
+import statistics
+import time
+from typing import NamedTuple
+
+from .cache import load_history, save_history
+
+HISTORY_SIZE = 20
+MIN_SAMPLES = 5
+MAX_AGE = 30 * 24 * 3600  # seconds
+DEFAULT_THRESHOLD = 3.0
+DEFAULT_MIN_SECONDS = 0.05
+
+
+class Slowdown(NamedTuple):
+    kind: str  # "test" or "module"
+    name: str
+    duration: float
+    median: float
+    samples: int
+
+
+def is_slowdown(samples, duration, threshold, min_seconds):
+    if len(samples) < MIN_SAMPLES:
+        return False
+    median = statistics.median(samples)
+    mad = statistics.median(abs(x - median) for x in samples)
+    spread = max(1.4826 * mad, 0.05 * median)
+    return duration - median > max(threshold * spread, min_seconds)
+
+
+def update(history, kind, durations, threshold, min_seconds, now):
+    """Compare `durations` with `history`, then add them. Return slowdowns."""
+    entries = history.setdefault(kind, {})
+    slowdowns = []
+    for name, duration in durations.items():
+        entry = entries.setdefault(name, {'d': []})
+        samples = entry['d']
+        if is_slowdown(samples, duration, threshold, min_seconds):
+            slowdowns.append(Slowdown(kind, name, duration, statistics.median(samples), len(samples)))
+        samples.append(round(duration, 4))
+        del samples[:-HISTORY_SIZE]
+        entry['t'] = int(now)
+    return slowdowns
+
+
+def prune(history, now):
+    """Drop entries not updated for MAX_AGE."""
+    for entries in history.values():
+        for name in [name for name, entry in entries.items() if now - entry['t'] > MAX_AGE]:
+            del entries[name]
+
+
+def record_durations(test_durations, module_durations,
+                     threshold=DEFAULT_THRESHOLD, min_seconds=DEFAULT_MIN_SECONDS):
+    """Check a run's durations against the stored history, then store them.
+
+    Return the slowdowns found, modules first.
+    """
+    history = load_history()
+    now = time.time()
+    slowdowns = update(history, 'module', module_durations, threshold, min_seconds, now)
+    slowdowns += update(history, 'test', test_durations, threshold, min_seconds, now)
+    prune(history, now)
+    save_history(history)
+    return slowdowns
+
+
+def slowdowns_table(slowdowns):
+    from rich.table import Table
+    from rich.text import Text
+    table = Table(title=f"{len(slowdowns)} slowdown(s) compared with previous runs",
+                  title_justify="left", title_style="bold yellow", box=None, pad_edge=False)
+    table.add_column("time", justify="right", style="bold yellow")
+    table.add_column("median", justify="right")
+    table.add_column("kind", style="dim")
+    table.add_column("name")
+    for s in slowdowns:
+        name = Text(s.name)
+        if s.median:
+            name.append(f" ({s.duration / s.median:.1f}x, {s.samples} runs)", style="dim")
+        table.add_row(f"{s.duration:.3f}s", f"{s.median:.3f}s", s.kind, name)
+    return table
@@ -0,0 +1,52 @@
+"""
+Helpers shared by the features that hook into unittest internals.
+
+`patched()` wraps unittest methods for the duration of a run (budgets in
+watchdog.py, benchmarks in bench.py...). The other helpers name what
+unittest runs: test classes, errors of fixtures, and test modules, which
+unittest imports under their short name when the test directory is not a
+package.
+"""
+
+import contextlib
+import re
+
+# Id of the error of a fixture, e.g. "setUpModule (tests.test_a)"
+_FIXTURE_ERROR = re.compile(r'^(\w+) \((.+)\)$')
+
+
+@contextlib.contextmanager
+def patched(*patches):
+    """Replace `owner.attr` with `make_wrapper(original)` for each (owner, attr,
+    make_wrapper) of `patches`, and restore the originals on exit."""
+    originals = []
+    try:
+        for owner, attr, make_wrapper in patches:
+            original = owner.__dict__[attr]
+            originals.append((owner, attr, original))
+            setattr(owner, attr, make_wrapper(original))
+        yield
+    finally:
+        for owner, attr, original in reversed(originals):
+            setattr(owner, attr, original)
+
+
+def class_name(cls):
+    """Dotted name of a test class, e.g. "tests.test_a.TestA"."""
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def fixture_error(test_id):
+    """Return (fixture, module or class name) if `test_id` is the id of the error
+    of a fixture, e.g. ("setUpClass", "tests.test_a.TestA"), else None."""
+    match = _FIXTURE_ERROR.match(test_id)
+    return match.groups() if match else None
+
+
+def full_module_names(modules):
+    """Return {short name: full name} of the dotted names `modules`, the first
+    one for each short name, e.g. {"test_a": "tests.test_a"}."""
+    short_to_full = {}
+    for name in modules:
+        short_to_full.setdefault(name.rsplit('.', 1)[-1], name)
+    return short_to_full
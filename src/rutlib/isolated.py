@@ -0,0 +1,57 @@
+"""
+Runs of given tests in a fresh process.
+
+`run()` starts `rut --ids ...` in a subprocess, in the current directory, and
+reads the outcome of each test from its JSON lines report. The output of the
+subprocess is not shown. The subprocess inherits the environment, including
+session resources (see RutRunner._start_session). It keeps the captured
+output saved by the current run (see KEEP_CAPTURES_ENV), and with
+`save_captures=False` saves its own in a temporary directory.
+"""
+
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+
+from .cache import CAPTURES_DIR_ENV, KEEP_CAPTURES_ENV
+
+# Outcomes of a test that did not fail
+PASSING = ('passed', 'skipped', 'expected_failure')
+
+
+def command(test_ids, test_path=None):
+    """Return the rut command line running `test_ids`, in that order."""
+    args = ['rut', '--ids', ','.join(test_ids)]
+    if test_path:
+        args.append(test_path)
+    return shlex.join(args)
+
+
+def run(test_ids, test_path=None, timeout=None, save_captures=True):
+    """Run `test_ids` in a new process. Return the ids of the tests that passed,
+    or None if the process did not complete (crash, timeout)."""
+    with tempfile.TemporaryDirectory(prefix='rut-') as tmpdir:
+        report = os.path.join(tmpdir, 'report.jsonl')
+        env = {**os.environ, KEEP_CAPTURES_ENV: '1'}
+        if not save_captures:
+            env[CAPTURES_DIR_ENV] = os.path.join(tmpdir, 'captures')
+        args = [sys.executable, '-m', 'rutlib', '--ids', ','.join(test_ids),
+                '--report-jsonl', report, '--no-live']
+        if test_path:
+            args.append(test_path)
+        try:
+            subprocess.run(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                           stderr=subprocess.DEVNULL, timeout=timeout, env=env, check=False)
+        except subprocess.TimeoutExpired:
+            return None
+        if not os.path.exists(report):
+            return None
+        with open(report, encoding='utf-8') as f:
+            events = [json.loads(line) for line in f]
+    if not events or events[-1]['event'] != 'summary':
+        return None
+    # Sub-test failures are reported with their own id, their test is not reported as passed.
+    return {event['id'] for event in events if event['event'] == 'test' and event['outcome'] in PASSING}
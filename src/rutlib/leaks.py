@@ -0,0 +1,144 @@
+"""
+Memory leak detection (`--leaks`).
+
+With tracemalloc enabled, a snapshot is taken when a unit (a test, or a
+module with `--leaks module`) starts and another one, after a garbage
+collection, when it ends. Units whose retained allocations grew by at
+least `threshold` bytes are reported, with their top allocation sites.
+
+A test ends once the suite released its TestCase instance, so that what
+the instance refers to (e.g. attributes set in setUp) is not seen as
+retained: when the suite moves on to the fixtures of the next test, or
+when the next test or the run ends.
+
+Snapshots are costly on big heaps: module granularity takes two per
+module instead of two per test.
+"""
+
+import contextlib
+import gc
+import os
+import tracemalloc
+import unittest
+
+import rich
+
+from .internals import patched
+
+DEFAULT_THRESHOLD_KB = 64
+TOP_SITES = 3
+
+# Allocations by the runner itself (results, captured output...) are ignored.
+_IGNORED = (
+    tracemalloc.__file__,
+    os.path.join(os.path.dirname(unittest.__file__), '*'),
+    os.path.join(os.path.dirname(__file__), '*'),
+    os.path.join(os.path.dirname(rich.__file__), '*'),  # renderer thread
+    '<frozen importlib._bootstrap*>',
+    '<unknown>',
+)
+
+
+def _site(frame):
+    path = os.path.relpath(frame.filename)
+    if path.startswith('..'):
+        path = frame.filename
+    return f"{path}:{frame.lineno}"
+
+
+class LeakDetector:
+    def __init__(self, granularity='test', threshold_kb=DEFAULT_THRESHOLD_KB):
+        self.granularity = granularity
+        self.threshold = threshold_kb * 1024
+        # [(unit, bytes retained, [(site, bytes)])]
+        self.leaks = []
+        self._unit = None
+        self._before = None
+
+    @contextlib.contextmanager
+    def running(self):
+        """Trace allocations while running the tests."""
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        # Filtering compiles (and caches) the patterns, not to be seen as a leak.
+        self._snapshot()
+        try:
+            with patched(self._suite_patch()):
+                yield
+        finally:
+            self.finish()
+            if not was_tracing:
+                tracemalloc.stop()
+
+    def _suite_patch(self):
+        """patched() argument ending the unit of a test once the suite released it.
+
+        The suite gets the next test, dropping the previous one, then handles
+        the fixtures of its class and module, starting with
+        _tearDownPreviousClass. At the end of the run (`test` is None), the
+        last test can still be referred to by the suite.
+        """
+        detector = self
+
+        def wrap(original):
+            def _tearDownPreviousClass(self, test, result):
+                if test is not None and detector.granularity != 'module':
+                    detector._end_unit()
+                return original(self, test, result)
+            return _tearDownPreviousClass
+        return (unittest.suite.TestSuite, '_tearDownPreviousClass', wrap)
+
+    @staticmethod
+    def _snapshot():
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, pattern) for pattern in _IGNORED])
+
+    def start_test(self, test):
+        if self.granularity == 'module':
+            if test.__module__ == self._unit:
+                return
+            self._end_unit()
+            self._start_unit(test.__module__)
+        else:
+            self._end_unit()  # if the suite did not, e.g. tests run outside of one
+            self._start_unit(test.id())
+
+    def stop_test(self, test):
+        # The unit of a test ends once the test is released (see _suite_patch).
+        pass
+
+    def finish(self):
+        """End the current unit (the last test or module)."""
+        self._end_unit()
+
+    def _start_unit(self, unit):
+        self._unit = unit
+        self._before = self._snapshot()
+
+    def _end_unit(self):
+        if self._unit is None:
+            return
+        gc.collect()
+        stats = self._snapshot().compare_to(self._before, 'lineno')
+        retained = sum(stat.size_diff for stat in stats)
+        if retained >= self.threshold:
+            sites = [(_site(stat.traceback[0]), stat.size_diff)
+                     for stat in stats[:TOP_SITES] if stat.size_diff > 0]
+            self.leaks.append((self._unit, retained, sites))
+        self._unit = self._before = None
+
+
+def leaks_table(detector):
+    from rich.table import Table
+    from rich.text import Text
+    table = Table(title=f"{len(detector.leaks)} {detector.granularity}(s) retained memory"
+                        f" (threshold {detector.threshold // 1024} KB)",
+                  title_justify="left", title_style="bold yellow", box=None, pad_edge=False)
+    table.add_column("retained", justify="right", style="bold yellow")
+    table.add_column(detector.granularity)
+    table.add_column("top allocation sites", style="dim")
+    for unit, retained, sites in sorted(detector.leaks, key=lambda leak: leak[1], reverse=True):
+        table.add_row(f"{retained / 1024:.1f} KB", Text(unit),
+                      Text("\n".join(f"{site} +{size / 1024:.1f} KB" for site, size in sites)))
+    return table
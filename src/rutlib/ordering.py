@@ -0,0 +1,119 @@
+"""
+Failure-first ordering (`--failure-first`).
+
+The schedule units (see RutRunner.schedule_units) are ordered by a score of
+how likely they are to fail, highest first. Equal scores keep the dependency
+order. The score adds:
+
+- failure history: each recorded failure of the unit's tests or fixtures
+  counts FAILURE_DECAY ** (runs since it failed);
+- proximity: 1 / (1 + distance) in the import graph from the test module to
+  the nearest module changed since the last successful run (0 if none);
+- churn: the recorded changes of the files the test module depends on, each
+  counting CHURN_DECAY ** (runs since the change), times CHURN_WEIGHT and
+  capped at 1.
+
+Failures (every run) and file changes (found when the cache of file hashes
+is updated) are recorded in `.rut_cache/failures.json`, with a run counter.
+Only the last MAX_EVENTS of each test or file are kept, entries older than
+MAX_AGE_RUNS runs are dropped.
+"""
+
+from .cache import load_failures, save_failures
+from .internals import class_name, fixture_error, full_module_names
+
+FAILURE_DECAY = 0.5
+CHURN_DECAY = 0.8
+CHURN_WEIGHT = 0.2
+MAX_EVENTS = 5
+MAX_AGE_RUNS = 100
+
+
+def failed_names(result):
+    """Names of the tests, classes and modules that failed in a unittest result.
+
+    Includes the tests whose failures were discarded after reruns (flaky and
+    quarantined tests, see RutRunner._rerun_failures).
+    """
+    names = set(getattr(result, 'flaky', ())) | set(getattr(result, 'quarantined', ()))
+    for test, _ in result.failures + result.errors + [(t, None) for t in result.unexpectedSuccesses]:
+        test = getattr(test, 'test_case', test)  # sub-test
+        error = fixture_error(test.id())
+        names.add(error[1] if error else test.id())
+    return names
+
+
+def _add_events(entries, names, run):
+    for name in names:
+        events = entries.setdefault(name, [])
+        events.append(run)
+        del events[:-MAX_EVENTS]
+
+
+def record_run(failed, changed_files=()):
+    """Record the failures of a run and the files changed since the last successful one."""
+    stats = load_failures()
+    run = stats.get('run', 0) + 1
+    stats['run'] = run
+    for kind, names in (('failures', failed), ('changes', changed_files)):
+        entries = stats.setdefault(kind, {})
+        _add_events(entries, names, run)
+        for name in [name for name, events in entries.items() if run - events[-1] > MAX_AGE_RUNS]:
+            del entries[name]
+    save_failures(stats)
+
+
+def _decayed(events, run, decay):
+    return sum(decay ** (run - r) for r in events)
+
+
+def _distance(module, targets, imports):
+    """Import graph distance from `module` to the nearest of `targets`, or None."""
+    seen = {module}
+    frontier = [module]
+    distance = 0
+    while frontier:
+        if any(name in targets for name in frontier):
+            return distance
+        distance += 1
+        next_frontier = []
+        for name in frontier:
+            for dep in imports.get(name, ()):
+                if dep not in seen:
+                    seen.add(dep)
+                    next_frontier.append(dep)
+        frontier = next_frontier
+    return None
+
+
+def failure_first(units, modified_modules, module_imports, module_all_imports, module_filepaths):
+    """Return `units` sorted by failure likelihood (see module docstring)."""
+    stats = load_failures()
+    run = stats.get('run', 0)
+    failures = stats.get('failures', {})
+    changes = stats.get('changes', {})
+    short_to_full = full_module_names(module_all_imports)
+
+    module_scores = {}
+
+    def module_score(module):
+        if module not in module_scores:
+            full = short_to_full.get(module, module)
+            distance = _distance(full, modified_modules, module_imports)
+            proximity = 0.0 if distance is None else 1 / (1 + distance)
+            paths = {module_filepaths[name] for name in {full} | module_all_imports.get(full, set())
+                     if name in module_filepaths}
+            churn = sum(_decayed(changes.get(path, ()), run, CHURN_DECAY) for path in paths)
+            module_scores[module] = proximity + min(CHURN_WEIGHT * churn, 1.0)
+        return module_scores[module]
+
+    def score(unit):
+        module = unit.tests[0].__module__
+        names = {unit.name, module}
+        for test in unit.tests:
+            names.add(class_name(test.__class__))
+            names.add(test.id())
+        history = sum(_decayed(failures.get(name, ()), run, FAILURE_DECAY) for name in names)
+        return history + module_score(module)
+
+    return sorted(units, key=score, reverse=True)  # stable: ties keep the dependency order
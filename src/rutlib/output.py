@@ -1,14 +1,21 @@
+import contextlib
 import logging
 import os
+import queue
 import re
 import sys
-import tempfile
+import threading
 import time
+import traceback
 import unittest
 from rich.console import Console
 from rich.panel import Panel
 from rich.text import Text
 
+from .cache import CAPTURES_DIR, KEEP_CAPTURES_ENV, clear_captures
+from .capture import DEFAULT_CAPTURE_LIMIT, BoundedCapture, FdCapture
+from .results import ResultMixin
+
 _file_re = re.compile(r'^(\s*File ")(.+)(",\s*line\s*)(\d+)(?:(,\s*in\s*)(.+))?$')
 _exc_re = re.compile(r'^(\w+(?:Error|Exception))\b(.*)')
 
@@ -166,6 +173,25 @@ def _append_highlighted(result, content_line, pointer_line, base_style, highligh
     result.append('\n', style=base_style)
 
 
+def _format_seconds(seconds):
+    """Format a duration as M:SS (or H:MM:SS)."""
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
+
+
+def _peak_rss():
+    """Peak resident set size of this process in bytes, None if unknown."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
 def _test_header(test_id, label, width):
     """Build a rule-style header line.
 
@@ -205,11 +231,102 @@ def _test_header(test_id, label, width):
     return result
 
 
-class RichTestResult(unittest.TestResult):
-    def __init__(self, console, buffer: bool, verbose=False):
+class ProgressRenderer:
+    """Render progress output on a background thread.
+
+    Test results only enqueue a render call (a cheap `put`). The thread drains
+    the queue every `interval` seconds. The text the calls `write()` is merged
+    into a single `Text`, printed once per batch, and the console is flushed
+    once per batch instead of once per test.
+    Calls are executed in order, so the final output is the same as rendering
+    them synchronously.
+    """
+
+    def __init__(self, console, interval=0.05, on_tick=None):
+        self.console = console
+        self.interval = interval
+        # Called on the renderer thread after every batch, even an empty one.
+        self.on_tick = on_tick
+        self._queue = queue.SimpleQueue()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._batch = Text()
+        self._draining = False
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="rut-progress", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        self._queue.put((fn, args))
+
+    def write(self, text, end="\n"):
+        """Print `text` with the current batch (printed right away outside of a batch)."""
+        if not self._draining:
+            self.console.print(text, end=end)
+            return
+        self._batch.append_text(text)
+        self._batch.append(end)
+
+    def stop(self):
+        """Stop the thread and render whatever is still queued."""
+        self._stopped.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self._drain()
+
+    def _loop(self):
+        while not self._stopped.wait(self.interval):
+            self._drain()
+            if self.on_tick:
+                self.on_tick()
+
+    def _drain(self):
+        rendered = False
+        self._draining = True
+        try:
+            while True:
+                try:
+                    fn, args = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                fn(*args)
+                rendered = True
+        finally:
+            self._draining = False
+        if self._batch:
+            batch, self._batch = self._batch, Text()
+            self.console.print(batch, end="")
+        if rendered:
+            self.console.file.flush()
+
+
+DEFAULT_MAX_FAILURES_PER_GROUP = 5
+
+
+class _GroupedError(str):
+    """Error text of a failure with the same root cause as `first` (a test id).
+
+    The traceback is not formatted, only the exception line is kept.
+    """
+    first = None
+
+
+class RichTestResult(ResultMixin, unittest.TestResult):
+    def __init__(self, console, buffer: bool, verbose=False, capture_limit=DEFAULT_CAPTURE_LIMIT,
+                 max_failures_per_group=DEFAULT_MAX_FAILURES_PER_GROUP):
         super().__init__()
         self.console = console
         self.verbose = verbose
+        self.capture_limit = capture_limit
+        # Failures with the same root cause are rendered in full only for the
+        # first `max_failures_per_group` tests (0 for all).
+        self.max_failures_per_group = max_failures_per_group
+        # (exc type, message, file, line) -> [first test id, number of failures]
+        self._failure_groups = {}
+        # Test or sub-test whose failure or error is being recorded
+        self._recording = None
         self._original_handler_streams = {}
         self._current_module = None
         self._current_module_path = None
@@ -223,8 +340,146 @@ class RichTestResult(unittest.TestResult):
         self._printed_uptodate = set()
         self._term_width = console.width or 80
         self._fd_captures = {}
+        self._fd_capture = FdCapture(capture_limit)
+        # When set (by RichTestRunner), progress output is rendered off-thread.
+        self._renderer = None
+        # Live status bar (see _start_live). While active, the line being
+        # built is part of the live display, finished lines print above it.
+        self._live = None
+        self._partial = Text()
+        self._last_live_refresh = 0.0
+        self._running_test = None
+        self._passed = 0
+        self._start_time = time.perf_counter()
+        # Tests per module, and the expected durations of modules from
+        # previous runs, used with `module_durations` for the ETA.
+        self._module_counts = {}
+        self._expected_durations = {}
+
+    def _emit(self, fn, *args):
+        """Render progress output, on the renderer thread if there is one."""
+        if self._renderer:
+            self._renderer.submit(fn, *args)
+        else:
+            fn(*args)
+            self.console.file.flush()
+
+    def after_rendering(self, fn, *args):
+        """Call `fn(*args)` once the progress output queued so far is rendered."""
+        self._emit(fn, *args)
+
+    def _write(self, renderable, end="\n"):
+        """Print progress output, keeping the live status bar below it.
+
+        With a renderer, the output is merged into its batch (see ProgressRenderer).
+        """
+        if isinstance(renderable, str):
+            renderable = self.console.render_str(renderable)
+        print_ = self._renderer.write if self._renderer else self.console.print
+        if self._live is None:
+            print_(renderable, end=end)
+            return
+        self._partial.append_text(renderable)
+        if end == "\n":
+            line, self._partial = self._partial, Text()
+            print_(line)
+
+    _LIVE_REFRESH = 0.25  # seconds between status bar refreshes
+
+    def _start_live(self):
+        from rich.live import Live
+        self._live = Live(
+            get_renderable=self._live_renderable,
+            console=self.console, auto_refresh=False, transient=True,
+            redirect_stdout=False, redirect_stderr=False,
+        )
+        self._live.start()
+
+    def _live_renderable(self):
+        from rich.console import Group
+        if self._partial:
+            return Group(self._partial, self._status_line())
+        return self._status_line()
+
+    def _refresh_live(self):
+        """Refresh the status bar, at most every _LIVE_REFRESH seconds."""
+        now = time.perf_counter()
+        if self._live and now - self._last_live_refresh >= self._LIVE_REFRESH:
+            self._last_live_refresh = now
+            self._live.refresh()
+
+    def _stop_live(self):
+        if self._live is None:
+            return
+        if self._partial:
+            line, self._partial = self._partial, Text()
+            self.console.print(line)
+        self._live.stop()
+        self._live = None
+
+    def _status_line(self):
+        now = time.perf_counter()
+        failed = len(self.failures) + len(self.errors)
+        line = Text()
+        line.append(f"{self._passed} passed", style="green")
+        if failed:
+            line.append(", ")
+            line.append(f"{failed} failed", style="bold red")
+        uptodate = sum(self._uptodate_modules.values())
+        if uptodate:
+            line.append(", ")
+            line.append(f"{uptodate} up-to-date", style="cyan")
+        line.append(f" │ {_format_seconds(now - self._start_time)}", style="dim")
+        eta = self._eta(now)
+        if eta is not None:
+            line.append(f" ETA {_format_seconds(eta)}", style="dim")
+        test = self._running_test
+        if test is not None:
+            line.append(" │ ", style="dim")
+            line.append(self._module_path(test.__module__), style="cyan")
+            line.append(" " + ".".join(test.id().rsplit(".", 2)[-2:]))
+        line.truncate(self._term_width, overflow="ellipsis")
+        return line
+
+    def _eta(self, now):
+        """Estimate remaining seconds from stored per-module durations.
+
+        Modules without a stored duration are estimated from the average time
+        per test of the modules already run. Returns None when there is
+        nothing to go on.
+        """
+        if not self._module_counts:
+            return None
+        finished = dict(self.module_durations)  # snapshot, updated by the main thread
+        timed_tests = sum(self._module_counts.get(m, 0) for m in finished)
+        rate = sum(finished.values()) / timed_tests if timed_tests else None
+        remaining = 0.0
+        for module, count in self._module_counts.items():
+            if module in finished:
+                continue
+            expected = self._expected_durations.get(module)
+            if expected is None:
+                if rate is None:
+                    return None
+                expected = count * rate
+            if module == self._timing_module:
+                expected = max(expected - (now - self._module_start), 0.0)
+            remaining += expected
+        return remaining
+
+    def startTest(self, test):
+        super().startTest(test)
+        self._running_test = test
+
+    def stopTest(self, test):
+        self._running_test = None
+        super().stopTest(test)
 
     def _setupStdout(self):
+        if self.buffer and self._stderr_buffer is None:
+            # Replace unittest's StringIO buffers (created on first use).
+            self._stdout_buffer = BoundedCapture(self.capture_limit)
+            self._stderr_buffer = BoundedCapture(self.capture_limit)
         super()._setupStdout()
         if self.buffer:
             for handler in logging.root.handlers:
@@ -237,28 +492,22 @@ class RichTestResult(unittest.TestResult):
                         handler.stream = self._stderr_buffer
             # FD-level capture: redirect OS file descriptors 1/2 to temp files
             # so subprocess output doesn't leak to terminal
-            self._stdout_fd_save = os.dup(1)
-            self._stderr_fd_save = os.dup(2)
-            self._stdout_fd_tmp = tempfile.TemporaryFile(buffering=0)
-            self._stderr_fd_tmp = tempfile.TemporaryFile(buffering=0)
-            os.dup2(self._stdout_fd_tmp.fileno(), 1)
-            os.dup2(self._stderr_fd_tmp.fileno(), 2)
+            self._fd_capture.start()
 
     def _restoreStdout(self):
         if self.buffer:
             # Restore OS file descriptors before Python-level restore
-            os.dup2(self._stdout_fd_save, 1)
-            os.dup2(self._stderr_fd_save, 2)
-            os.close(self._stdout_fd_save)
-            os.close(self._stderr_fd_save)
-            self._stdout_fd_tmp.close()
-            self._stderr_fd_tmp.close()
+            self._fd_capture.stop()
             for handler in logging.root.handlers:
                 if id(handler) in self._original_handler_streams:
                     handler.stream = self._original_handler_streams[id(handler)]
             self._original_handler_streams.clear()
         super()._restoreStdout()
 
+    def _close_capture(self):
+        """Release the fd capture files (at the end of the run)."""
+        self._fd_capture.close()
+
     def _module_path(self, module_name):
         """Get relative file path for a module."""
         mod = sys.modules.get(module_name)
@@ -270,8 +519,14 @@ class RichTestResult(unittest.TestResult):
 
     _PCT_WIDTH = 7  # width of " [NNN%]"
 
-    def _add_dot(self, test, char, style):
-        module = test.__module__
+    def _progress(self, test, char, style, line):
+        """Queue progress output for a finished test: a dot, or `line` in verbose mode."""
+        if self.verbose:
+            self._emit(self._print_verbose_line, test.__module__, line)
+        else:
+            self._emit(self._add_dot, test.__module__, char, style)
+
+    def _add_dot(self, module, char, style):
         if module != self._current_module:
             self._flush_dots()
             self._print_uptodate_before(module)
@@ -279,14 +534,12 @@ class RichTestResult(unittest.TestResult):
             self._current_module_path = self._module_path(module)
             self._dot_count = 0
             self._line_col = len(self._current_module_path) + 1
-            self.console.print(Text(self._current_module_path + " ", style="dim"), end="")
-            self.console.file.flush()
+            self._write(Text(self._current_module_path + " ", style="dim"), end="")
         pct_reserve = self._PCT_WIDTH if self._total_tests > 0 else 0
         if self._line_col + 1 + pct_reserve > self._term_width:
-            self.console.print()
+            self._write(Text())
             self._line_col = 0
-        self.console.print(Text(char, style=style), end="")
-        self.console.file.flush()
+        self._write(Text(char, style=style), end="")
         self._dot_count += 1
         self._line_col += 1
         self._tests_done += 1
@@ -297,9 +550,9 @@ class RichTestResult(unittest.TestResult):
                 pct = int(self._tests_done / self._total_tests * 100)
                 pct_str = f" [{pct:3d}%]"
                 padding = max(self._term_width - self._line_col - len(pct_str), 0)
-                self.console.print(Text(" " * padding + pct_str))
+                self._write(Text(" " * padding + pct_str))
             else:
-                self.console.print()
+                self._write(Text())
             self._dot_count = 0
 
     def _print_uptodate_before(self, module):
@@ -319,7 +572,7 @@ class RichTestResult(unittest.TestResult):
         self._printed_uptodate.add(module)
         path = self._module_path(module)
         if self.verbose:
-            self.console.print(Text("⚡ ", style="yellow").append(path).append(f" ({count} up-to-date)", style="yellow"))
+            self._write(Text("⚡ ", style="yellow").append(path).append(f" ({count} up-to-date)", style="yellow"))
         else:
             line = Text(path + " ", style="dim")
             line.append(f"⚡ {count} up-to-date", style="yellow")
@@ -330,7 +583,7 @@ class RichTestResult(unittest.TestResult):
                 pct_str = ""
             padding = max(self._term_width - line.cell_len - len(pct_str), 1)
             line.append(" " * padding + pct_str)
-            self.console.print(line)
+            self._write(line)
 
     def _flush_remaining_uptodate(self):
         """Print any up-to-date modules not yet printed."""
@@ -343,21 +596,35 @@ class RichTestResult(unittest.TestResult):
             if m not in self._printed_uptodate:
                 self._print_uptodate_line(m)
 
-    def _check_module_verbose(self, test):
+    def _print_verbose_line(self, module, line):
         """In verbose mode, print up-to-date modules before a new module starts."""
-        module = test.__module__
         if module != self._current_module:
             self._print_uptodate_before(module)
             self._current_module = module
         self._tests_done += 1
+        self._write(line)
+
+    @staticmethod
+    def _capture_prefix(test):
+        """Path prefix for files with the full captured output of `test`."""
+        return CAPTURES_DIR / re.sub(r'[^\w.-]+', '_', test.id())
+
+    def _save_captures(self, test):
+        """Save the full sys.stdout/sys.stderr output of a failing test if truncated.
+
+        Must run before the failure is formatted, so the truncation marker
+        in the traceback includes the file path.
+        """
+        if not self.buffer or self._stdout_buffer is None:
+            return
+        prefix = self._capture_prefix(test)
+        self._stdout_buffer.save(prefix.parent / f"{prefix.name}.stdout.gz")
+        self._stderr_buffer.save(prefix.parent / f"{prefix.name}.stderr.gz")
 
     def _save_fd_output(self, test):
         if not self.buffer:
             return
-        self._stdout_fd_tmp.seek(0)
-        stdout = self._stdout_fd_tmp.read().decode('utf-8', errors='replace')
-        self._stderr_fd_tmp.seek(0)
-        stderr = self._stderr_fd_tmp.read().decode('utf-8', errors='replace')
+        stdout, stderr = self._fd_capture.read(save_prefix=self._capture_prefix(test))
         if stdout or stderr:
             self._fd_captures[test.id()] = (stdout, stderr)
 
@@ -379,55 +646,103 @@ class RichTestResult(unittest.TestResult):
                 border_style="dim red",
             ))
 
+    @staticmethod
+    def _root_cause(err):
+        """Exception type, message and the frame where it was raised.
+
+        The frame is the innermost one outside unittest (i.e. the assert
+        call, not unittest's `raise self.failureException`).
+        """
+        exc_type, exc_value, tb = err
+        origin = None
+        while tb is not None:
+            if '__unittest' not in tb.tb_frame.f_globals:
+                origin = tb
+            tb = tb.tb_next
+        if origin is None:
+            return (exc_type, str(exc_value), None, None)
+        return (exc_type, str(exc_value), origin.tb_frame.f_code.co_filename, origin.tb_lineno)
+
+    def _exc_info_to_string(self, err, test):
+        # Only failures and errors recorded for printErrors() are grouped,
+        # not expected failures.
+        recorded = self._recording
+        if recorded is None:
+            return super()._exc_info_to_string(err, test)
+        key = self._root_cause(err)
+        group = self._failure_groups.get(key)
+        if group is None:
+            group = self._failure_groups[key] = [recorded.id(), 0]
+        group[1] += 1
+        if not self.max_failures_per_group or group[1] <= self.max_failures_per_group:
+            return super()._exc_info_to_string(err, test)
+        exc_only = ''.join(traceback.format_exception_only(err[0], err[1]))
+        text = _GroupedError(f"Same error as {group[0]}\n{exc_only}")
+        text.first = group[0]
+        return text
+
+    def _captured_output(self, test):
+        stdout, stderr = super()._captured_output(test)
+        fd_stdout, fd_stderr = self._fd_captures.get(test.id(), ('', ''))
+        return stdout + fd_stdout, stderr + fd_stderr
+
     def addSuccess(self, test):
         super().addSuccess(test)
-        if self.verbose:
-            self._check_module_verbose(test)
-            self.console.print(f"[green]✔[/green] {test.id()}")
-        else:
-            self._add_dot(test, ".", "green")
-
+        self._passed += 1
+        self._progress(test, ".", "green", f"[green]✔[/green] {test.id()}")
+
+    @contextlib.contextmanager
+    def _recording_failure(self, test):
+        self._recording = test
+        try:
+            yield
+        finally:
+            self._recording = None
+
+    # The fd output is read before the failure is recorded, so that it is
+    # part of the event sent to the reporters.
     def addFailure(self, test, err):
-        super().addFailure(test, err)
+        self._save_captures(test)
         self._save_fd_output(test)
-        if self.verbose:
-            self._check_module_verbose(test)
-            self.console.print(f"[bold red]✖[/bold red] {test.id()}")
-        else:
-            self._add_dot(test, "F", "bold red")
+        with self._recording_failure(test):
+            super().addFailure(test, err)
+        self._progress(test, "F", "bold red", f"[bold red]✖[/bold red] {test.id()}")
 
     def addError(self, test, err):
-        super().addError(test, err)
+        self._save_captures(test)
         self._save_fd_output(test)
-        if self.verbose:
-            self._check_module_verbose(test)
-            self.console.print(f"[bold red]✖[/bold red] {test.id()}")
-        else:
-            self._add_dot(test, "E", "bold red")
+        with self._recording_failure(test):
+            super().addError(test, err)
+        self._progress(test, "E", "bold red", f"[bold red]✖[/bold red] {test.id()}")
+
+    def addSubTest(self, test, subtest, err):
+        with self._recording_failure(subtest):
+            super().addSubTest(test, subtest, err)
 
     def addSkip(self, test, reason):
         super().addSkip(test, reason)
-        if self.verbose:
-            self._check_module_verbose(test)
-            self.console.print(f"[yellow]SKIP[/yellow] {test.id()}: {reason}")
-        else:
-            self._add_dot(test, "s", "yellow")
+        self._progress(test, "s", "yellow", f"[yellow]SKIP[/yellow] {test.id()}: {reason}")
 
     def printErrors(self):
         if not self.errors and not self.failures:
             return
         width = self.console.width or 80
         self.console.print()
-        for test, err in self.errors:
-            self.console.print(_test_header(test.id(), "ERROR", width))
-            cleaned = _clean_traceback(err)
-            self.console.print(_colorize_diff(cleaned, verbose=self.verbose))
-            self._print_fd_captures(test)
-        for test, err in self.failures:
-            self.console.print(_test_header(test.id(), "FAIL", width))
-            cleaned = _clean_traceback(err)
-            self.console.print(_colorize_diff(cleaned, verbose=self.verbose))
-            self._print_fd_captures(test)
+        grouped = {}  # first test id -> number of failures not rendered
+        for label, failures in (("ERROR", self.errors), ("FAIL", self.failures)):
+            for test, err in failures:
+                if isinstance(err, _GroupedError):
+                    grouped[err.first] = grouped.get(err.first, 0) + 1
+                    continue
+                self.console.print(_test_header(test.id(), label, width))
+                cleaned = _clean_traceback(err)
+                self.console.print(_colorize_diff(cleaned, verbose=self.verbose))
+                self._print_fd_captures(test)
+        for first, count in grouped.items():
+            self.console.print(Text(
+                f"... {count} more failed with the same error as {first}"
+                f" (max_failures_per_group={self.max_failures_per_group})",
+                style="yellow"))
         if len(self.errors) + len(self.failures) > 1:
             self.console.print()
             label = " SHORT TEST SUMMARY "
@@ -451,37 +766,95 @@ class RichTestResult(unittest.TestResult):
                 self.console.print(_colorize_exc_line(exc_line))
 
 
+def _count_by_module(suite):
+    """Return {module: number of tests} for a (possibly nested) suite."""
+    counts = {}
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for module, count in _count_by_module(test).items():
+                counts[module] = counts.get(module, 0) + count
+        else:
+            counts[test.__module__] = counts.get(test.__module__, 0) + 1
+    return counts
+
+
 class RichTestRunner:
-    def __init__(self, failfast=False, buffer=False, uptodate_modules=None, verbose=False, module_order=None):
+    def __init__(self, failfast=False, buffer=False, uptodate_modules=None, verbose=False, module_order=None,
+                 live=False, expected_durations=None, capture_limit=DEFAULT_CAPTURE_LIMIT,
+                 reporters=None, max_failures_per_group=None, monitors=None, before_summary=None):
         self.failfast = failfast
         self.buffer = buffer
+        self.capture_limit = capture_limit
         self.verbose = verbose
         self.uptodate_modules = uptodate_modules or {}
         self.module_order = module_order or []
+        self.live = live
+        self.expected_durations = expected_durations or {}
+        self.reporters = reporters or []
+        if max_failures_per_group is None:
+            max_failures_per_group = DEFAULT_MAX_FAILURES_PER_GROUP
+        self.max_failures_per_group = max_failures_per_group
+        self.monitors = monitors or []
+        # Called with the result before the failures and the summary are printed
+        self.before_summary = before_summary
         # Dup stdout fd so console output bypasses fd-level capture (dup2 won't affect this fd)
         console_fd = os.dup(sys.__stdout__.fileno())
         self.console = Console(file=os.fdopen(console_fd, 'w'))
 
     def run(self, suite):
-        result = RichTestResult(self.console, self.buffer, verbose=self.verbose)
+        result = RichTestResult(self.console, self.buffer, verbose=self.verbose,
+                                capture_limit=self.capture_limit,
+                                max_failures_per_group=self.max_failures_per_group)
         result.failfast = self.failfast
         result.buffer = self.buffer
         result._module_order = self.module_order
         result._uptodate_modules = self.uptodate_modules
+        result._reporters = self.reporters
+        result._monitors = self.monitors
+        result._before_summary = self.before_summary
 
         uptodate_total = sum(self.uptodate_modules.values()) if self.uptodate_modules else 0
         result._total_tests = suite.countTestCases() + uptodate_total
+        if self.buffer and not os.environ.get(KEEP_CAPTURES_ENV):
+            clear_captures()
+        # Render progress off-thread. Not with capture disabled (-s): output
+        # must stay in step with the test, e.g. when stopping at a breakpoint.
+        if self.buffer:
+            result._renderer = ProgressRenderer(self.console, on_tick=result._refresh_live)
+            if self.live and self.console.is_terminal:
+                result._module_counts = _count_by_module(suite)
+                result._expected_durations = self.expected_durations
+                result._start_live()
+            result._renderer.start()
         start_time = time.time()
-        suite.run(result)
-        stop_time = time.time()
+        result._start_time = time.perf_counter()
+        result.startTestRun()
+        try:
+            suite.run(result)
+        finally:
+            stop_time = time.time()
+            result._close_capture()
+            result._close_module_timer(time.perf_counter())
+            if result._renderer:
+                result._renderer.stop()
+                result._renderer = None
+            try:
+                result._flush_dots()
+                result._flush_remaining_uptodate()
+            finally:
+                result._stop_live()
+
+        result.stopTestRun()
 
         time_taken = stop_time - start_time
-        result._flush_dots()
-        result._flush_remaining_uptodate()
         result.printErrors()
 
         uptodate_total = sum(self.uptodate_modules.values()) if self.uptodate_modules else 0
-        passed = result.testsRun - len(result.failures) - len(result.errors) - len(result.skipped)
+        # Failures discarded after reruns (see RutRunner._rerun_failures)
+        flaky = getattr(result, 'flaky', ())
+        quarantined = getattr(result, 'quarantined', ())
+        passed = (result.testsRun - len(result.failures) - len(result.errors) - len(result.skipped)
+                  - len(flaky) - len(quarantined))
         ok = result.wasSuccessful()
         dash_style = "bold green" if ok else "bold red"
 
@@ -492,6 +865,10 @@ class RichTestRunner:
             parts.append((f"{len(result.errors)} errors", "bold red"))
         if passed:
             parts.append((f"{passed} passed", "bold green"))
+        if flaky:
+            parts.append((f"{len(flaky)} flaky", "yellow"))
+        if quarantined:
+            parts.append((f"{len(quarantined)} quarantined", "yellow"))
         if uptodate_total:
             parts.append((f"{uptodate_total} up-to-date", "cyan"))
 
@@ -501,6 +878,9 @@ class RichTestRunner:
                 center.append(", ")
             center.append(text, style=style)
         center.append(f" in {time_taken:.3f}s")
+        peak_rss = _peak_rss()
+        if peak_rss:
+            center.append(f", peak RSS {peak_rss / 2**20:.0f} MB", style="dim")
 
         width = self.console.width or 80
         content_len = len(center.plain) + 2  # spaces around center
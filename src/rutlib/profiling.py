@@ -0,0 +1,95 @@
+"""
+cProfile integration (`--profile[=test|module]`).
+
+The profiler is enabled only while a test runs (from startTest to
+stopTest), so discovery and rut's own output are not profiled. Stats are
+written per unit, a test or a module, to `.rut_cache/profiles/<unit>.pstats`
+(readable with `pstats` or tools like snakeviz), and combined into a table
+of the top functions printed after the run.
+"""
+
+import contextlib
+import cProfile
+import os
+import pstats
+import re
+import shutil
+
+from . import cache
+
+TOP_FUNCTIONS = 20
+
+
+class TestProfiler:
+    def __init__(self, granularity='test'):
+        self.granularity = granularity
+        self.combined = None  # pstats.Stats of all units
+        self.files = 0
+        self._unit = None
+        self._profile = None
+
+    @contextlib.contextmanager
+    def running(self):
+        shutil.rmtree(cache.PROFILES_DIR, ignore_errors=True)
+        cache.PROFILES_DIR.mkdir(parents=True)
+        try:
+            yield
+        finally:
+            self._end_unit()
+
+    def start_test(self, test):
+        unit = test.__module__ if self.granularity == 'module' else test.id()
+        if unit != self._unit:
+            self._end_unit()
+            self._unit = unit
+            self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop_test(self, test):
+        self._profile.disable()
+        if self.granularity != 'module':
+            self._end_unit()
+
+    def _end_unit(self):
+        if self._unit is None:
+            return
+        self._profile.create_stats()
+        if self._profile.stats:
+            name = re.sub(r'[^\w.-]+', '_', self._unit)
+            self._profile.dump_stats(cache.PROFILES_DIR / f"{name}.pstats")
+            self.files += 1
+            if self.combined is None:
+                self.combined = pstats.Stats(self._profile)
+            else:
+                self.combined.add(self._profile)
+        self._unit = self._profile = None
+
+
+def _function_name(func):
+    filename, lineno, name = func
+    if filename == '~':  # built-in
+        return name
+    path = os.path.relpath(filename)
+    if path.startswith('..'):
+        path = filename
+    return f"{path}:{lineno}({name})"
+
+
+def profile_table(profiler, top=TOP_FUNCTIONS):
+    """Rich table with the functions with most own time, over all units."""
+    from rich.table import Table
+    from rich.text import Text
+    table = Table(title=f"top {top} functions by own time ({profiler.files} profiles"
+                        f" in {cache.PROFILES_DIR})",
+                  title_justify="left", box=None, pad_edge=False)
+    table.add_column("calls", justify="right")
+    table.add_column("own time", justify="right", style="bold")
+    table.add_column("cumulative", justify="right")
+    table.add_column("function")
+    if profiler.combined is None:
+        return table
+    # stats: {func: (primitive calls, calls, own time, cumulative time, callers)}
+    rows = sorted(profiler.combined.stats.items(), key=lambda item: item[1][2], reverse=True)
+    for func, (_, calls, own, cumulative, _) in rows[:top]:
+        table.add_row(str(calls), f"{own:.3f}s", f"{cumulative:.3f}s", Text(_function_name(func)))
+    return table
@@ -0,0 +1,190 @@
+"""
+Machine-readable reports: JSON lines and JUnit XML.
+
+Reporters receive one event (a dict) per finished test and write it right
+away, flushed, so a run that crashes or is killed still leaves a usable
+partial report. Nothing is accumulated in memory.
+
+Test event keys: `id`, `module`, `outcome` (passed, failed, error, skipped,
+expected_failure, unexpected_success), `duration` (seconds), and for
+failures/errors `exception`, `message`, `traceback`, `stdout`, `stderr`.
+
+Warnings collected during the run (see runner.WarningCollector) are written
+when the report is closed, aggregated: `category`, `message`, `filename`,
+`lineno`, `count` and `tests` (ids of the first tests that emitted them).
+"""
+
+import json
+import re
+import sys
+from xml.sax.saxutils import escape, quoteattr
+
+from .internals import fixture_error
+
+
+def summary(result):
+    """Return the final counts of a test run (a unittest.TestResult)."""
+    return {
+        'tests': result.testsRun,
+        'failures': len(result.failures),
+        'errors': len(result.errors),
+        'skipped': len(result.skipped),
+        'expected_failures': len(result.expectedFailures),
+        'unexpected_successes': len(result.unexpectedSuccesses),
+        'successful': result.wasSuccessful(),
+    }
+
+
+def _fixture_module(fixture, name):
+    """Module of the `fixture` (e.g. "setUpClass") of the module or class `name`."""
+    if fixture.endswith('Module'):
+        return name
+    # The longest prefix of the class name that is a module (test classes can be nested)
+    module = name
+    while '.' in module:
+        module = module.rpartition('.')[0]
+        if module in sys.modules:
+            return module
+    return name.rpartition('.')[0]
+
+
+def test_event(test, outcome, duration, err=None, details=None, message=None, stdout='', stderr=''):
+    """Return the event of a finished test: `err` is its exc_info, `details` the formatted error."""
+    # Errors of fixtures are reported with a placeholder test from unittest.suite
+    fixture = fixture_error(test.id())
+    event = {
+        'id': test.id(),
+        'module': _fixture_module(*fixture) if fixture else test.__module__,
+        'outcome': outcome,
+        'duration': round(duration, 6),
+    }
+    if err is not None:
+        event['exception'] = err[0].__name__
+        message = str(err[1]).split('\n', 1)[0]
+        event['traceback'] = details
+        event['stdout'] = stdout
+        event['stderr'] = stderr
+    if message is not None:
+        event['message'] = message
+    return event
+
+
+class JsonlReporter:
+    """Write one JSON object per line: test events, then a summary."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')  # noqa: SIM115, closed by close()
+
+    def add(self, event):
+        self._file.write(json.dumps({'event': 'test', **event}) + '\n')
+        self._file.flush()
+
+    def close(self, summary=None, warnings=()):
+        """Close the report; `summary` is None if the run did not complete."""
+        for warning in warnings:
+            self._file.write(json.dumps({'event': 'warning', **warning}) + '\n')
+        if summary is not None:
+            self._file.write(json.dumps({'event': 'summary', **summary}) + '\n')
+        self._file.close()
+
+
+# Characters not allowed in XML 1.0 documents.
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+
+# Element of the test cases that did not pass, by outcome
+_ELEMENTS = {
+    'failed': 'failure',
+    'error': 'error',
+    'unexpected_success': 'failure',
+}
+
+
+def _xml_text(text):
+    return escape(_INVALID_XML.sub('\ufffd', text))
+
+
+def _xml_attr(text):
+    return quoteattr(_INVALID_XML.sub('\ufffd', text))
+
+
+class JUnitXmlReporter:
+    """Write JUnit XML, a single <testsuite> with one <testcase> per test.
+
+    After each test case the closing tags are written too, then the file
+    position moves back before them. The suite header is padded to a fixed
+    width, so its counters can be rewritten in place. The file is a complete
+    document after every test.
+    """
+
+    _HEADER_WIDTH = 160
+    _FOOTER = '</testsuite>\n</testsuites>\n'
+
+    def __init__(self, path, name='rut'):
+        self.path = path
+        self.name = name
+        self._counts = {'tests': 0, 'failures': 0, 'errors': 0, 'skipped': 0}
+        self._time = 0.0
+        self._file = open(path, 'w', encoding='utf-8')  # noqa: SIM115, closed by close()
+        self._file.write('<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n')
+        self._header_pos = self._file.tell()
+        self._write_header()
+
+    def _write_header(self):
+        attrs = ' '.join(f'{k}="{v}"' for k, v in self._counts.items())
+        header = f'<testsuite name={_xml_attr(self.name)} {attrs} time="{self._time:.3f}"'
+        self._file.write(header.ljust(self._HEADER_WIDTH) + '>\n')
+
+    def add(self, event):
+        outcome = event['outcome']
+        self._counts['tests'] += 1
+        if outcome in ('failed', 'unexpected_success'):
+            self._counts['failures'] += 1
+        elif outcome == 'error':
+            self._counts['errors'] += 1
+        elif outcome == 'skipped':
+            self._counts['skipped'] += 1
+        self._time += event['duration']
+
+        test_id = event['id']
+        fixture = fixture_error(test_id)
+        if fixture:
+            # "setUpClass (pkg.module.Class)", "setUpModule (pkg.module)"
+            name, classname = fixture
+        else:
+            # "pkg.module.Class.test_name (subtest params)"
+            classname = test_id.split(' ', 1)[0].rpartition('.')[0]
+            name = test_id[len(classname) + 1:] if classname else test_id
+        parts = [(f'<testcase classname={_xml_attr(classname)} name={_xml_attr(name)}'
+                  f' time="{event["duration"]:.6f}"')]
+        element = _ELEMENTS.get(outcome)
+        if element:
+            parts.append(f'>\n<{element} type={_xml_attr(event.get("exception", ""))}'
+                         f' message={_xml_attr(event.get("message", ""))}>'
+                         f'{_xml_text(event.get("traceback", ""))}</{element}>\n')
+            for stream in ('stdout', 'stderr'):
+                if event.get(stream):
+                    tag = 'system-out' if stream == 'stdout' else 'system-err'
+                    parts.append(f'<{tag}>{_xml_text(event[stream])}</{tag}>\n')
+            parts.append('</testcase>\n')
+        elif outcome == 'skipped':
+            parts.append(f'>\n<skipped message={_xml_attr(event.get("message", ""))}/>\n</testcase>\n')
+        else:
+            parts.append('/>\n')
+
+        self._file.write(''.join(parts))
+        end = self._file.tell()
+        self._file.write(self._FOOTER)
+        self._file.seek(self._header_pos)
+        self._write_header()
+        self._file.seek(end)
+        self._file.flush()
+
+    def close(self, summary=None, warnings=()):
+        if warnings:
+            text = '\n'.join(f"{w['filename']}:{w['lineno']}: {w['category']}: {w['message']}"
+                             f" (x{w['count']})" for w in warnings)
+            self._file.write(f'<system-err>{_xml_text(text)}</system-err>\n')
+        self._file.write(self._FOOTER)
+        self._file.close()
@@ -0,0 +1,129 @@
+"""
+Reruns of failing tests (`--reruns N`) and quarantine.
+
+When the run ends, before its failures and summary are printed, the tests
+that failed are run again, up to N times: in the same process (with their
+class and module fixtures), or with `--rerun-fresh` in a new process for
+each rerun (see isolated.py). Errors in class or module fixtures are not
+rerun.
+
+A test that passes on a rerun is flaky: its failure is removed from the
+result, so it doesn't fail the run, and it is listed and counted in the
+summary. Failures of tests in the `quarantine` config list (test ids, or
+module and class names) are removed from the result too and listed
+separately.
+
+Flake statistics are kept in `.rut_cache/flakes.json`: for each test that
+failed in a run with reruns, the number of runs where it then passed
+(`flaky`) or kept failing (`failed`). Entries not updated for MAX_AGE are
+dropped.
+"""
+
+import time
+import unittest
+
+from .cache import load_flakes, save_flakes
+
+MAX_AGE = 30 * 24 * 3600  # seconds
+
+
+def failed_ids(result):
+    """Ids of the failing tests of `result`, in order. A sub-test gives its test."""
+    ids = {}
+    for test, _ in result.errors + result.failures:
+        test = getattr(test, 'test_case', test)
+        if isinstance(test, unittest.TestCase):  # not a fixture error
+            ids[test.id()] = None
+    return list(ids)
+
+
+class _PassedResult(unittest.TestResult):
+    def __init__(self, monitors=()):
+        super().__init__()
+        self.buffer = True  # the output of reruns is not shown
+        self.passed = set()
+        self.monitors = monitors
+
+    def startTest(self, test):
+        super().startTest(test)
+        for monitor in self.monitors:
+            monitor.start_test(test)
+
+    def stopTest(self, test):
+        for monitor in reversed(self.monitors):
+            monitor.stop_test(test)
+        super().stopTest(test)
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.passed.add(test.id())
+
+
+def run_in_process(test_ids, monitors=()):
+    """Run `test_ids` (already imported). Return the ids of the tests that passed.
+
+    `monitors` are notified when each test starts and stops, like in the run.
+    """
+    result = _PassedResult(monitors)
+    unittest.defaultTestLoader.loadTestsFromNames(test_ids).run(result)
+    return result.passed
+
+
+def rerun(test_ids, reruns, run=run_in_process):
+    """Run the failing `test_ids` up to `reruns` times with `run(ids) -> passed ids`.
+
+    Return (flaky, failing): the ids that passed on a rerun, and the others.
+    """
+    flaky = []
+    failing = list(test_ids)
+    for _ in range(reruns):
+        if not failing:
+            break
+        passed = run(failing) or set()
+        flaky += [test_id for test_id in failing if test_id in passed]
+        failing = [test_id for test_id in failing if test_id not in passed]
+    return flaky, failing
+
+
+def is_quarantined(test_id, quarantine):
+    return any(test_id == name or test_id.startswith(name + '.') for name in quarantine)
+
+
+def discard_failures(result, test_ids):
+    """Remove the failures and errors of `test_ids` (and their sub-tests) from `result`."""
+    test_ids = set(test_ids)
+
+    def kept(test):
+        return getattr(test, 'test_case', test).id() not in test_ids
+
+    result.failures[:] = [(test, err) for test, err in result.failures if kept(test)]
+    result.errors[:] = [(test, err) for test, err in result.errors if kept(test)]
+
+
+def record_flakes(flaky, failing):
+    stats = load_flakes()
+    now = int(time.time())
+    for test_ids, key in ((flaky, 'flaky'), (failing, 'failed')):
+        for test_id in test_ids:
+            entry = stats.setdefault(test_id, {'flaky': 0, 'failed': 0})
+            entry[key] += 1
+            entry['t'] = now
+    for test_id in [test_id for test_id, entry in stats.items() if now - entry['t'] > MAX_AGE]:
+        del stats[test_id]
+    save_flakes(stats)
+
+
+def summary(flaky, quarantined):
+    """Rich markup listing flaky and quarantined tests, with their flake statistics."""
+    stats = load_flakes()
+    lines = []
+    if flaky:
+        lines.append(f"[yellow]{len(flaky)} flaky tests passed on rerun:[/yellow]")
+        for test_id in flaky:
+            entry = stats.get(test_id, {})
+            runs = entry.get('flaky', 0) + entry.get('failed', 0)
+            lines.append(f"  {test_id} [dim](flaky in {entry.get('flaky', 0)} of {runs} failing runs)[/dim]")
+    if quarantined:
+        lines.append(f"[yellow]{len(quarantined)} quarantined tests failed (not failing the run):[/yellow]")
+        lines += [f"  {test_id}" for test_id in quarantined]
+    return "\n".join(lines)
@@ -0,0 +1,120 @@
+"""
+Test result behaviour shared by RichTestResult (output.py) and the result
+of --no-color runs (runner.py).
+
+Both record the durations of modules (used for the ETA and by
+`should_save_durations`) and of passed tests (see history.py), notify the
+monitors when each test starts and stops (see RutRunner._monitors), send
+one event per finished test to the reporters (see reporters.py), and call
+a hook when the run ends, before the summary is printed.
+"""
+
+import time
+import unittest
+
+
+class ResultMixin:
+    """Mix in before a unittest.TestResult class.
+
+    `_monitors`, `_reporters` and `_before_summary` are set by the runner
+    before the run.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Wall time per module, from its first test to the next module's.
+        self.module_durations = {}
+        # Duration of each passed test, for the history (see history.py).
+        self.test_durations = {}
+        self._timing_module = None
+        self._module_start = 0.0
+        self._test_start = 0.0
+        # Notified when each test starts and stops: LeakDetector (--leaks),
+        # TestProfiler (--profile)...
+        self._monitors = []
+        # Machine-readable reports (see reporters.py), one event per test.
+        self._reporters = []
+        # Called with the result when the run ends, before the failures and
+        # the summary are printed (see RutRunner._rerun_failures).
+        self._before_summary = None
+
+    def _close_module_timer(self, now):
+        if self._timing_module is not None:
+            elapsed = now - self._module_start
+            self.module_durations[self._timing_module] = (
+                self.module_durations.get(self._timing_module, 0.0) + elapsed)
+            self._timing_module = None
+
+    def startTest(self, test):
+        super().startTest(test)
+        module = test.__module__
+        now = self._test_start = time.perf_counter()
+        if module != self._timing_module:
+            self._close_module_timer(now)
+            self._timing_module = module
+            self._module_start = now
+        for monitor in self._monitors:
+            monitor.start_test(test)
+
+    def stopTest(self, test):
+        for monitor in reversed(self._monitors):
+            monitor.stop_test(test)
+        super().stopTest(test)
+
+    def stopTestRun(self):
+        self._close_module_timer(time.perf_counter())
+        super().stopTestRun()
+        if self._before_summary:
+            self._before_summary(self)
+
+    def _captured_output(self, test):
+        """(stdout, stderr) captured while `test` ran, for the event of its failure."""
+        if self.buffer and self._stdout_buffer is not None:
+            return self._stdout_buffer.getvalue(), self._stderr_buffer.getvalue()
+        return '', ''
+
+    def _report(self, test, outcome, err=None, details=None, message=None):
+        """Send a test event to the reporters (--junit-xml, --report-jsonl)."""
+        if not self._reporters:
+            return
+        from .reporters import test_event
+        # Class/module fixture errors are reported without a startTest().
+        is_test = isinstance(test, unittest.TestCase)
+        duration = time.perf_counter() - self._test_start if is_test else 0.0
+        stdout, stderr = self._captured_output(test) if err is not None else ('', '')
+        event = test_event(test, outcome, duration, err, details, message, stdout, stderr)
+        for reporter in self._reporters:
+            reporter.add(event)
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.test_durations[test.id()] = time.perf_counter() - self._test_start
+        self._report(test, 'passed')
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self._report(test, 'failed', err, self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self._report(test, 'error', err, self.errors[-1][1])
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            if issubclass(err[0], test.failureException):
+                self._report(subtest, 'failed', err, self.failures[-1][1])
+            else:
+                self._report(subtest, 'error', err, self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self._report(test, 'skipped', message=reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self._report(test, 'expected_failure')
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self._report(test, 'unexpected_success', message='unexpected success')
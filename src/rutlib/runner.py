@@ -2,21 +2,51 @@
 RUT - test runner
 """
 
-import asyncio
+import collections
+import contextlib
 import gc
+import hashlib
 import importlib.util
 import inspect
+import json
 import os
 import pathlib
 import sys
 import unittest
 import warnings
+from typing import NamedTuple
 
-from import_deps import ModuleSet, topological_sort, get_all_imports
-from rich import print
-from rich.panel import Panel
+from .cache import compute_hash, get_modified_files, load_durations, load_fixture_costs
+from .capture import DEFAULT_CAPTURE_LIMIT
+from .internals import class_name, full_module_names
+from .results import ResultMixin
+from .timing import PhaseTimer, durations_table
 
-from .cache import get_modified_files
+
+def print(*args, **kwargs):
+    """rich.print, imported on first use to keep startup fast."""
+    from rich import print as rich_print
+    rich_print(*args, **kwargs)
+
+
+# Modules whose setUpModule/tearDownModule take at least this long (seconds)
+# are scheduled as a single unit, see RutRunner.schedule_units().
+EXPENSIVE_FIXTURE_SECONDS = 1.0
+
+
+def session_resources_env(test_dir):
+    """Name of the environment variable with the session resources of the
+    conftest.py in `test_dir`: runs of other test directories started during
+    the run (nested projects, tests of a test runner...) don't inherit them."""
+    digest = hashlib.sha256(os.path.realpath(test_dir).encode()).hexdigest()[:12]
+    return f"{SESSION_RESOURCES_ENV}_{digest}"
+
+
+class ScheduleUnit(NamedTuple):
+    """Tests that run contiguously, so their fixtures run only once."""
+    name: str  # module or class name
+    tests: list
+    fixture_cost: float  # seconds, stored by previous runs
 
 
 class RutError(Exception):
@@ -29,17 +59,32 @@ class InvalidAsyncTestError(RutError):
     pass
 
 
+# JSON descriptor returned by the conftest hook rut_session_resources(),
+# inherited by processes started during the run. The variable name ends with
+# a hash of the test directory, see session_resources_env().
+SESSION_RESOURCES_ENV = 'RUT_SESSION_RESOURCES'
+
+MAX_WARNINGS = 100  # distinct warnings kept by WarningCollector
+MAX_WARNING_TESTS = 3  # ids of the first tests that emitted a warning
+MAX_WARNING_MESSAGE = 500  # characters
+
+
 class WarningCollector:
     """
     Collects all warnings raised during a test run and allows custom filtering.
 
     This class has two primary functions:
-    1.  It installs a hook to capture all warnings, even those that might
-        normally be ignored by the default filtering, and prints them at
-        the end of the test run.
+    1.  It installs a hook to capture all warnings of the collected categories
+        (RuntimeWarning by default), even those that might normally be ignored
+        by the default filtering, and prints them at the end of the test run.
     2.  It allows the user to provide a list of custom warning filters to
         overwrite the default behavior, for example, to turn specific
         warnings into exceptions.
+
+    Warnings are aggregated by (category, message, location): each one is
+    shown once, with its number of occurrences and the ids of the first
+    tests that emitted it. At most `max_warnings` distinct warnings are kept,
+    the occurrences of other ones are only counted.
     """
     # TODO:
     # Print stack traces for warnings
@@ -47,9 +92,14 @@ class WarningCollector:
     # warnings.showwarning = lambda message, category, filename, lineno, file=None, line=None: \
     # print(f"{filename}:{lineno}: {category.__name__}: {message}")
 
-    def __init__(self):
+    def __init__(self, categories=(RuntimeWarning,), max_warnings=MAX_WARNINGS):
         self._original_show = None
-        self.collected = []
+        self.categories = tuple(categories)
+        self.max_warnings = max_warnings
+        # (category name, message, filename, lineno) -> {'count': int, 'tests': [test ids]}
+        self.collected = {}
+        self.dropped = 0  # occurrences of warnings over max_warnings
+        self._test_id = None
 
     def setup(self, extra):
         # unittest by default silent some warnings...
@@ -60,13 +110,13 @@ class WarningCollector:
         self._original_show = warnings.showwarning
 
         def _warn_collector(message, category, filename, lineno, file=None, line=None):
-            if category is RuntimeWarning:
-                self.collected.append((str(message), category, filename, lineno))
-            # always call original function
-            self._original_show(message, category, filename, lineno, file, line)
+            # Only the first occurrence of a collected warning is shown
+            if not issubclass(category, self.categories) or self._add(message, category, filename, lineno):
+                self._original_show(message, category, filename, lineno, file, line)
 
         warnings.showwarning = _warn_collector
-        warnings.filterwarnings("always", category=RuntimeWarning)
+        for category in self.categories:
+            warnings.filterwarnings("always", category=category)
 
         # Filter only my_specific_module warnings
         for spec in extra:
@@ -76,6 +126,26 @@ class WarningCollector:
                 module=spec['module'])
         gc.collect()
 
+    def _add(self, message, category, filename, lineno):
+        """Count an occurrence. Return True if it is the first one of this warning."""
+        key = (category.__name__, str(message)[:MAX_WARNING_MESSAGE], filename, lineno)
+        entry = self.collected.get(key)
+        if entry is None:
+            if len(self.collected) >= self.max_warnings:
+                self.dropped += 1
+                return False
+            entry = self.collected[key] = {'count': 0, 'tests': []}
+        entry['count'] += 1
+        if self._test_id and len(entry['tests']) < MAX_WARNING_TESTS and self._test_id not in entry['tests']:
+            entry['tests'].append(self._test_id)
+        return entry['count'] == 1
+
+    # Monitor interface (see RutRunner._monitors), attributes warnings to tests
+    def start_test(self, test):
+        self._test_id = test.id()
+
+    def stop_test(self, test):
+        self._test_id = None
 
     def cleanup(self):
         if self._original_show:
@@ -83,35 +153,266 @@ class WarningCollector:
             self._original_show = None
             warnings.resetwarnings()
 
+    def events(self):
+        """The aggregated warnings, as report events (see reporters.py)."""
+        return [{'category': category, 'message': message, 'filename': filename, 'lineno': lineno,
+                 'count': entry['count'], 'tests': entry['tests']}
+                for (category, message, filename, lineno), entry in self.collected.items()]
+
     def print_warnings(self):
         if self.collected:
+            from rich.markup import escape
+            from rich.panel import Panel
+            lines = []
+            for event in self.events():
+                line = (f"[yellow]{event['category']}[/yellow]: {escape(event['message'])}"
+                        f" at [cyan]{escape(event['filename'])}:{event['lineno']}[/cyan]")
+                if event['count'] > 1:
+                    line += f" [bold]x{event['count']}[/bold]"
+                if event['tests']:
+                    more = ", ..." if len(event['tests']) == MAX_WARNING_TESTS else ""
+                    line += f"\n    [dim]in {', '.join(event['tests'])}{more}[/dim]"
+                lines.append(line)
+            if self.dropped:
+                lines.append(f"[dim]{self.dropped} more occurrences of other warnings not kept"
+                             f" (max {self.max_warnings})[/dim]")
             print(Panel(
-                '\n'.join(
-                    f"[yellow]{w[1].__name__}[/yellow]: {w[0]} at [cyan]{w[2]}:{w[3]}[/cyan]"
-                    for w in self.collected
-                ),
+                '\n'.join(lines),
                 title="[bold yellow]Collected Warnings[/bold yellow]",
                 expand=False,
             ))
 
 
+def _evict_module(name):
+    """Remove a module from sys.modules and from its parent package."""
+    module = sys.modules.pop(name, None)
+    parent_name, _, child = name.rpartition('.')
+    parent = sys.modules.get(parent_name)
+    if module is not None and getattr(parent, child, None) is module:
+        delattr(parent, child)
+
+
+class StreamingSuite(unittest.TestSuite):
+    """Flat suite that creates TestCase instances only when iterated.
+
+    Holds (class, method name) pairs grouped by module, in execution order.
+    While running, each test is instantiated right before it runs and
+    nothing in the suite refers to it, or to its module's classes,
+    afterwards. With `evict_modules`, test modules that already ran are
+    removed from sys.modules, two modules behind: unittest calls a module's
+    tearDownModule only when the next module starts. A module with tests
+    left to run later in the plan is not evicted: unittest would not find
+    it to run its setUpModule again. Eviction waits for the progress output
+    of the module to be rendered, which needs its file path.
+
+    Tests whose class has a custom __init__ (e.g. created by a `load_tests`
+    function) are kept as instances.
+
+    With a `blocker` (see blocking.py), each module is checked before it
+    starts: blocked modules are skipped, or deferred to the end of the run.
+    """
+
+    def __init__(self, tests=(), evict_modules=False, blocker=None):
+        super().__init__()
+        self.evict_modules = evict_modules
+        self.blocker = blocker
+        self._plan = []  # [(module, [test or (class, method name)])]
+        self._count = 0
+        self._running = False
+        self._result = None
+        for test in tests:
+            self.addTest(test)
+
+    def addTest(self, test):
+        if isinstance(test, unittest.TestSuite):
+            for t in test:
+                self.addTest(t)
+            return
+        entry = test
+        if type(test).__init__.__module__.startswith('unittest.'):
+            entry = (type(test), test._testMethodName)
+        module = test.__module__
+        if not self._plan or self._plan[-1][0] != module:
+            self._plan.append((module, []))
+        self._plan[-1][1].append(entry)
+        self._count += 1
+
+    def countTestCases(self):
+        return self._count
+
+    def __iter__(self):
+        return self._iter_tests(running=self._running)
+
+    def _iter_tests(self, running):
+        ran = []
+        deferred = []
+        # Orderings (--failure-first) may split a module: it is evicted only
+        # once none of its tests are left to run.
+        remaining = collections.Counter(item[0] for item in self._plan if item is not None)
+        for index, item in enumerate(self._plan):
+            if item is None:
+                continue
+            module, entries = item
+            if running:
+                self._plan[index] = None
+                blocking = self.blocker and self.blocker.blocked_by(module, self._result)
+                if blocking and self.blocker.mode == 'defer':
+                    deferred.append(item)
+                    continue
+                remaining[module] -= 1
+                if blocking:
+                    self._skip(entries, f"blocked by failing {blocking}")
+                    continue
+                if self.evict_modules:
+                    ran.append(module)
+                    if len(ran) > 2:
+                        previous = ran.pop(0)
+                        if not remaining[previous] and previous not in ran:
+                            self._evict(previous)
+            for entry in entries:
+                yield self._instance(entry)
+        for module, entries in deferred:
+            for entry in entries:
+                yield self._instance(entry)
+
+    def _evict(self, module):
+        """Evict `module`, after the result rendered the progress output queued so far."""
+        after_rendering = getattr(self._result, 'after_rendering', None)
+        if after_rendering:
+            after_rendering(_evict_module, module)
+        else:
+            _evict_module(module)
+
+    @staticmethod
+    def _instance(entry):
+        return entry if isinstance(entry, unittest.TestCase) else entry[0](entry[1])
+
+    def _skip(self, entries, reason):
+        """Report tests as skipped without running them, or their fixtures."""
+        for entry in entries:
+            test = self._instance(entry)
+            self._result.startTest(test)
+            self._result.addSkip(test, reason)
+            self._result.stopTest(test)
+
+    def _removeTestAtIndex(self, index):
+        # Tests are not stored, nothing to release.
+        pass
+
+    def run(self, result, debug=False):
+        self._running = True
+        self._result = result
+        try:
+            return super().run(result, debug)
+        finally:
+            self._running = False
+            self._result = None
+
+
+def _plain_text_result(monitors, reporters, before_summary=None):
+    """TextTestResult class of --no-color runs.
+
+    Like RichTestResult, it notifies `monitors` (see RutRunner._monitors),
+    sends test events to `reporters`, records the durations of modules
+    and passed tests, and calls `before_summary` (see results.py).
+    """
+
+    class PlainTextTestResult(ResultMixin, unittest.TextTestResult):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._monitors = monitors
+            self._reporters = reporters
+            self._before_summary = before_summary
+
+    return PlainTextTestResult
+
+
 class RutRunner:
-    def __init__(self, test_dir, keyword, failfast, capture, warning_filters, alpha=False, source_dirs=None, verbose=False, debug=False, changed=False, test_path=None):
+    def __init__(self, test_dir, keyword, failfast, capture, warning_filters, alpha=False,
+                 source_dirs=None, verbose=False, debug=False, changed=False, test_path=None,
+                 live=False, capture_limit=DEFAULT_CAPTURE_LIMIT, junit_xml=None, report_jsonl=None,
+                 durations=None, max_failures_per_group=None, evict_modules=False,
+                 leaks=None, leak_threshold_kb=None, profile=None, sample_profile=False,
+                 timeout=None, module_timeout=None, memory_limit_mb=None,
+                 bench=None, bench_rounds=None, bench_tolerance=None, coverage=None,
+                 warning_categories=(RuntimeWarning,), max_warnings=MAX_WARNINGS,
+                 failure_first=False, short_circuit=None, reruns=0, rerun_fresh=False, quarantine=()):
         self.test_dir = test_dir
         self.test_path = test_path
         self.keyword = keyword
         self.failfast = failfast
         self.capture = capture
         self.warning_filters = warning_filters
+        self.warning_categories = warning_categories
+        self.max_warnings = max_warnings
         self.alpha = alpha
+        self.failure_first = failure_first
+        # --short-circuit: "skip" or "defer" modules blocked by failing foundations
+        self.short_circuit = short_circuit
+        self.blocker = None
+        # --reruns N of failing tests, in a new process with --rerun-fresh (see reruns.py)
+        self.reruns = reruns
+        self.rerun_fresh = rerun_fresh
+        self.quarantine = quarantine
         self.source_dirs = source_dirs or ["src", "tests"]
         self.verbose = verbose
         self.debug = debug
         self.changed = changed
+        self.live = live
+        self.capture_limit = capture_limit
+        self.junit_xml = junit_xml
+        self.report_jsonl = report_jsonl
+        # --durations N: number of slowest items to show (0 for all)
+        self.durations = durations
+        self.phase_timer = PhaseTimer() if durations is not None else None
+        # Module and class fixture costs are measured on every run
+        self.fixture_timer = self.phase_timer if self.phase_timer is not None else PhaseTimer()
+        self.schedule_units = []
+        self.max_failures_per_group = max_failures_per_group
+        self.evict_modules = evict_modules
+        # --leaks: "test" or "module" granularity
+        self.leak_detector = None
+        if leaks:
+            from .leaks import DEFAULT_THRESHOLD_KB, LeakDetector
+            if leak_threshold_kb is None:
+                leak_threshold_kb = DEFAULT_THRESHOLD_KB
+            self.leak_detector = LeakDetector(leaks, leak_threshold_kb)
+        # --profile: "test" or "module" granularity
+        self.profiler = None
+        if profile:
+            from .profiling import TestProfiler
+            self.profiler = TestProfiler(profile)
+        self.sampler = None
+        if sample_profile:
+            from .sampling import SamplingProfiler
+            self.sampler = SamplingProfiler()
+        # --bench[=save]: run the bench_* methods instead of the tests
+        self.benchmarker = None
+        if bench:
+            from .bench import DEFAULT_ROUNDS, DEFAULT_TOLERANCE, Benchmarker
+            self.benchmarker = Benchmarker(
+                save=bench == 'save',
+                rounds=DEFAULT_ROUNDS if bench_rounds is None else bench_rounds,
+                tolerance=DEFAULT_TOLERANCE if bench_tolerance is None else bench_tolerance,
+            )
+        # --cov: CoverageRun, switching the coverage context per test module
+        self.coverage = coverage
+        # Time and memory budgets, also enabled by load_tests() if a test
+        # class or module sets its own (see watchdog.py).
+        self.budgets = {'timeout': timeout, 'module_timeout': module_timeout,
+                        'memory_limit_mb': memory_limit_mb}
+        self.watchdog = None
+        if any(self.budgets.values()):
+            self._enable_watchdog()
         self.module_filepaths = {}
+        self.module_imports = {}
         self.module_all_imports = {}
         self.conftest = self._load_conftest()
 
+    def _enable_watchdog(self):
+        from .watchdog import Watchdog
+        self.watchdog = Watchdog(**self.budgets)
+
     def _load_conftest(self):
         conftest_path = os.path.join(self.test_dir, "conftest.py")
         if not os.path.exists(conftest_path):
@@ -121,16 +422,50 @@ class RutRunner:
         spec.loader.exec_module(conftest)
         return conftest
 
-    def _run_hook(self, hook_name):
+    def _run_hook(self, hook_name, *args):
         if not self.conftest:
-            return
+            return None
         hook = getattr(self.conftest, hook_name, None)
         if not hook:
+            return None
+        if inspect.iscoroutinefunction(hook):
+            import asyncio
+            return asyncio.run(hook(*args))
+        return hook(*args)
+
+    def _start_session(self):
+        """Run the session hooks, or only rut_worker_setup() in a process
+        started by a run that already created the session resources.
+
+        Once rut_session_setup() succeeded, rut_session_teardown() runs even
+        if a later hook raises.
+        """
+        self._session_env = session_resources_env(self.test_dir)
+        inherited = os.environ.get(self._session_env)
+        self._owns_session = inherited is None
+        if not self._owns_session:
+            self._run_hook("rut_worker_setup", json.loads(inherited))
             return
-        if asyncio.iscoroutinefunction(hook):
-            asyncio.run(hook())
-        else:
-            hook()
+        self._run_hook("rut_session_setup")
+        try:
+            resources = self._run_hook("rut_session_resources")
+            if resources is None:
+                return
+            try:
+                os.environ[self._session_env] = json.dumps(resources)
+            except TypeError as exc:
+                raise RutError(f"rut_session_resources() must return JSON serializable data: {exc}") from None
+            self._run_hook("rut_worker_setup", resources)
+        except BaseException:
+            self._end_session()
+            raise
+
+    def _end_session(self):
+        if self._owns_session:
+            try:
+                self._run_hook("rut_session_teardown")
+            finally:
+                os.environ.pop(self._session_env, None)
 
     @staticmethod
     def _check_import_errors(suite):
@@ -176,6 +511,35 @@ class RutRunner:
         3) actual tests
         """
         loader = unittest.TestLoader()
+        if self.benchmarker:
+            from .bench import PREFIX
+            loader.testMethodPrefix = PREFIX
+        discover_dir, pattern = self._discover_dir(pattern)
+        with self._timing('timing_imports'):
+            suite = loader.discover(discover_dir, pattern=pattern)
+        self._check_import_errors(suite)
+        modified_files = None
+        if self.changed or self.failure_first:
+            modified_files = get_modified_files(self.source_dirs)
+        suite = self.sort_tests(suite, modified_files)
+        if self.keyword:
+            suite = self._filter_keyword(suite, self.keyword)
+        if self.changed:
+            suite, self.uptodate_modules = self._filter_modified(suite, modified_files)
+        else:
+            self.uptodate_modules = {}
+        self._check_async(suite)
+        if self.watchdog is None and self._declares_budgets(suite):
+            self._enable_watchdog()
+        if self.short_circuit:
+            from .blocking import Blocker
+            self.blocker = Blocker(self._source_dependencies(self.sorted_modules), self.short_circuit)
+        # Drop the TestCase instances created by discovery, tests are
+        # instantiated again right before they run.
+        return StreamingSuite(suite, evict_modules=self.evict_modules, blocker=self.blocker)
+
+    def _discover_dir(self, pattern):
+        """Return the (directory, pattern) of discovery, from test_dir and test_path."""
         discover_dir = self.test_dir
         if self.test_path:
             if os.path.isfile(self.test_path):
@@ -183,22 +547,75 @@ class RutRunner:
                 discover_dir = discover_dir or "."
             elif os.path.isdir(self.test_path):
                 discover_dir = self.test_path
-        suite = loader.discover(discover_dir, pattern=pattern)
+        return discover_dir, pattern
+
+    def load_ids(self, test_ids):
+        """Return a suite running the tests `test_ids`, in that order (`--ids`).
+
+        Test modules are imported from the top level directory of discovery.
+        """
+        top_level = os.path.abspath(self._discover_dir("test*.py")[0])
+        if top_level not in sys.path:
+            sys.path.insert(0, top_level)
+        suite = unittest.TestLoader().loadTestsFromNames(test_ids)
         self._check_import_errors(suite)
-        suite = self.sort_tests(suite)
-        if self.keyword:
-            suite = self._filter_keyword(suite, self.keyword)
-        if self.changed:
-            modified_files = get_modified_files(self.source_dirs)
-            suite, self.uptodate_modules = self._filter_modified(suite, modified_files)
-        else:
-            self.uptodate_modules = {}
         self._check_async(suite)
-        return suite
+        self.uptodate_modules = {}
+        self.sorted_modules = list(dict.fromkeys(test.__module__ for test in self.flatten(suite)))
+        return StreamingSuite(suite, evict_modules=self.evict_modules)
+
+    def bisect(self, suite, target):
+        """Return the tests preceding `target` in `suite` that make it fail (`--bisect`).
+
+        The runs of the search share the session resources of this process.
+        """
+        from .bisection import bisect
+        self._start_session()
+        try:
+            return bisect([test.id() for test in suite], target, self.test_path)
+        finally:
+            self._end_session()
+
+    def _timing(self, name):
+        """PhaseTimer context manager `name`, if --durations is enabled."""
+        if self.phase_timer is None:
+            return contextlib.nullcontext()
+        return getattr(self.phase_timer, name)()
+
+    def _monitors(self):
+        """Objects notified by RichTestResult when each test starts and stops."""
+        monitors = (self.leak_detector, self.profiler, self.sampler, self.watchdog)
+        return [m for m in monitors if m is not None]
+
+    def _print_leaks(self):
+        from .leaks import leaks_table
+        detector = self.leak_detector
+        if detector.leaks:
+            print(leaks_table(detector))
+        else:
+            print(f"[green]No {detector.granularity} retained more than "
+                  f"{detector.threshold // 1024} KB.[/green]")
+
+    def _open_reporters(self):
+        from .reporters import JsonlReporter, JUnitXmlReporter
+        reporters = []
+        if self.junit_xml:
+            reporters.append(JUnitXmlReporter(self.junit_xml))
+        if self.report_jsonl:
+            reporters.append(JsonlReporter(self.report_jsonl))
+        return reporters
 
     def run_tests(self, suite, runner_class=None):
-        self._run_hook("rut_session_setup")
+        self._start_session()
+        reporters = []
+        result = None
+        wc = WarningCollector(self.warning_categories, self.max_warnings)
+        monitors = self._monitors() + [wc]
+        rerun = None
+        if (self.reruns or self.quarantine) and not self.benchmarker:
+            rerun = self._rerun_failures
         try:
+            reporters = self._open_reporters()
             if runner_class:
                 runner = runner_class(
                     failfast=self.failfast,
@@ -206,20 +623,86 @@ class RutRunner:
                     uptodate_modules=self.uptodate_modules,
                     verbose=self.verbose,
                     module_order=getattr(self, 'sorted_modules', None),
+                    live=self.live,
+                    expected_durations=load_durations() if self.live else None,
+                    capture_limit=self.capture_limit,
+                    reporters=reporters,
+                    max_failures_per_group=self.max_failures_per_group,
+                    monitors=monitors,
+                    before_summary=rerun,
                 )
             else:
                 runner = unittest.TextTestRunner(
                     verbosity=2,
                     failfast=self.failfast,
                     buffer=not self.capture,
+                    resultclass=_plain_text_result(monitors, reporters, rerun),
                 )
-            wc = WarningCollector()
             wc.setup(extra=self.warning_filters)
-            result = runner.run(suite)
+            with self._timing('timing_run'), contextlib.ExitStack() as monitoring:
+                if self.phase_timer is None:
+                    monitoring.enter_context(self.fixture_timer.timing_fixtures())
+                for monitor in self._monitors():
+                    monitoring.enter_context(monitor.running())
+                if self.benchmarker:
+                    monitoring.enter_context(self.benchmarker.running())
+                if self.coverage:
+                    monitoring.enter_context(self.coverage.running())
+                result = runner.run(suite)
             wc.print_warnings()
+            if self.blocker and self.blocker.blocked:
+                print(f"[yellow]{self.blocker.summary()}[/yellow]")
+            if self.phase_timer:
+                print(durations_table(self.phase_timer, self.durations))
+            if self.leak_detector:
+                self._print_leaks()
+            if self.profiler:
+                from .profiling import profile_table
+                print(profile_table(self.profiler))
+            if self.benchmarker:
+                from .bench import bench_table
+                print(bench_table(self.benchmarker))
+            if self.sampler:
+                from .cache import SAMPLES_DIR
+                print(f"[dim]{self.sampler.samples} stack samples (every "
+                      f"{self.sampler.interval * 1000:g} ms) written to {SAMPLES_DIR}/ "
+                      f"(collapsed stacks, e.g. flamegraph.pl {SAMPLES_DIR}/run.collapsed > run.svg)[/dim]")
             return result
         finally:
-            self._run_hook("rut_session_teardown")
+            if reporters:
+                from .reporters import summary
+                for reporter in reporters:
+                    reporter.close(summary(result) if result else None, warnings=wc.events())
+            self._end_session()
+
+    def _rerun_failures(self, result):
+        """Rerun failing tests, then discard the failures of flaky and quarantined tests.
+
+        Called by the result when the run ends (see results.py), so that the
+        failures and the summary printed next leave them out.
+        """
+        from . import reruns
+        failing = reruns.failed_ids(result)
+        flaky = []
+        if self.reruns and failing:
+            if self.rerun_fresh:
+                from . import isolated
+
+                def run(test_ids):
+                    return isolated.run(test_ids, self.test_path)
+            else:
+                # Same budgets as in the run, still watched: reruns run before its end
+                monitors = [self.watchdog] if self.watchdog else []
+
+                def run(test_ids):
+                    return reruns.run_in_process(test_ids, monitors)
+            flaky, failing = reruns.rerun(failing, self.reruns, run)
+            reruns.record_flakes(flaky, failing)
+        quarantined = [test_id for test_id in failing if reruns.is_quarantined(test_id, self.quarantine)]
+        reruns.discard_failures(result, flaky + quarantined)
+        result.flaky, result.quarantined = flaky, quarantined
+        if flaky or quarantined:
+            print(reruns.summary(flaky, quarantined))
 
     @classmethod
     def _filter_keyword(cls, suite, keyword, level=1):
@@ -253,23 +736,15 @@ class RutRunner:
             uptodate = {}
 
         # Build set of modified module names from filepaths
-        modified_modules = set()
-        filepath_to_module = {fp: mod for mod, fp in self.module_filepaths.items()}
-        for fp in modified_files:
-            if fp in filepath_to_module:
-                modified_modules.add(filepath_to_module[fp])
+        modified_modules = self._modified_modules(modified_files)
 
         if self.debug:
             print("[DEBUG --changed] Modified modules:", modified_modules)
             print("[DEBUG --changed] All tracked modules:", set(self.module_filepaths.keys()))
 
         # Build mapping: short module name -> full module name
-        short_to_full = {}
+        short_to_full = full_module_names(self.module_all_imports)
         seen_modules = set()
-        for mod_name in self.module_all_imports:
-            short_name = mod_name.rsplit('.', 1)[-1]
-            if short_name not in short_to_full:
-                short_to_full[short_name] = mod_name
 
         filtered = unittest.TestSuite()
         for test in suite:
@@ -318,6 +793,18 @@ class RutRunner:
                             f'Testing method is a coroutine but class is not a `unittest.IsolatedAsyncioTestCase` => {test.id()}'
                         )
 
+    @classmethod
+    def _declares_budgets(cls, suite):
+        """Whether a test class or module sets its own time or memory budget."""
+        for test in suite:
+            if isinstance(test, unittest.TestSuite):
+                if cls._declares_budgets(test):
+                    return True
+            elif (getattr(test, 'rut_timeout', None) or getattr(test, 'rut_memory_limit_mb', None)
+                  or getattr(sys.modules.get(test.__module__), 'rut_module_timeout', None)):
+                return True
+        return False
+
     @staticmethod
     def test_pos_key(test):
         """return tuple to used as key to sort unit tests"""
@@ -335,13 +822,17 @@ class RutRunner:
                 flat.addTest(test)
         return flat
 
-    def sort_tests(self, suite):
+    def sort_tests(self, suite, modified_files=None):
         """Sort tests by topological order of import dependencies.
 
         Tests for modules with fewer dependencies run first.
-        Within each module, tests run in source line order.
+        Within each module, tests run in source line order, grouped by class
+        so that class fixtures run once (classes sharing test methods of a
+        mixin would be interleaved otherwise).
 
         If self.alpha is True, use alphabetical ordering instead.
+        If self.failure_first is True, the schedule units are then ordered by
+        failure likelihood (see ordering.py), using `modified_files`.
         """
         flat_suite = self.flatten(suite)
 
@@ -351,9 +842,13 @@ class RutRunner:
             mod = test.__module__
             tests_by_module.setdefault(mod, []).append(test)
 
-        # Sort tests within each module by line number
-        for tests in tests_by_module.values():
+        # Sort tests within each module by line number, keeping classes together
+        for mod, tests in tests_by_module.items():
             tests.sort(key=self.test_pos_key)
+            by_class = {}
+            for test in tests:
+                by_class.setdefault(test.__class__, []).append(test)
+            tests_by_module[mod] = [test for class_tests in by_class.values() for test in class_tests]
 
         if self.alpha:
             # Alphabetical ordering (legacy)
@@ -363,16 +858,82 @@ class RutRunner:
             sorted_modules = self._get_topological_order(tests_by_module.keys())
 
         self.sorted_modules = list(sorted_modules)
+        self.schedule_units = self._schedule_units(self.sorted_modules, tests_by_module)
+        if self.failure_first:
+            from .ordering import failure_first
+            self.schedule_units = failure_first(
+                self.schedule_units, self._modified_modules(modified_files or ()),
+                self.module_imports, self.module_all_imports, self.module_filepaths)
+            # Modules in order of their first unit (position of up-to-date modules in the output)
+            self.sorted_modules = list(dict.fromkeys(
+                [unit.tests[0].__module__ for unit in self.schedule_units] + self.sorted_modules))
 
         # Build final suite
         pos_suite = unittest.TestSuite()
-        for mod_name in sorted_modules:
-            if mod_name in tests_by_module:
-                for test in tests_by_module[mod_name]:
-                    pos_suite.addTest(test)
+        for unit in self.schedule_units:
+            for test in unit.tests:
+                pos_suite.addTest(test)
 
         return pos_suite
 
+    def _source_dependencies(self, test_modules):
+        """Return {test module: modules it imports, transitively, other than test modules}."""
+        short_to_full = full_module_names(self.module_all_imports)
+        full_names = {short_to_full.get(module, module) for module in test_modules}
+        return {module: self.module_all_imports.get(short_to_full.get(module, module), set()) - full_names
+                for module in test_modules}
+
+    def _modified_modules(self, modified_files):
+        """Names of the modules of the import graph whose file is in `modified_files`."""
+        filepath_to_module = {fp: mod for mod, fp in self.module_filepaths.items()}
+        return {filepath_to_module[fp] for fp in modified_files if fp in filepath_to_module}
+
+    @staticmethod
+    def _schedule_units(sorted_modules, tests_by_module):
+        """Split modules into the units that orderings may move, see ScheduleUnit.
+
+        A module with expensive module fixtures (stored costs, see timing.py)
+        is one unit; other modules are split at class level. A class is never
+        split.
+        """
+        costs = load_fixture_costs()
+        units = []
+        for module in sorted_modules:
+            by_class = {}
+            for test in tests_by_module.get(module, []):
+                by_class.setdefault(class_name(test.__class__), []).append(test)
+            class_units = [ScheduleUnit(name, tests, costs.get(name, 0.0))
+                           for name, tests in by_class.items()]
+            module_cost = costs.get(module, 0.0)
+            if module_cost >= EXPENSIVE_FIXTURE_SECONDS or len(class_units) == 1:
+                units.append(ScheduleUnit(
+                    module, [test for unit in class_units for test in unit.tests],
+                    module_cost + sum(unit.fixture_cost for unit in class_units)))
+            else:
+                units.extend(class_units)
+        return units
+
+    def dependency_hashes(self, test_modules):
+        """Return {test module: hash of the files of the module and its transitive imports}.
+
+        Modules missing from the import graph (see _get_topological_order) are left out.
+        """
+        short_to_full = full_module_names(self.module_all_imports)
+        file_hashes = {}
+        hashes = {}
+        for module in test_modules:
+            full_module = short_to_full.get(module, module)
+            if full_module not in self.module_filepaths:
+                continue
+            names = {full_module} | self.module_all_imports.get(full_module, set())
+            digest = hashlib.sha256()
+            for path in sorted(self.module_filepaths[name] for name in names if name in self.module_filepaths):
+                if path not in file_hashes:
+                    file_hashes[path] = compute_hash(pathlib.Path(path))
+                digest.update(f"{path}:{file_hashes[path]}\n".encode())
+            hashes[module] = digest.hexdigest()
+        return hashes
+
     def _get_topological_order(self, test_modules):
         """Get topological order of test modules based on import dependencies."""
         # Find all .py files from configured source directories
@@ -386,6 +947,8 @@ class RutRunner:
         if not py_files:
             return sorted(test_modules)
 
+        from import_deps import ModuleSet, get_all_imports, topological_sort
+
         # Build module set and get imports
         try:
             module_set = ModuleSet(py_files)
@@ -409,6 +972,9 @@ class RutRunner:
             # Store filepaths mapping for use in _filter_modified
             self.module_filepaths = sort_result.filepaths
 
+            # Direct imports, for import graph distances (see ordering.py)
+            self.module_imports = {result['module']: set(result['imports']) for result in results}
+
             # Store transitive imports for each module
             self.module_all_imports = get_all_imports(results)
 
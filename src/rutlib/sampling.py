@@ -0,0 +1,117 @@
+"""
+Sampling profiler (`--sample-profile`).
+
+A background thread records the stack of the main thread every `interval`
+seconds during the whole run, tagged with the id of the running test.
+Unlike cProfile, the overhead does not depend on the number of function
+calls, so I/O heavy and async tests are not distorted.
+
+Samples are written in the collapsed stack format read by flamegraph tools
+(flamegraph.pl, speedscope, inferno): one line per distinct stack,
+`root;...;leaf count`, with the test id as root frame. `run.collapsed` has
+the whole run (samples outside tests, i.e. fixtures, are tagged
+"(outside tests)"), `<module>.collapsed` the samples of each test module.
+Frames of unittest and rut itself are omitted.
+"""
+
+import collections
+import contextlib
+import os
+import re
+import shutil
+import sys
+import threading
+import unittest
+
+from . import cache
+
+DEFAULT_INTERVAL = 0.005  # seconds
+OUTSIDE_TESTS = "(outside tests)"
+
+_INTERNAL = (
+    os.path.dirname(unittest.__file__),
+    os.path.dirname(__file__),
+    '<frozen runpy>',
+)
+
+
+def _relpath(filename):
+    path = os.path.relpath(filename)
+    return filename if path.startswith('..') else path
+
+
+class SamplingProfiler:
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        # ((module, test id) or None, stack) -> number of samples
+        self._counts = collections.Counter()
+        self._test = None
+        self._labels = {}  # code -> frame label, None for internal frames
+        self._stop = threading.Event()
+
+    @contextlib.contextmanager
+    def running(self):
+        thread = threading.Thread(target=self._sample, args=(threading.get_ident(),),
+                                  name="rut-sampler", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            self._stop.set()
+            thread.join()
+            self.write()
+
+    def start_test(self, test):
+        self._test = (test.__module__, test.id())
+
+    def stop_test(self, test):
+        self._test = None
+
+    def _sample(self, thread_id):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._counts[(self._test, self._stack(frame))] += 1
+                self.samples += 1
+
+    def _label(self, code):
+        label = self._labels.get(code, False)
+        if label is False:
+            if code.co_filename.startswith(_INTERNAL):
+                label = None
+            else:
+                label = f"{code.co_name} ({_relpath(code.co_filename)}:{code.co_firstlineno})"
+                label = label.replace(';', ',')
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame):
+        """Tuple of frame labels, from root to leaf."""
+        labels = []
+        while frame is not None:
+            label = self._label(frame.f_code)
+            if label is not None:
+                labels.append(label)
+            frame = frame.f_back
+        return tuple(reversed(labels))
+
+    def write(self):
+        """Write run.collapsed and one <module>.collapsed per test module."""
+        shutil.rmtree(cache.SAMPLES_DIR, ignore_errors=True)
+        cache.SAMPLES_DIR.mkdir(parents=True)
+        run_lines = []
+        module_lines = collections.defaultdict(list)
+        for (test, stack), count in self._counts.items():
+            if test is None:
+                tag = OUTSIDE_TESTS
+            else:
+                tag = test[1].replace(';', ',')
+            line = ';'.join((tag,) + stack) + f" {count}\n"
+            run_lines.append(line)
+            if test is not None:
+                module_lines[test[0]].append(line)
+        (cache.SAMPLES_DIR / 'run.collapsed').write_text(''.join(run_lines))
+        for module, lines in module_lines.items():
+            name = re.sub(r'[^\w.-]+', '_', module)
+            (cache.SAMPLES_DIR / f"{name}.collapsed").write_text(''.join(lines))
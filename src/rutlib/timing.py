@@ -0,0 +1,210 @@
+"""
+Per-phase durations (`--durations N`).
+
+`PhaseTimer` wraps the unittest internals that run each phase:
+
+- module: import (during discovery), setUpModule, tearDownModule
+- class: setUpClass, tearDownClass
+- test: setUp, call (test method, including sub-tests), tearDown (and cleanups)
+
+unittest nests some of them (setting up a module first tears down the previous
+one), so each phase is timed exclusive of the phases nested in it.
+
+Test phases are timed around the context manager unittest runs each part of
+a test in (`_Outcome.testPartExecutor`), not by wrapping the methods that
+run user code: a wrapper would be a frame of the tracebacks of failing tests,
+and unittest cuts tracebacks at the first of its frames after a foreign one,
+hiding the failing line.
+
+Fixture costs of modules and classes are measured on every run (only the
+fixture phases are timed without `--durations`) and stored, to keep test
+modules with expensive fixtures together when tests are reordered (see
+RutRunner.schedule_units).
+"""
+
+import contextlib
+import time
+import unittest
+import unittest.case
+import unittest.suite
+
+from .internals import class_name, patched
+
+PHASES = ('import', 'setUpModule', 'setUpClass', 'setUp', 'call',
+          'tearDown', 'tearDownClass', 'tearDownModule')
+FIXTURE_PHASES = ('setUpModule', 'setUpClass', 'tearDownClass', 'tearDownModule')
+# Phases of the parts of a test, in order. Cleanups are parts too, of tearDown.
+TEST_PHASES = ('setUp', 'call', 'tearDown')
+
+
+class PhaseTimer:
+    def __init__(self):
+        # (kind, name) -> {phase: seconds}, kind is "module", "class" or "test"
+        self.items = {}
+        # time spent in nested phases, one entry per running phase
+        self._nested = []
+
+    def _timed(self, kind, name, phase, fn, *args):
+        self._nested.append(0.0)
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            exclusive = elapsed - self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            phases = self.items.setdefault((kind, name), {})
+            phases[phase] = phases.get(phase, 0.0) + exclusive
+
+    @contextlib.contextmanager
+    def timing_imports(self):
+        """Time test module imports done by TestLoader (discovery)."""
+        timer = self
+
+        def wrap_import(original):
+            def _get_module_from_name(self, name):
+                return timer._timed('module', name, 'import', original, self, name)
+            return _get_module_from_name
+
+        with patched((unittest.TestLoader, '_get_module_from_name', wrap_import)):
+            yield
+
+    def _fixture_patches(self):
+        """patched() arguments timing class and module fixtures."""
+        timer = self
+        TestSuite = unittest.suite.TestSuite
+
+        def wrap_module_setup(original):
+            def _handleModuleFixture(self, test, result):
+                module = test.__class__.__module__
+                if module == self._get_previous_module(result):
+                    return original(self, test, result)
+                return timer._timed('module', module, 'setUpModule', original, self, test, result)
+            return _handleModuleFixture
+
+        def wrap_module_teardown(original):
+            def _handleModuleTearDown(self, result):
+                module = self._get_previous_module(result)
+                if module is None:
+                    return original(self, result)
+                return timer._timed('module', module, 'tearDownModule', original, self, result)
+            return _handleModuleTearDown
+
+        def wrap_class_setup(original):
+            def _handleClassSetUp(self, test, result):
+                cls = test.__class__
+                if cls == getattr(result, '_previousTestClass', None):
+                    return original(self, test, result)
+                return timer._timed('class', class_name(cls), 'setUpClass', original, self, test, result)
+            return _handleClassSetUp
+
+        def wrap_class_teardown(original):
+            def _tearDownPreviousClass(self, test, result):
+                previous = getattr(result, '_previousTestClass', None)
+                if previous is None or previous == test.__class__:
+                    return original(self, test, result)
+                return timer._timed('class', class_name(previous), 'tearDownClass',
+                                    original, self, test, result)
+            return _tearDownPreviousClass
+
+        return ((TestSuite, '_handleModuleFixture', wrap_module_setup),
+                (TestSuite, '_handleModuleTearDown', wrap_module_teardown),
+                (TestSuite, '_handleClassSetUp', wrap_class_setup),
+                (TestSuite, '_tearDownPreviousClass', wrap_class_teardown))
+
+    @contextlib.contextmanager
+    def timing_fixtures(self):
+        """Time only module and class fixtures while running a suite."""
+        with patched(*self._fixture_patches()):
+            yield
+
+    @contextlib.contextmanager
+    def timing_run(self):
+        """Time fixtures and tests while running a suite."""
+        timer = self
+
+        def wrap_part_executor(original):
+            def testPartExecutor(self, test_case, *args, **kwargs):
+                part = original(self, test_case, *args, **kwargs)
+                # Sub-tests are part of the test method call: `subTest=True`
+                # (3.11+), or `isTest=True` with the sub-test as test case (3.10)
+                if kwargs.get('subTest') or (kwargs.get('isTest')
+                                             and isinstance(test_case, unittest.case._SubTest)):
+                    return part
+                return _TimedPart(timer, self, test_case, part)
+            return testPartExecutor
+
+        with patched(*self._fixture_patches(),
+                     (unittest.case._Outcome, 'testPartExecutor', wrap_part_executor)):
+            yield
+
+    def fixture_costs(self):
+        """Return {module or class name: seconds spent in its setUp*/tearDown* fixtures}."""
+        costs = {}
+        for (kind, name), phases in self.items.items():
+            if kind in ('module', 'class'):
+                cost = sum(phases.get(phase, 0.0) for phase in FIXTURE_PHASES)
+                if cost:
+                    costs[name] = cost
+        return costs
+
+    def slowest(self, n):
+        """Return [(total, kind, name, phases)] of the `n` slowest items (all if `n` is 0)."""
+        rows = sorted(
+            ((sum(phases.values()), kind, name, phases)
+             for (kind, name), phases in self.items.items()),
+            key=lambda row: row[0], reverse=True)
+        return rows[:n] if n else rows
+
+
+class _TimedPart:
+    """Times a part of a test run by unittest's context manager `part`.
+
+    Exceptions of the part are handled by `part`, entered and exited from
+    here: no frame of rut is added to their tracebacks.
+    """
+
+    def __init__(self, timer, outcome, test, part):
+        self.timer = timer
+        self.outcome = outcome
+        self.test = test
+        self.part = part
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self.part.__enter__()
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        # Index of the part in the test, kept by its outcome (one per test run)
+        index = getattr(self.outcome, '_rut_part', 0)
+        phase = TEST_PHASES[min(index, len(TEST_PHASES) - 1)]
+        phases = self.timer.items.setdefault(('test', self.test.id()), {})
+        phases[phase] = phases.get(phase, 0.0) + elapsed
+        suppress = self.part.__exit__(*exc_info)
+        # When setUp fails, only cleanups are left
+        self.outcome._rut_part = index + 1 if self.outcome.success or index else len(TEST_PHASES) - 1
+        return suppress
+
+
+def format_phases(phases):
+    """e.g. "setUp 0.120s, call 1.003s" (phases that took under 1ms omitted)."""
+    parts = [f"{phase} {phases[phase]:.3f}s" for phase in PHASES
+             if phases.get(phase, 0.0) >= 0.0005]
+    return ", ".join(parts)
+
+
+def durations_table(timer, n):
+    """Rich table with the `n` slowest modules, classes and tests."""
+    from rich.table import Table
+    title = f"slowest {n} durations" if n else "durations"
+    table = Table(title=title, title_justify="left", box=None, pad_edge=False)
+    table.add_column("total", justify="right", style="bold")
+    table.add_column("kind", style="dim")
+    table.add_column("name")
+    table.add_column("breakdown", style="dim")
+    for total, kind, name, phases in timer.slowest(n):
+        table.add_row(f"{total:.3f}s", kind, name, format_phases(phases))
+    return table
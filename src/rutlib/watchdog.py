@@ -0,0 +1,275 @@
+"""
+Time and memory budgets (`timeout`, `module_timeout`, `memory_limit_mb`).
+
+A watchdog thread checks the running unit every `POLL_INTERVAL` seconds: a
+test (setUp to cleanups), a class or module fixture (setUpClass,
+tearDownModule...), and the module it belongs to. When a unit runs longer
+than its timeout, or the process RSS goes over the memory limit, the stacks
+of all threads are dumped with faulthandler and `BudgetExceededError` is
+raised in the main thread. A signal is used, so blocking calls (socket
+reads, lock waits...) are interrupted too. unittest reports the exception as
+an error of the test or fixture, and the run goes on with the next one.
+
+Budgets are set in `[tool.rut]` and can be overridden per class with the
+`rut_timeout` and `rut_memory_limit_mb` attributes, per module with a
+module level `rut_module_timeout`. 0 disables a budget.
+
+The memory limit reads the current RSS from /proc (Linux only). Interrupting
+needs `signal.pthread_kill` (not available on Windows): elsewhere the stacks
+are only written to stderr.
+"""
+
+import contextlib
+import faulthandler
+import os
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import unittest.suite
+
+from .internals import class_name, patched
+
+POLL_INTERVAL = 0.1  # seconds
+# A test that catches the exception and goes on is interrupted again.
+RESIGNAL_INTERVAL = 1.0  # seconds
+
+_SIGNAL = getattr(signal, 'SIGUSR1', None)
+_UNITTEST_DIR = os.path.dirname(unittest.__file__)
+_RUTLIB_DIR = os.path.dirname(__file__)
+# unittest functions calling user code (tests and fixtures). The exception is
+# raised only when one of them is reached, walking out from the interrupted
+# frame, before any rut frame: never in the result or the output code.
+_CALLERS = frozenset((
+    '_callSetUp', '_callTestMethod', '_callTearDown', '_callCleanup',
+    'doClassCleanups', 'doModuleCleanups',
+    '_handleModuleFixture', '_handleModuleTearDown', '_handleClassSetUp', '_tearDownPreviousClass',
+))
+
+_THREAD_RE = re.compile(r'^(Current thread|Thread) (0x[0-9a-f]+) \(most recent call first\):$')
+# faulthandler frames, written as traceback frames for the failure output
+_FRAME_RE = re.compile(r'^(\s*File "(.*)", line \d+) in (.*)$')
+
+
+class BudgetExceededError(Exception):
+    """A test or fixture ran over its time or memory budget."""
+
+
+def _rss():
+    """Current resident set size in bytes, None if unknown (not Linux)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def thread_stacks():
+    """faulthandler dump of the threads, except rut's own, without unittest and rut frames."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    with tempfile.TemporaryFile('w+') as f:
+        faulthandler.dump_traceback(f, all_threads=True)
+        f.seek(0)
+        dump = f.read()
+    blocks = []
+    for block in dump.strip().split('\n\n'):
+        header, *frames = block.splitlines()
+        match = _THREAD_RE.match(header)
+        if match is None or match.group(1) == 'Current thread':  # the watchdog
+            continue
+        name = names.get(int(match.group(2), 16), match.group(2))
+        if name.startswith('rut-'):
+            continue
+        lines = [f"Thread {name!r} (most recent call first):"]
+        for frame in frames:
+            frame_match = _FRAME_RE.match(frame)
+            if frame_match is None:
+                lines.append(frame)
+            elif not frame_match.group(2).startswith((_UNITTEST_DIR, _RUTLIB_DIR, '<frozen ')):
+                lines.append(f"{frame_match.group(1)}, in {frame_match.group(3)}")
+        blocks.append('\n'.join(lines))
+    return '\n\n'.join(blocks)
+
+
+class Watchdog:
+    def __init__(self, timeout=None, module_timeout=None, memory_limit_mb=None, interval=POLL_INTERVAL):
+        self.timeout = timeout
+        self.module_timeout = module_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.interval = interval
+        # Messages of the budgets exceeded, in order.
+        self.exceeded = []
+        self._lock = threading.Lock()
+        # Running units, innermost last: [(name, deadline, timeout, memory limit)].
+        # Fixtures nest: setting up a module first tears down the previous one.
+        self._units = []
+        self._module = None  # (name, deadline, timeout)
+        self._pending = None  # message of the exception to raise
+        self._signaled_at = None
+        self._main_thread = None
+        self._stop = threading.Event()
+
+    def _budget(self, owner, attr, default):
+        value = getattr(owner, attr, None)
+        return default if value is None else value
+
+    def _push(self, name, owner):
+        timeout = self._budget(owner, 'rut_timeout', self.timeout)
+        memory_limit = self._budget(owner, 'rut_memory_limit_mb', self.memory_limit_mb)
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._units.append((name, deadline, timeout, memory_limit))
+            self._pending = self._signaled_at = None
+
+    def _pop(self):
+        with self._lock:
+            self._units.pop()
+            self._pending = self._signaled_at = None
+
+    def _enter_module(self, module):
+        if self._module is not None and self._module[0] == module:
+            return
+        timeout = self._budget(sys.modules.get(module), 'rut_module_timeout', self.module_timeout)
+        deadline = time.monotonic() + timeout if timeout else None
+        with self._lock:
+            self._module = (module, deadline, timeout)
+
+    def start_test(self, test):
+        self._enter_module(test.__module__)
+        self._push(test.id(), test)
+
+    def stop_test(self, test):
+        self._pop()
+
+    @contextlib.contextmanager
+    def _fixture(self, name, owner):
+        self._push(name, owner)
+        try:
+            yield
+        finally:
+            self._pop()
+
+    def _fixture_patches(self):
+        """patched() arguments tracking class and module fixtures, like tests."""
+        watchdog = self
+        TestSuite = unittest.suite.TestSuite
+
+        def wrap_module_setup(original):
+            def _handleModuleFixture(self, test, result):
+                module = test.__class__.__module__
+                if module == self._get_previous_module(result):
+                    return original(self, test, result)
+                watchdog._enter_module(module)
+                with watchdog._fixture(f"{module}.setUpModule", sys.modules.get(module)):
+                    return original(self, test, result)
+            return _handleModuleFixture
+
+        def wrap_module_teardown(original):
+            def _handleModuleTearDown(self, result):
+                module = self._get_previous_module(result)
+                if module is None:
+                    return original(self, result)
+                with watchdog._fixture(f"{module}.tearDownModule", sys.modules.get(module)):
+                    return original(self, result)
+            return _handleModuleTearDown
+
+        def wrap_class_setup(original):
+            def _handleClassSetUp(self, test, result):
+                cls = test.__class__
+                if cls == getattr(result, '_previousTestClass', None):
+                    return original(self, test, result)
+                with watchdog._fixture(f"{class_name(cls)}.setUpClass", cls):
+                    return original(self, test, result)
+            return _handleClassSetUp
+
+        def wrap_class_teardown(original):
+            def _tearDownPreviousClass(self, test, result):
+                previous = getattr(result, '_previousTestClass', None)
+                if previous is None or previous == test.__class__:
+                    return original(self, test, result)
+                with watchdog._fixture(f"{class_name(previous)}.tearDownClass", previous):
+                    return original(self, test, result)
+            return _tearDownPreviousClass
+
+        return ((TestSuite, '_handleModuleFixture', wrap_module_setup),
+                (TestSuite, '_handleModuleTearDown', wrap_module_teardown),
+                (TestSuite, '_handleClassSetUp', wrap_class_setup),
+                (TestSuite, '_tearDownPreviousClass', wrap_class_teardown))
+
+    @contextlib.contextmanager
+    def running(self):
+        previous_handler = None
+        if _SIGNAL is not None and hasattr(signal, 'pthread_kill'):
+            try:
+                previous_handler = signal.signal(_SIGNAL, self._interrupt)
+                self._main_thread = threading.get_ident()
+            except ValueError:  # not the main thread
+                pass
+        self._stop.clear()
+        self._module = None
+        thread = threading.Thread(target=self._watch, name="rut-watchdog", daemon=True)
+        thread.start()
+        try:
+            with patched(*self._fixture_patches()):
+                yield
+        finally:
+            self._stop.set()
+            thread.join()
+            if self._main_thread is not None:
+                signal.signal(_SIGNAL, previous_handler)
+                self._main_thread = None
+
+    def _check(self, now):
+        """Message of the budget exceeded by the running unit, if any."""
+        if self._units:
+            name, deadline, timeout, memory_limit = self._units[-1]
+            if deadline is not None and now > deadline:
+                return f"{name} exceeded its timeout of {timeout:g}s"
+            if memory_limit:
+                rss = _rss()
+                if rss is not None and rss > memory_limit * 1024 * 1024:
+                    return (f"{name} exceeded the memory limit of {memory_limit:g} MB"
+                            f" (RSS {rss / 1024 / 1024:.0f} MB)")
+        if self._module is not None:
+            module, deadline, timeout = self._module
+            if deadline is not None and now > deadline:
+                return f"module {module} exceeded its timeout of {timeout:g}s"
+        return None
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                now = time.monotonic()
+                if self._signaled_at is not None and now - self._signaled_at < RESIGNAL_INTERVAL:
+                    continue
+                message = self._check(now)
+                if message is None:
+                    continue
+                if self._signaled_at is None:
+                    self.exceeded.append(message)
+                self._signaled_at = now
+                stacks = thread_stacks()
+                if self._main_thread is None:
+                    sys.__stderr__.write(f"rut: {message}\n{stacks}\n")
+                    continue
+                # The message is last: it is the line shown in the summary.
+                self._pending = f"stacks of all threads:\n{stacks}\n\n{message}"
+                signal.pthread_kill(self._main_thread, _SIGNAL)
+
+    def _interrupt(self, signum, frame):
+        """Signal handler (main thread): raise BudgetExceededError in user code."""
+        # No lock here: the main thread may be holding it.
+        message = self._pending
+        if message is None:
+            return
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if filename.startswith(_RUTLIB_DIR):
+                return  # signaled again later
+            if frame.f_code.co_name in _CALLERS and filename.startswith(_UNITTEST_DIR):
+                self._pending = None
+                raise BudgetExceededError(message)
+            frame = frame.f_back
@@ -0,0 +1,26 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from rutlib import cache
+
+
+class CacheTestCase(unittest.TestCase):
+    """TestCase whose tests use a new temporary cache directory, `self.cache_dir`.
+
+    The paths of rutlib.cache in `.rut_cache` (CACHE_DIR, FAILURES_FILE...)
+    are patched to the same paths in `self.cache_dir`.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        cache_dir = cache.CACHE_DIR
+        for name, value in list(vars(cache).items()):
+            if isinstance(value, Path) and value.is_relative_to(cache_dir):
+                patcher = patch.object(cache, name, self.cache_dir / value.relative_to(cache_dir))
+                patcher.start()
+                self.addCleanup(patcher.stop)
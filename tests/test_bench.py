@@ -0,0 +1,86 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from rutlib import cache
+from rutlib.bench import PREFIX, Benchmarker, format_time, measure
+from tests.helpers import CacheTestCase
+
+
+class TestMeasure(unittest.TestCase):
+    def test_calibrates_loops(self):
+        stats = measure(lambda: None, rounds=3, min_time=0.001)
+        self.assertGreater(stats.loops, 1)
+        self.assertEqual(stats.rounds, 3)
+        self.assertLessEqual(stats.min, stats.median)
+        self.assertGreaterEqual(stats.stddev, 0)
+
+    def test_format_time(self):
+        self.assertEqual(format_time(2.5), "2.5 s")
+        self.assertEqual(format_time(0.0015), "1.5 ms")
+        self.assertEqual(format_time(3e-8), "30 ns")
+
+
+class TestBenchmarker(CacheTestCase):
+    class _Sample(unittest.TestCase):
+        calls = 0
+
+        def setUp(self):
+            self.data = list(range(100))
+
+        def bench_sum(self):
+            sum(self.data)
+
+        def test_not_a_benchmark(self):
+            type(self).calls += 1
+
+        def benchmark_data(self):  # a helper, not a benchmark
+            return list(range(10))
+
+    def setUp(self):
+        super().setUp()
+        self.bench_file = cache.BENCHMARKS_FILE
+        patcher = patch('rutlib.bench.MIN_ROUND_TIME', 0.001)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._Sample.calls = 0
+
+    def _run(self, benchmarker):
+        result = unittest.TestResult()
+        suite = unittest.TestSuite([self._Sample('bench_sum'), self._Sample('test_not_a_benchmark')])
+        with benchmarker.running():
+            suite.run(result)
+        return result
+
+    def test_first_result_is_the_baseline(self):
+        benchmarker = Benchmarker(rounds=3)
+        result = self._run(benchmarker)
+        self.assertTrue(result.wasSuccessful())
+        bench_id = self._Sample('bench_sum').id()
+        self.assertEqual(list(benchmarker.results), [bench_id])
+        self.assertEqual(self._Sample.calls, 1)  # tests run once, as usual
+        baselines = json.loads(self.bench_file.read_text())
+        self.assertEqual(baselines[bench_id]['median'], benchmarker.results[bench_id].median)
+
+    def test_collects_bench_methods_only(self):
+        loader = unittest.TestLoader()
+        loader.testMethodPrefix = PREFIX
+        self.assertEqual(loader.getTestCaseNames(self._Sample), ['bench_sum'])
+
+    def test_regression_fails(self):
+        bench_id = self._Sample('bench_sum').id()
+        self.bench_file.write_text(json.dumps({bench_id: {'median': 1e-12}}))
+        result = self._run(Benchmarker(rounds=3, tolerance=0.5))
+        self.assertEqual(len(result.failures), 1)
+        self.assertIn('slower than the baseline', result.failures[0][1])
+        # The baseline is kept
+        self.assertEqual(json.loads(self.bench_file.read_text())[bench_id]['median'], 1e-12)
+
+    def test_save_replaces_baseline(self):
+        bench_id = self._Sample('bench_sum').id()
+        self.bench_file.write_text(json.dumps({bench_id: {'median': 1e-12}}))
+        benchmarker = Benchmarker(save=True, rounds=3)
+        result = self._run(benchmarker)
+        self.assertTrue(result.wasSuccessful())
+        self.assertEqual(json.loads(self.bench_file.read_text())[bench_id]['median'],
+                         benchmarker.results[bench_id].median)
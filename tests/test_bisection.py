@@ -0,0 +1,69 @@
+import unittest
+from unittest.mock import patch
+
+from rutlib.bisection import bisect, ddmin
+from rutlib.runner import RutError
+
+
+ORDER = ['t1', 't2', 't3', 't4', 'target', 't5']
+
+
+class TestDdmin(unittest.TestCase):
+    def test_single_culprit(self):
+        calls = []
+
+        def fails(items):
+            calls.append(items)
+            return 37 in items
+        self.assertEqual(ddmin(list(range(100)), fails), [37])
+        self.assertLess(len(calls), 20)
+
+    def test_interacting_culprits(self):
+        # fails only when both 3 and 12 ran
+        self.assertEqual(ddmin(list(range(16)), lambda items: {3, 12} <= set(items)), [3, 12])
+
+    def test_keeps_order(self):
+        self.assertEqual(ddmin(['e', 'd', 'c', 'b', 'a'], lambda items: {'a', 'd'} <= set(items)), ['d', 'a'])
+
+
+class TestBisect(unittest.TestCase):
+    def _run(self, polluters):
+        runs = []
+
+        def run(test_ids, test_path):
+            runs.append(test_ids)
+            self.assertEqual(test_ids[-1], 'target')
+            fails = polluters and polluters <= set(test_ids)
+            return set(test_ids[:-1]) if fails else set(test_ids)
+        return runs, run
+
+    def test_finds_polluter(self):
+        runs, run = self._run({'t3'})
+        self.assertEqual(bisect(ORDER, 'target', run=run, log=lambda message: None), ['t3'])
+        self.assertEqual(runs[:2], [['t1', 't2', 't3', 't4', 'target'], ['target']])
+        self.assertEqual(len(runs), len({tuple(ids) for ids in runs}))  # no repeated runs
+
+    def test_not_order_dependent(self):
+        _, run = self._run(set())
+        with self.assertRaisesRegex(RutError, "does not fail after the 4 tests"):
+            bisect(ORDER, 'target', run=run, log=lambda message: None)
+        with self.assertRaisesRegex(RutError, "fails when run alone"):
+            bisect(ORDER, 'target', run=lambda ids, path: set(), log=lambda message: None)
+        with self.assertRaisesRegex(RutError, "not in the selected tests"):
+            bisect(ORDER, 'other', run=run, log=lambda message: None)
+
+    def test_incomplete_runs_do_not_reproduce(self):
+        _, run = self._run({'t2'})
+
+        def crashing(test_ids, test_path):
+            return None if 't1' in test_ids else run(test_ids, test_path)
+        self.assertEqual(bisect(['t1', 't2', 'target'], 'target', run=run, log=lambda message: None), ['t2'])
+        with self.assertRaisesRegex(RutError, "does not fail"):
+            bisect(['t1', 't2', 'target'], 'target', run=crashing, log=lambda message: None)
+
+    def test_runs_do_not_save_captures(self):
+        # the saved output of the target is the one of the run investigated
+        _, run = self._run({'t3'})
+        with patch('rutlib.isolated.run', side_effect=lambda ids, path, **kwargs: run(ids, path)) as isolated_run:
+            self.assertEqual(bisect(ORDER, 'target', log=lambda message: None), ['t3'])
+        self.assertTrue(all(call.kwargs == {'save_captures': False} for call in isolated_run.call_args_list))
@@ -0,0 +1,60 @@
+import unittest
+
+from rutlib.blocking import Blocker
+from rutlib.runner import StreamingSuite
+
+DEPENDENCIES = {
+    'test_currency': {'app.currency'},
+    'test_money': {'app.money', 'app.currency'},
+    'test_other': {'app.other'},
+}
+
+
+def _test_class(module, fails=False):
+    def test_it(self):
+        type(self).ran.append(self.id())
+        if fails:
+            self.fail("wrong rate")
+    return type('T', (unittest.TestCase,), {'__module__': module, 'ran': [], 'test_it': test_it})
+
+
+class TestBlocker(unittest.TestCase):
+    def test_foundation_failure_blocks_dependents(self):
+        blocker = Blocker(DEPENDENCIES)
+        result = unittest.TestResult()
+        self.assertIsNone(blocker.blocked_by('test_money', result))
+        result.failures.append((_test_class('test_currency')('test_it'), ''))
+        self.assertEqual(blocker.blocked_by('test_money', result), 'test_currency')
+        self.assertIsNone(blocker.blocked_by('test_other', result))
+        self.assertEqual(blocker.blocked, {'test_money': 'test_currency'})
+
+    def test_fixture_errors(self):
+        blocker = Blocker(DEPENDENCIES)
+        result = unittest.TestResult()
+        result.errors.append((unittest.suite._ErrorHolder('setUpModule (test_currency)'), ''))
+        self.assertEqual(blocker.blocked_by('test_money', result), 'test_currency')
+        result = unittest.TestResult()
+        result.errors.append((unittest.suite._ErrorHolder('setUpClass (test_currency.TestRate)'), ''))
+        self.assertEqual(blocker.blocked_by('test_money', result), 'test_currency')
+
+
+class TestShortCircuit(unittest.TestCase):
+    def _run(self, mode):
+        classes = [_test_class('test_currency', fails=True), _test_class('test_money'), _test_class('test_other')]
+        ran = []
+        for cls in classes:
+            cls.ran = ran
+        suite = StreamingSuite([cls('test_it') for cls in classes], blocker=Blocker(DEPENDENCIES, mode))
+        result = unittest.TestResult()
+        suite.run(result)
+        return [test_id.split('.')[0] for test_id in ran], result
+
+    def test_skip(self):
+        ran, result = self._run('skip')
+        self.assertEqual(ran, ['test_currency', 'test_other'])
+        self.assertEqual([reason for _, reason in result.skipped], ["blocked by failing test_currency"])
+
+    def test_defer(self):
+        ran, result = self._run('defer')
+        self.assertEqual(ran, ['test_currency', 'test_other', 'test_money'])
+        self.assertEqual(result.skipped, [])
@@ -4,7 +4,8 @@ import unittest
 from pathlib import Path
 from unittest.mock import patch
 from rutlib.cache import compute_hash, load_cache, save_cache, get_modified_files, update_cache, CACHE_DIR, CACHE_FILE
-from rutlib.__main__ import should_update_cache
+from rutlib.cache import load_durations, save_durations
+from rutlib.__main__ import should_save_durations, should_update_cache
 
 
 class TestComputeHash(unittest.TestCase):
@@ -111,11 +112,43 @@ class TestUpdateCache(unittest.TestCase):
                 self.assertIn(file_path, loaded)
                 self.assertEqual(len(loaded[file_path]), 64)
 
+    def test_update_cache_returns_changed_files(self):
+        cache_file = Path(self.test_dir) / 'cache' / 'test.json'
+        with patch('rutlib.cache.CACHE_FILE', cache_file), \
+                patch('rutlib.cache.CACHE_DIR', cache_file.parent):
+            self.assertEqual(update_cache([str(self.src_dir)]), set())
+            (self.src_dir / 'module.py').write_text('x = 2\n')
+            self.assertEqual(update_cache([str(self.src_dir)]), {str(self.src_dir / 'module.py')})
+            self.assertEqual(update_cache([str(self.src_dir)]), set())
+
+
+class TestDurations(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.durations_file = Path(self.test_dir) / 'cache' / 'durations.json'
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_load_durations_empty_when_no_file(self):
+        with patch('rutlib.cache.DURATIONS_FILE', self.durations_file):
+            self.assertEqual(load_durations(), {})
+
+    def test_save_merges_with_stored(self):
+        with patch('rutlib.cache.DURATIONS_FILE', self.durations_file), \
+                patch('rutlib.cache.CACHE_DIR', self.durations_file.parent):
+            save_durations({'test_a': 1.0, 'test_b': 2.0})
+            save_durations({'test_b': 3.0})
+            self.assertEqual(load_durations(), {'test_a': 1.0, 'test_b': 3.0})
+
 
 class MockResult:
-    def __init__(self, successful, tests_run):
+    def __init__(self, successful, tests_run, should_stop=False):
         self._successful = successful
         self.testsRun = tests_run
+        self.shouldStop = should_stop
+        self.module_durations = {}
 
     def wasSuccessful(self):
         return self._successful
@@ -137,3 +170,15 @@ class TestShouldUpdateCache(unittest.TestCase):
     def test_no_update_when_no_tests_ran(self):
         result = MockResult(successful=True, tests_run=0)
         self.assertFalse(should_update_cache(result, keyword=None))
+
+
+class TestShouldSaveDurations(unittest.TestCase):
+    def test_save_after_full_run(self):
+        self.assertTrue(should_save_durations(MockResult(False, 5), keyword=None))
+
+    def test_no_save_when_keyword_filter_used(self):
+        self.assertFalse(should_save_durations(MockResult(True, 5), keyword="some_test"))
+
+    def test_no_save_when_run_stopped(self):
+        result = MockResult(False, 5, should_stop=True)
+        self.assertFalse(should_save_durations(result, keyword=None))
@@ -0,0 +1,152 @@
+import gzip
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from rutlib.capture import BoundedCapture, FdCapture
+
+
+class TestBoundedCapture(unittest.TestCase):
+    def setUp(self):
+        self.buf = BoundedCapture(limit=10)
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.buf.close()
+        self.tmpdir.cleanup()
+
+    def test_within_limit_keeps_everything(self):
+        self.buf.write("a" * 12)
+        self.buf.write("b" * 8)
+        self.assertFalse(self.buf.truncated)
+        self.assertEqual(self.buf.getvalue(), "a" * 12 + "b" * 8)
+
+    def test_keeps_head_and_tail(self):
+        for i in range(100):
+            self.buf.write(f"{i:03}")
+        self.assertTrue(self.buf.truncated)
+        value = self.buf.getvalue()
+        self.assertTrue(value.startswith("0000010020"))
+        self.assertTrue(value.endswith("7098099"))
+        self.assertIn("[... 280 characters truncated ...]", value)
+
+    def test_save_writes_full_output(self):
+        text = "".join(f"line {i}\n" for i in range(50))
+        self.buf.write(text)
+        path = Path(self.tmpdir.name) / "out" / "test.stdout.gz"
+        self.buf.save(path)
+        with gzip.open(path, "rt") as f:
+            self.assertEqual(f.read(), text)
+        self.assertIn(f"full output in {path}", self.buf.getvalue())
+
+    def test_save_not_truncated(self):
+        self.buf.write("short")
+        path = Path(self.tmpdir.name) / "test.stdout.gz"
+        self.buf.save(path)
+        self.assertFalse(path.exists())
+
+    def test_truncate_resets(self):
+        self.buf.write("x" * 100)
+        self.buf.seek(0)
+        self.buf.truncate()
+        self.buf.write("new")
+        self.assertFalse(self.buf.truncated)
+        self.assertEqual(self.buf.getvalue(), "new")
+
+    def test_unbounded(self):
+        buf = BoundedCapture(limit=0)
+        buf.write("x" * 1000)
+        self.assertFalse(buf.truncated)
+        self.assertEqual(buf.getvalue(), "x" * 1000)
+
+
+class TestFdCapture(unittest.TestCase):
+    def setUp(self):
+        self.capture = FdCapture()
+
+    def tearDown(self):
+        self.capture.close()
+
+    def test_captures_fd_writes(self):
+        self.capture.start()
+        try:
+            os.write(1, b"to stdout\n")
+            os.write(2, b"to stderr\n")
+            stdout, stderr = self.capture.read()
+        finally:
+            self.capture.stop()
+        self.assertEqual(stdout, "to stdout\n")
+        self.assertEqual(stderr, "to stderr\n")
+
+    def test_captures_subprocess_output(self):
+        self.capture.start()
+        try:
+            subprocess.run([sys.executable, "-c", "print('from child')"], check=True)
+            stdout, _ = self.capture.read()
+        finally:
+            self.capture.stop()
+        self.assertEqual(stdout.strip(), "from child")
+
+    def test_output_discarded_between_tests(self):
+        self.capture.start()
+        os.write(1, b"first test\n")
+        self.capture.stop()
+        self.capture.start()
+        try:
+            os.write(1, b"second\n")
+            stdout, stderr = self.capture.read()
+        finally:
+            self.capture.stop()
+        self.assertEqual(stdout, "second\n")
+        self.assertEqual(stderr, "")
+
+    def test_files_reused_across_tests(self):
+        self.capture.start()
+        self.capture.stop()
+        files = self.capture._files
+        saved = self.capture._saved
+        self.capture.start()
+        self.capture.stop()
+        self.assertIs(self.capture._files, files)
+        self.assertEqual(self.capture._saved, saved)
+
+    def test_read_does_not_lose_later_output(self):
+        self.capture.start()
+        try:
+            os.write(1, b"a")
+            self.capture.read()
+            os.write(1, b"b")
+            stdout, _ = self.capture.read()
+        finally:
+            self.capture.stop()
+        self.assertEqual(stdout, "ab")
+
+    def test_close_releases_descriptors(self):
+        self.capture.start()
+        self.capture.stop()
+        saved = self.capture._saved
+        self.capture.close()
+        self.assertIsNone(self.capture._files)
+        with self.assertRaises(OSError):
+            os.fstat(saved[0])
+
+    def test_read_truncates_and_saves(self):
+        capture = FdCapture(limit=4)
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.addCleanup(capture.close)
+        prefix = Path(tmpdir.name) / "test_id"
+        capture.start()
+        try:
+            os.write(1, b"0123456789abcdef")
+            stdout, stderr = capture.read(save_prefix=prefix)
+        finally:
+            capture.stop()
+        saved = Path(tmpdir.name) / "test_id.fd-stdout.gz"
+        self.assertEqual(stdout, f"0123\n[... 8 bytes truncated, full output in {saved} ...]\ncdef")
+        self.assertEqual(stderr, "")
+        with gzip.open(saved) as f:
+            self.assertEqual(f.read(), b"0123456789abcdef")
@@ -1,4 +1,6 @@
 import pathlib
+import subprocess
+import sys
 import unittest
 from types import SimpleNamespace
 from unittest.mock import patch, mock_open
@@ -38,6 +40,15 @@ class TestCLI(unittest.TestCase):
             self.assertIn("error:DeprecationWarning", mock_stderr.getvalue())
             self.assertIn("action:message:category", mock_stderr.getvalue())
 
+    def test_warning_categories(self):
+        cli = RutCLI()
+        self.assertEqual(cli.warning_categories(["Warning", "DeprecationWarning"]),
+                         [Warning, DeprecationWarning])
+        with patch('sys.stderr', new_callable=StringIO) as mock_stderr:
+            with self.assertRaises(SystemExit):
+                cli.warning_categories(["ValueError"])
+            self.assertIn("collect_warnings", mock_stderr.getvalue())
+
     def test_source_dirs_from_config(self):
         cli = RutCLI()
         cli.parse_args([])
@@ -124,3 +135,42 @@ class TestCLI(unittest.TestCase):
         with patch('builtins.open', mock_open(read_data=toml_data)):
             config = cli.load_config()
         self.assertEqual(config, {})
+
+    def test_reports_with_no_color(self):
+        cli = RutCLI()
+        cli.parse_args(['--no-color', '--junit-xml', 'report.xml', '--leaks'])
+        self.assertEqual(cli.args.junit_xml, 'report.xml')
+
+
+class TestLazyImports(unittest.TestCase):
+    """Startup paths must not import heavy dependencies (see benchmarks/startup.py)."""
+    HEAVY = ('coverage', 'rich', 'import_deps')
+
+    def _loaded_modules(self, argv, modules=HEAVY):
+        code = (
+            "import sys\n"
+            f"sys.argv = {argv!r}\n"
+            "from rutlib.__main__ import main\n"
+            "try:\n"
+            "    main()\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            f"print(sorted(m for m in {modules!r} if m in sys.modules))\n"
+        )
+        proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        return proc.stdout.strip().splitlines()[-1]
+
+    def test_version_does_not_import_heavy_modules(self):
+        self.assertEqual(self._loaded_modules(['rut', '--version']), '[]')
+
+    def test_version_does_not_import_runner_modules(self):
+        modules = ('rutlib.capture', 'rutlib.runner', 'rutlib.output')
+        self.assertEqual(self._loaded_modules(['rut', '--version'], modules), '[]')
+
+    def test_version_does_not_import_cache_or_config_modules(self):
+        modules = ('rutlib.cache', 'tomllib', 'tomli', 'pathlib', 'json', 'hashlib')
+        self.assertEqual(self._loaded_modules(['rut', '--version'], modules), '[]')
+
+    def test_no_color_alpha_dry_run_does_not_import_heavy_modules(self):
+        argv = ['rut', '--no-color', '-a', '--dry-run', 'tests/samples/discovery/sample_one.py']
+        self.assertEqual(self._loaded_modules(argv), '[]')
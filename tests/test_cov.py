@@ -0,0 +1,187 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from rutlib import cache, cov
+from rutlib.cov import CoverageRun
+from rutlib.runner import RutRunner
+from tests.helpers import CacheTestCase
+
+
+class _Options:
+    def __init__(self, **options):
+        self.options = options
+
+    def get_option(self, name):
+        return self.options.get(name.split(':')[1])
+
+
+class TestCore(unittest.TestCase):
+    def _core(self, version, per_module=False, **options):
+        with patch.object(cov, 'sys', SimpleNamespace(version_info=version)), \
+                patch.dict(os.environ, clear=False) as environ:
+            environ.pop('COVERAGE_CORE', None)
+            return cov._core(_Options(**options), per_module)
+
+    def test_needs_sys_monitoring(self):
+        self.assertIsNone(self._core((3, 11)))
+        self.assertEqual(self._core((3, 12)), 'sysmon')
+
+    def test_configured_core_is_kept(self):
+        self.assertIsNone(self._core((3, 13), core='ctrace'))
+        self.assertIsNone(self._core((3, 13), per_module=True, core='pytrace'))
+
+    def test_branch_coverage(self):
+        self.assertIsNone(self._core((3, 13), branch=True))
+        self.assertEqual(self._core((3, 14), branch=True), 'sysmon')
+
+    def test_per_module_contexts(self):
+        self.assertEqual(self._core((3, 11), per_module=True), 'ctrace')
+        self.assertEqual(self._core((3, 14), per_module=True), 'ctrace')
+
+    def test_environment_variable(self):
+        with patch.dict(os.environ, {'COVERAGE_CORE': 'ctrace'}), \
+                patch.object(cov, 'sys', SimpleNamespace(version_info=(3, 13))):
+            self.assertIsNone(cov._core(_Options(), per_module=False))
+
+
+class TestOverheadMessage(unittest.TestCase):
+    def test_compares_with_stored_durations(self):
+        run = CoverageRun(['src'])
+        run.finish_time = 0.5
+        with patch('rutlib.cache.load_durations', return_value={'test_a': 1.0, 'test_b': 1.0}):
+            message = run.overhead_message({'test_a': 3.0, 'test_new': 5.0})
+        self.assertIn("1 modules took 3.00s, 3.00x their usual 1.00s", message)
+        self.assertIn("reporting took 0.50s", message)
+
+    def test_without_stored_durations(self):
+        run = CoverageRun(['src'])
+        with patch('rutlib.cache.load_durations', return_value={}):
+            message = run.overhead_message({'test_a': 3.0})
+        self.assertNotIn("usual", message)
+
+
+class TestRunning(unittest.TestCase):
+    def test_unittest_restored(self):
+        TestSuite = unittest.TestSuite
+        originals = [TestSuite.__dict__[attr] for attr in ('_handleModuleFixture', '_handleModuleTearDown')]
+        run = CoverageRun(['src'])
+        run.cov = Mock()
+        with self.assertRaises(RuntimeError), run.running():
+            self.assertIsNot(TestSuite.__dict__['_handleModuleFixture'], originals[0])
+            raise RuntimeError
+        self.assertEqual([TestSuite.__dict__[attr] for attr in ('_handleModuleFixture', '_handleModuleTearDown')],
+                         originals)
+        run.cov.switch_context.assert_called_with('')
+
+
+class TestStoredCoverage(CacheTestCase):
+    def _data(self, lines_by_context):
+        from coverage import CoverageData
+        data = CoverageData(basename=str(self.cache_dir / '.coverage'))
+        for context, lines in lines_by_context.items():
+            data.set_context(context)
+            data.add_lines(lines)
+        return data
+
+    def test_stores_lines_per_module_and_merges_uptodate(self):
+        run = CoverageRun(['src'])
+        run.modules_run = {'test_a'}
+        data = self._data({'': {'/p/a.py': [1]}, 'test_a': {'/p/a.py': [2, 3], '/p/test_a.py': [5]}})
+        run._update_stored(data, {'test_a': 'k1'}, uptodate={}, store=True)
+        self.assertEqual(cache.load_coverage(),
+                         {'test_a': {'key': 'k1', 'lines': {'/p/a.py': [2, 3], '/p/test_a.py': [5]}}})
+
+        # Next run: test_a is up-to-date, only test_b ran
+        run = CoverageRun(['src'])
+        run.modules_run = {'test_b'}
+        data = self._data({'': {'/p/a.py': [1]}, 'test_b': {'/p/b.py': [7]}})
+        run._update_stored(data, {'test_a': 'k1', 'test_b': 'k2'}, uptodate={'test_a': 1}, store=True)
+        self.assertEqual(run.merged, 1)
+        self.assertEqual(sorted(data.lines('/p/a.py')), [1, 2, 3])
+        self.assertEqual(set(cache.load_coverage()), {'test_a', 'test_b'})
+
+    def test_outdated_stored_lines_not_merged(self):
+        cache.save_coverage({'test_a': {'key': 'old', 'lines': {'/p/a.py': [2]}}})
+        run = CoverageRun(['src'])
+        data = self._data({'': {'/p/a.py': [1]}})
+        run._update_stored(data, {'test_a': 'new'}, uptodate={'test_a': 1}, store=False)
+        self.assertEqual(run.merged, 0)
+        self.assertEqual(data.lines('/p/a.py'), [1])
+
+
+class TestDependencyHashes(unittest.TestCase):
+    def test_hash_changes_with_dependencies(self):
+        tmpdir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        for name in ('a', 'b', 'test_a', 'test_b'):
+            (tmpdir / f'{name}.py').write_text(f'# {name}\n')
+        runner = RutRunner('tests', None, False, False, [])
+        runner.module_filepaths = {name: str(tmpdir / f'{name}.py') for name in ('a', 'b', 'test_a', 'test_b')}
+        runner.module_all_imports = {'test_a': {'a'}, 'test_b': {'b'}, 'a': set(), 'b': set()}
+        before = runner.dependency_hashes(['test_a', 'test_b', 'test_unknown'])
+        self.assertEqual(set(before), {'test_a', 'test_b'})
+        (tmpdir / 'b.py').write_text('# changed\n')
+        after = runner.dependency_hashes(['test_a', 'test_b'])
+        self.assertEqual(after['test_a'], before['test_a'])
+        self.assertNotEqual(after['test_b'], before['test_b'])
+
+
+class TestIncrementalCoverage(unittest.TestCase):
+    """`--cov` runs of a project, in subprocesses."""
+
+    TEST_MODULE = """\
+import unittest
+import lib
+
+
+class Test(unittest.TestCase):
+    def test_it(self):
+        self.assertEqual(lib.shared({0}), {0} + 1)
+"""
+
+    def setUp(self):
+        self.project = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.project, ignore_errors=True)
+        (self.project / 'pyproject.toml').write_text('[tool.rut]\nsource_dirs = ["src", "tests"]\n')
+        (self.project / 'src').mkdir()
+        (self.project / 'src' / 'lib.py').write_text('def shared(x):\n    return x + 1\n')
+        (self.project / 'tests').mkdir()
+        for name, value in (('a', 1), ('b', 2)):
+            (self.project / 'tests' / f'test_{name}.py').write_text(self.TEST_MODULE.format(value))
+
+    def _rut(self, *args):
+        src = os.path.dirname(os.path.dirname(cov.__file__))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(self.project / 'src'), src]))
+        env.pop('COVERAGE_CORE', None)
+        proc = subprocess.run([sys.executable, '-m', 'rutlib', '--no-color', '--cov', *args],
+                              cwd=self.project, env=env, capture_output=True, text=True, check=False)
+        self.assertEqual(proc.returncode, 0, proc.stdout + proc.stderr)
+        self.assertNotIn('Dynamic contexts', proc.stderr)
+        return proc.stdout
+
+    def test_stores_and_merges_lines_per_module(self):
+        self._rut()
+        stored = json.loads((self.project / '.rut_cache' / 'coverage.json').read_text())
+        lib = str(self.project / 'src' / 'lib.py')
+        # Both modules run the same line of lib.py (its first one runs on import)
+        self.assertEqual({module: entry['lines'].get(lib) for module, entry in stored.items()},
+                         {'test_a': [2], 'test_b': [2]})
+
+        (self.project / 'tests' / 'test_b.py').write_text(self.TEST_MODULE.format(3))
+        output = self._rut('--changed')
+        self.assertIn('stored coverage of 1 up-to-date modules merged', output)
+        self.assertRegex(output, r'src/lib\.py\s+2\s+0\s+100%')
+
+    def test_partial_run_keeps_fast_core(self):
+        output = self._rut('-k', 'test_it')
+        core = 'sysmon' if sys.version_info >= (3, 12) else 'default'
+        self.assertIn(f'coverage core: {core}', output)
+        self.assertFalse((self.project / '.rut_cache' / 'coverage.json').exists())
@@ -0,0 +1,68 @@
+import unittest
+
+from rutlib.history import (
+    HISTORY_SIZE,
+    MAX_AGE,
+    is_slowdown,
+    prune,
+    record_durations,
+    update,
+)
+from tests.helpers import CacheTestCase
+
+
+class TestIsSlowdown(unittest.TestCase):
+    SAMPLES = (1.0, 1.1, 0.9, 1.05, 0.95)
+
+    def test_needs_enough_samples(self):
+        self.assertFalse(is_slowdown([1.0, 1.0], 10.0, threshold=3, min_seconds=0))
+
+    def test_within_spread(self):
+        self.assertFalse(is_slowdown(self.SAMPLES, 1.2, threshold=3, min_seconds=0))
+
+    def test_beyond_threshold(self):
+        self.assertTrue(is_slowdown(self.SAMPLES, 1.5, threshold=3, min_seconds=0))
+        self.assertFalse(is_slowdown(self.SAMPLES, 1.5, threshold=10, min_seconds=0))
+
+    def test_min_seconds(self):
+        samples = [0.001] * 5
+        self.assertFalse(is_slowdown(samples, 0.01, threshold=3, min_seconds=0.05))
+        self.assertTrue(is_slowdown(samples, 0.1, threshold=3, min_seconds=0.05))
+
+    def test_stable_samples_use_relative_spread(self):
+        # MAD is 0, spread falls back to 5% of the median
+        self.assertFalse(is_slowdown([2.0] * 5, 2.2, threshold=3, min_seconds=0))
+        self.assertTrue(is_slowdown([2.0] * 5, 2.4, threshold=3, min_seconds=0))
+
+
+class TestUpdate(unittest.TestCase):
+    def test_samples_bounded(self):
+        history = {}
+        for i in range(HISTORY_SIZE + 5):
+            update(history, 'test', {'t1': float(i)}, 3, 0, now=100)
+        samples = history['test']['t1']['d']
+        self.assertEqual(len(samples), HISTORY_SIZE)
+        self.assertEqual(samples[-1], HISTORY_SIZE + 4)
+
+    def test_reports_then_records(self):
+        history = {'test': {'t1': {'d': [1.0] * 5, 't': 0}}}
+        slowdowns = update(history, 'test', {'t1': 5.0, 't2': 1.0}, 3, 0, now=100)
+        self.assertEqual([(s.name, s.duration, s.median, s.samples) for s in slowdowns],
+                         [('t1', 5.0, 1.0, 5)])
+        self.assertEqual(history['test']['t1'], {'d': [1.0] * 5 + [5.0], 't': 100})
+        self.assertEqual(history['test']['t2'], {'d': [1.0], 't': 100})
+
+    def test_prune_old_entries(self):
+        history = {'test': {'old': {'d': [1.0], 't': 0}, 'new': {'d': [1.0], 't': MAX_AGE}}}
+        prune(history, now=MAX_AGE + 10)
+        self.assertEqual(list(history['test']), ['new'])
+
+
+class TestRecordDurations(CacheTestCase):
+    def test_slowdown_across_runs(self):
+        for _ in range(5):
+            self.assertEqual(record_durations({'t': 0.1}, {'m': 1.0}), [])
+        slowdowns = record_durations({'t': 0.5}, {'m': 1.0})
+        self.assertEqual([(s.kind, s.name) for s in slowdowns], [('test', 't')])
+        slowdowns = record_durations({'t': 0.1}, {'m': 3.0})
+        self.assertEqual([(s.kind, s.name) for s in slowdowns], [('module', 'm')])
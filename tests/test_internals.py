@@ -0,0 +1,41 @@
+import unittest
+
+from rutlib.internals import class_name, fixture_error, full_module_names, patched
+
+
+class TestPatched(unittest.TestCase):
+    class _Owner:
+        def method(self):
+            return 'original'
+
+    def test_wraps_and_restores(self):
+        original = self._Owner.__dict__['method']
+
+        def wrap(method):
+            return lambda self: f"wrapped {method(self)}"
+        with self.assertRaises(RuntimeError), patched((self._Owner, 'method', wrap)):
+            self.assertEqual(self._Owner().method(), 'wrapped original')
+            raise RuntimeError
+        self.assertIs(self._Owner.__dict__['method'], original)
+
+    def test_restores_patches_applied_before_a_failing_one(self):
+        original = self._Owner.__dict__['method']
+        patches = ((self._Owner, 'method', lambda method: None), (self._Owner, 'missing', None))
+        with self.assertRaises(KeyError), patched(*patches):  # "missing" is not in the class
+            pass
+        self.assertIs(self._Owner.__dict__['method'], original)
+
+
+class TestNames(unittest.TestCase):
+    def test_class_name(self):
+        self.assertEqual(class_name(TestPatched._Owner), f'{__name__}.TestPatched._Owner')
+
+    def test_fixture_error(self):
+        self.assertEqual(fixture_error('setUpModule (tests.test_a)'), ('setUpModule', 'tests.test_a'))
+        self.assertEqual(fixture_error('tearDownClass (tests.test_a.TestA)'),
+                         ('tearDownClass', 'tests.test_a.TestA'))
+        self.assertIsNone(fixture_error('tests.test_a.TestA.test_it'))
+
+    def test_full_module_names(self):
+        self.assertEqual(full_module_names(['tests.test_a', 'other.test_a', 'src.helpers']),
+                         {'test_a': 'tests.test_a', 'helpers': 'src.helpers'})
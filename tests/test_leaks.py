@@ -0,0 +1,90 @@
+import tracemalloc
+import unittest
+from io import StringIO
+
+from rich.console import Console
+
+from rutlib.leaks import LeakDetector
+from rutlib.output import RichTestRunner
+
+_retained = []
+
+
+class _Sample(unittest.TestCase):
+    def test_leaky(self):
+        pass
+
+    def test_clean(self):
+        pass
+
+
+class TestLeakDetector(unittest.TestCase):
+    def tearDown(self):
+        _retained.clear()
+
+    def _run(self, detector, allocations):
+        """Notify `detector` around each test of _Sample, running `allocations[name]`."""
+        with detector.running():
+            for name, allocate in allocations:
+                test = _Sample(name)
+                detector.start_test(test)
+                allocate()
+                detector.stop_test(test)
+        return detector
+
+    def test_reports_retained_allocations(self):
+        detector = self._run(LeakDetector(threshold_kb=64), [
+            ('test_leaky', lambda: _retained.append(bytearray(200_000))),
+            ('test_clean', lambda: [bytearray(200_000) for _ in range(2)]),
+        ])
+        self.assertEqual(len(detector.leaks), 1)
+        unit, retained, sites = detector.leaks[0]
+        self.assertEqual(unit, f'{__name__}._Sample.test_leaky')
+        self.assertGreaterEqual(retained, 200_000)
+        self.assertIn('test_leaks.py', sites[0][0])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_module_granularity(self):
+        detector = self._run(LeakDetector('module', threshold_kb=64), [
+            ('test_leaky', lambda: _retained.append(bytearray(50_000))),
+            ('test_clean', lambda: _retained.append(bytearray(50_000))),
+        ])
+        self.assertEqual([leak[0] for leak in detector.leaks], [__name__])
+
+    def test_threshold(self):
+        detector = self._run(LeakDetector(threshold_kb=1024), [
+            ('test_leaky', lambda: _retained.append(bytearray(200_000))),
+        ])
+        self.assertEqual(detector.leaks, [])
+
+    def test_hooked_in_result(self):
+        class _Leaky(unittest.TestCase):
+            def test_it(self):
+                _retained.append(bytearray(200_000))
+
+        detector = self._run_suite(_Leaky)
+        self.assertEqual([leak[0] for leak in detector.leaks], [_Leaky('test_it').id()])
+
+    def test_test_attributes_not_reported(self):
+        class _Fixture(unittest.TestCase):
+            def setUp(self):
+                self.data = bytearray(200_000)
+
+            def test_it(self):
+                self.more = bytearray(200_000)
+
+            def test_other(self):
+                pass
+
+        detector = self._run_suite(_Fixture)
+        self.assertEqual(detector.leaks, [])
+
+    @staticmethod
+    def _run_suite(test_class):
+        detector = LeakDetector(threshold_kb=64)
+        runner = RichTestRunner(buffer=True, monitors=[detector])
+        runner.console.file.close()
+        runner.console = Console(file=StringIO())
+        with detector.running():
+            runner.run(unittest.defaultTestLoader.loadTestsFromTestCase(test_class))
+        return detector
@@ -0,0 +1,93 @@
+import unittest
+
+from rutlib import cache
+from rutlib.ordering import failed_names, failure_first, record_run
+from rutlib.runner import ScheduleUnit
+from tests.helpers import CacheTestCase
+
+
+class TestRecordRun(CacheTestCase):
+    class _Sample(unittest.TestCase):
+        def test_ok(self):
+            pass
+
+        def test_fails(self):
+            self.fail()
+
+        def test_sub(self):
+            for i in range(2):
+                with self.subTest(i=i):
+                    self.assertEqual(i, 0)
+
+    class _BrokenFixture(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            raise RuntimeError("broken")
+
+        def test_never_runs(self):
+            pass
+
+    def test_failed_names(self):
+        result = unittest.TestResult()
+        unittest.TestSuite([unittest.defaultTestLoader.loadTestsFromTestCase(cls)
+                            for cls in (self._Sample, self._BrokenFixture)]).run(result)
+        prefix = f'{__name__}.TestRecordRun'
+        self.assertEqual(failed_names(result), {
+            f'{prefix}._Sample.test_fails', f'{prefix}._Sample.test_sub', f'{prefix}._BrokenFixture',
+        })
+
+    def test_failed_names_include_discarded_failures(self):
+        result = unittest.TestResult()
+        result.flaky, result.quarantined = ['t.T.test_flaky'], ['t.T.test_quarantined']
+        self.assertEqual(failed_names(result), {'t.T.test_flaky', 't.T.test_quarantined'})
+
+    def test_keeps_last_events(self):
+        for _ in range(7):
+            record_run({'t1'}, {'a.py'})
+        record_run(set())
+        stats = cache.load_failures()
+        self.assertEqual(stats['run'], 8)
+        self.assertEqual(stats['failures']['t1'], [3, 4, 5, 6, 7])
+        self.assertEqual(stats['changes']['a.py'], [3, 4, 5, 6, 7])
+
+    def test_old_entries_dropped(self):
+        record_run({'t1'})
+        cache.save_failures({**cache.load_failures(), 'run': 200})
+        record_run({'t2'})
+        self.assertEqual(set(cache.load_failures()['failures']), {'t2'})
+
+
+# test module -> direct imports
+IMPORTS = {'test_a': {'core'}, 'test_b': {'helpers'}, 'helpers': {'core'}, 'test_c': set()}
+ALL_IMPORTS = {'test_a': {'core'}, 'test_b': {'helpers', 'core'}, 'helpers': {'core'},
+               'test_c': set(), 'core': set()}
+FILEPATHS = {name: f'src/{name}.py' for name in ALL_IMPORTS}
+
+
+class TestFailureFirst(CacheTestCase):
+    def _units(self):
+        units = []
+        for name in ('c', 'b', 'a'):
+            cls = type(f'T{name}', (unittest.TestCase,), {'__module__': f'test_{name}', 'test_it': lambda self: None})
+            units.append(ScheduleUnit(f'test_{name}', [cls('test_it')], 0.0))
+        return units
+
+    def _order(self, modified=()):
+        units = failure_first(self._units(), set(modified), IMPORTS, ALL_IMPORTS, FILEPATHS)
+        return [unit.name for unit in units]
+
+    def test_ties_keep_order(self):
+        self.assertEqual(self._order(), ['test_c', 'test_b', 'test_a'])
+
+    def test_recent_failures_first(self):
+        record_run({'test_a.Ta.test_it'})
+        record_run({'test_b'})  # e.g. setUpModule failed
+        self.assertEqual(self._order(), ['test_b', 'test_a', 'test_c'])
+
+    def test_closer_to_changed_modules_first(self):
+        self.assertEqual(self._order(modified={'core'}), ['test_a', 'test_b', 'test_c'])
+        self.assertEqual(self._order(modified={'test_c'}), ['test_c', 'test_b', 'test_a'])
+
+    def test_churn_of_dependencies(self):
+        record_run(set(), {'src/helpers.py'})
+        self.assertEqual(self._order(), ['test_b', 'test_c', 'test_a'])
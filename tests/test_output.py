@@ -1,11 +1,17 @@
+import contextlib
+import gzip
 import subprocess
 import sys
+import tempfile
+import time
 import unittest
 from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
 from rich.console import Console
 from rich.text import Text
 from rutlib.output import _clean_traceback, _colorize_diff, _test_header
-from rutlib.output import RichTestResult, RichTestRunner
+from rutlib.output import ProgressRenderer, RichTestResult, RichTestRunner, _GroupedError
 
 
 class TestCleanTraceback(unittest.TestCase):
@@ -285,13 +291,144 @@ class TestDotMode(unittest.TestCase):
         self.assertIn('fake_other_module', output)
 
 
+class TestProgressRenderer(unittest.TestCase):
+    class _Pass(unittest.TestCase):
+        def test_pass(self):
+            pass
+
+    class _Fail(unittest.TestCase):
+        def test_fail(self):
+            self.fail("boom")
+
+    def test_renders_in_submission_order(self):
+        console = Console(file=StringIO(), width=80)
+        renderer = ProgressRenderer(console, interval=0.001)
+        renderer.start()
+        for i in range(100):
+            renderer.submit(console.print, i)
+        renderer.stop()
+        self.assertEqual(console.file.getvalue().split(), [str(i) for i in range(100)])
+
+    def test_stop_without_start_renders_queue(self):
+        console = Console(file=StringIO(), width=80)
+        renderer = ProgressRenderer(console)
+        renderer.submit(console.print, "queued")
+        renderer.stop()
+        self.assertIn("queued", console.file.getvalue())
+
+    def test_batch_written_in_one_print(self):
+        console = Console(file=StringIO(), width=80)
+        result = RichTestResult(console, buffer=False)
+        result._renderer = ProgressRenderer(console)
+        for _ in range(30):
+            result.addSuccess(self._Pass('test_pass'))
+        with patch.object(console, 'print', wraps=console.print) as print_:
+            result._renderer.stop()
+        self.assertEqual(print_.call_count, 1)
+        self.assertIn('.' * 30, console.file.getvalue())
+
+    def _render(self, threaded):
+        console = Console(file=StringIO(), width=40, force_terminal=True)
+        result = RichTestResult(console, buffer=False)
+        result._total_tests = 60
+        if threaded:
+            result._renderer = ProgressRenderer(console, interval=0.001)
+            result._renderer.start()
+        for i in range(30):
+            result.addSuccess(self._Pass('test_pass'))
+            if i % 7 == 0:
+                result.addFailure(self._Fail('test_fail'), (None, None, None))
+            else:
+                result.addSkip(self._Pass('test_pass'), "skip")
+        if threaded:
+            result._renderer.stop()
+        result._flush_dots()
+        return console.file.getvalue()
+
+    def test_threaded_output_identical_to_synchronous(self):
+        self.assertEqual(self._render(threaded=True), self._render(threaded=False))
+
+
+class TestLiveStatus(unittest.TestCase):
+    class _Pass(unittest.TestCase):
+        def test_pass(self):
+            pass
+
+    def _make_result(self):
+        console = Console(file=StringIO(), width=120, force_terminal=True)
+        result = RichTestResult(console, buffer=False)
+        return result, console
+
+    def test_status_line_counts_and_current_test(self):
+        result, _ = self._make_result()
+        test = self._Pass('test_pass')
+        result.startTest(test)
+        result.addSuccess(test)
+        result.addFailure(test, (None, None, None))
+        result._uptodate_modules = {'test_other': 4}
+        status = result._status_line().plain
+        self.assertIn('1 passed', status)
+        self.assertIn('1 failed', status)
+        self.assertIn('4 up-to-date', status)
+        self.assertIn('_Pass.test_pass', status)
+
+    def test_eta_from_expected_durations(self):
+        result, _ = self._make_result()
+        result._module_counts = {'mod_a': 2, 'mod_b': 3}
+        result._expected_durations = {'mod_a': 10.0, 'mod_b': 20.0}
+        result.module_durations = {'mod_a': 12.0}
+        self.assertAlmostEqual(result._eta(0), 20.0)
+
+    def test_eta_unknown_module_uses_rate_of_finished_modules(self):
+        result, _ = self._make_result()
+        result._module_counts = {'mod_a': 2, 'mod_b': 3}
+        result.module_durations = {'mod_a': 4.0}
+        self.assertAlmostEqual(result._eta(0), 6.0)
+
+    def test_eta_none_without_history(self):
+        result, _ = self._make_result()
+        result._module_counts = {'mod_a': 2}
+        self.assertIsNone(result._eta(0))
+
+    def test_module_durations_recorded(self):
+        result, _ = self._make_result()
+        test = self._Pass('test_pass')
+        result.startTest(test)
+        result.stopTest(test)
+        result._close_module_timer(time.perf_counter())
+        self.assertIn(test.__module__, result.module_durations)
+
+    def test_live_partial_line_printed_once_completed(self):
+        result, console = self._make_result()
+        result._start_live()
+        try:
+            result._write(Text("mod "), end="")
+            result._write(Text("."), end="")
+            self.assertEqual(result._partial.plain, "mod .")
+            result._write(Text(" [100%]"))
+            self.assertEqual(result._partial.plain, "")
+        finally:
+            result._stop_live()
+        self.assertEqual(console.file.getvalue().count("mod . [100%]"), 1)
+
+    def test_runner_live_final_output(self):
+        buf = StringIO()
+        runner = RichTestRunner(buffer=True, live=True, expected_durations={'x': 1.0})
+        runner.console.file.close()
+        runner.console = Console(file=buf, width=80, force_terminal=True)
+        runner.run(unittest.TestSuite([self._Pass('test_pass')]))
+        output = buf.getvalue()
+        self.assertIn('[100%]', output)
+        self.assertIn('1 passed', output)
+
+
 class TestFdCapturedOutput(unittest.TestCase):
     """Tests fd-capture through the real unittest lifecycle (buffer=True)."""
 
-    def _run_suite(self, *test_classes):
+    def _run_suite(self, *test_classes, **kwargs):
         """Run test classes through RichTestRunner with buffer=True, return result and output."""
         console_buf = StringIO()
-        runner = RichTestRunner(buffer=True)
+        runner = RichTestRunner(buffer=True, **kwargs)
         # Close the dup'd fd console before replacing it
         runner.console.file.close()
         runner.console = Console(file=console_buf, width=80, force_terminal=True)
@@ -351,6 +488,37 @@ class TestFdCapturedOutput(unittest.TestCase):
         self.assertIn('FROM_FAILING_TEST', output)
 
 
+    def test_large_output_truncated_and_saved(self):
+        class _Noisy(unittest.TestCase):
+            def test_it(self):
+                for i in range(1000):
+                    print(f"line {i}")
+                self.fail("boom")
+
+        mirrored = StringIO()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            captures = Path(tmpdir) / 'captures'
+            with patch('rutlib.output.CAPTURES_DIR', captures), \
+                    patch('rutlib.cache.CAPTURES_DIR', captures), \
+                    contextlib.redirect_stdout(mirrored):
+                result, output = self._run_suite(_Noisy, capture_limit=100)
+            saved = list(captures.iterdir())
+            self.assertEqual(len(saved), 1)
+            self.assertTrue(saved[0].name.endswith('.stdout.gz'))
+            with gzip.open(saved[0], 'rt') as f:
+                self.assertEqual(f.read().count('\n'), 1000)
+        self.assertEqual(len(result.failures), 1)
+        self.assertIn('characters truncated', result.failures[0][1])
+        self.assertIn('line 0', output)
+        self.assertIn('line 999', output)
+        self.assertNotIn('line 500', output)
+        # unittest echoes the output of failing tests, also bounded
+        echoed = mirrored.getvalue()
+        self.assertIn('line 999', echoed)
+        self.assertNotIn('line 500', echoed)
+        self.assertLess(len(echoed.replace(str(saved[0]), '')), 400)
+
+
 class TestUptodateModulesDisplay(unittest.TestCase):
     """Tests for up-to-date modules display in dot vs verbose mode."""
 
@@ -564,3 +732,79 @@ class TestShortTestSummary(unittest.TestCase):
         output = self._run_suite(_Fail1, _Fail2)
         self.assertIn('1 != 2', output)
         self.assertIn('3 != 4', output)
+
+
+def _broken_fixture():
+    raise ConnectionError("database is down")
+
+
+class TestFailureGroups(unittest.TestCase):
+    """Failures with the same root cause are rendered in full only up to a limit."""
+
+    def _run_suite(self, test_class, max_failures_per_group):
+        buf = StringIO()
+        runner = RichTestRunner(buffer=True, max_failures_per_group=max_failures_per_group)
+        runner.console.file.close()
+        runner.console = Console(file=buf, width=200, force_terminal=False)
+        suite = unittest.defaultTestLoader.loadTestsFromTestCase(test_class)
+        result = runner.run(suite)
+        return result, buf.getvalue()
+
+    @staticmethod
+    def _make_class(n):
+        def test(self):
+            _broken_fixture()
+        attrs = {f'test_{i:02}': test for i in range(n)}
+        attrs['test_other'] = lambda self: self.fail("unrelated")
+        return type('_Broken', (unittest.TestCase,), attrs)
+
+    def test_only_first_rendered(self):
+        result, output = self._run_suite(self._make_class(8), max_failures_per_group=2)
+        self.assertEqual(len(result.errors), 8)
+        self.assertEqual(output.count('ERROR'), 2)
+        self.assertIn('6 more failed with the same error as', output)
+        # all of them in the short summary
+        self.assertEqual(output.count('ConnectionError: database is down'), 2 + 8)
+        # unrelated failure still rendered
+        self.assertIn('AssertionError: unrelated', output)
+        self.assertEqual(sum(isinstance(err, _GroupedError) for _, err in result.errors), 6)
+
+    def test_unlimited(self):
+        _, output = self._run_suite(self._make_class(4), max_failures_per_group=0)
+        self.assertEqual(output.count('ERROR'), 4)
+        self.assertNotIn('more failed with the same error', output)
+
+    def test_same_message_different_origin_not_grouped(self):
+        class _Asserts(unittest.TestCase):
+            def test_a(self):
+                self.assertTrue(False)
+
+            def test_b(self):
+                self.assertTrue(False)
+
+        _, output = self._run_suite(_Asserts, max_failures_per_group=1)
+        self.assertEqual(output.count('FAIL'), 2)
+
+    def test_expected_failures_and_subtests(self):
+        class _Mixed(unittest.TestCase):
+            @unittest.expectedFailure
+            def test_a_expected(self):
+                _broken_fixture()
+
+            def test_b_subtests(self):
+                for i in range(2):
+                    with self.subTest(i=i):
+                        _broken_fixture()
+
+            def test_c(self):
+                _broken_fixture()
+
+        result, output = self._run_suite(_Mixed, max_failures_per_group=1)
+        self.assertEqual(len(result.expectedFailures), 1)
+        self.assertEqual(len(result.errors), 3)
+        # the expected failure takes no slot, the first sub-test failure is rendered
+        self.assertEqual(output.count('── ERROR ──'), 1)
+        self.assertNotIn('test_a_expected', output)
+        first = result.errors[0][0].id()
+        self.assertIn('(i=0)', first)
+        self.assertIn(f'2 more failed with the same error as {first}', output)
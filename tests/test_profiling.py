@@ -0,0 +1,67 @@
+import pstats
+import unittest
+from io import StringIO
+
+from rich.console import Console
+
+from rutlib import cache
+from rutlib.profiling import TestProfiler, profile_table
+from tests.helpers import CacheTestCase
+
+
+def _work():
+    return sum(i * i for i in range(1000))
+
+
+class _Sample(unittest.TestCase):
+    def test_a(self):
+        _work()
+
+    def test_b(self):
+        _work()
+
+
+class TestTestProfiler(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.profiles_dir = cache.PROFILES_DIR
+
+    def _run(self, profiler):
+        with profiler.running():
+            for name in ('test_a', 'test_b'):
+                test = _Sample(name)
+                profiler.start_test(test)
+                _work()
+                profiler.stop_test(test)
+        return profiler
+
+    def test_one_file_per_test(self):
+        profiler = self._run(TestProfiler())
+        files = sorted(path.name for path in self.profiles_dir.iterdir())
+        self.assertEqual(files, [f'{__name__}._Sample.test_a.pstats',
+                                 f'{__name__}._Sample.test_b.pstats'])
+        stats = pstats.Stats(str(self.profiles_dir / files[0]))
+        self.assertIn('_work', {func[2] for func in stats.stats})
+        self.assertEqual(profiler.files, 2)
+
+    def test_one_file_per_module(self):
+        self._run(TestProfiler('module'))
+        files = [path.name for path in self.profiles_dir.iterdir()]
+        self.assertEqual(files, [f'{__name__}.pstats'])
+
+    def test_previous_profiles_removed(self):
+        self.profiles_dir.mkdir()
+        (self.profiles_dir / 'old.pstats').write_text('')
+        self._run(TestProfiler('module'))
+        self.assertFalse((self.profiles_dir / 'old.pstats').exists())
+
+    def test_combined_table(self):
+        profiler = self._run(TestProfiler())
+        console = Console(file=StringIO(), width=200)
+        console.print(profile_table(profiler))
+        output = console.file.getvalue()
+        self.assertIn('2 profiles', output)
+        self.assertIn('test_profiling.py', output)
+        # calls to _work from both tests are combined
+        work_stats = [s for func, s in profiler.combined.stats.items() if func[2] == '_work']
+        self.assertEqual(work_stats[0][1], 2)
@@ -0,0 +1,205 @@
+import contextlib
+import json
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ET
+from io import StringIO
+
+from rich.console import Console
+
+from rutlib.output import RichTestRunner
+from rutlib.reporters import JsonlReporter, JUnitXmlReporter, summary
+
+PASSED = {'id': 'tests.test_a.TestA.test_ok', 'module': 'tests.test_a',
+          'outcome': 'passed', 'duration': 0.5}
+FAILED = {'id': 'tests.test_a.TestA.test_bad', 'module': 'tests.test_a',
+          'outcome': 'failed', 'duration': 0.25, 'exception': 'AssertionError',
+          'message': '1 != 2', 'traceback': 'Traceback...\nAssertionError: 1 != 2',
+          'stdout': 'printed <here>\x1b[0m\n', 'stderr': ''}
+WARNING = {'category': 'RuntimeWarning', 'message': 'overflow <x>', 'filename': 'src/a.py',
+           'lineno': 3, 'count': 1000, 'tests': ['tests.test_a.TestA.test_ok']}
+SKIPPED = {'id': 'tests.test_a.TestA.test_skip', 'module': 'tests.test_a',
+           'outcome': 'skipped', 'duration': 0.0, 'message': 'not now'}
+
+
+class ReportTestCase(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.tmpdir = tmpdir.name
+
+
+class TestJsonlReporter(ReportTestCase):
+    def test_events_written_as_they_come(self):
+        path = os.path.join(self.tmpdir, 'report.jsonl')
+        reporter = JsonlReporter(path)
+        self.addCleanup(reporter._file.close)
+        reporter.add(PASSED)
+        reporter.add(FAILED)
+        with open(path) as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([e['event'] for e in events], ['test', 'test'])
+        self.assertEqual(events[1]['stdout'], FAILED['stdout'])
+
+    def test_close_writes_summary(self):
+        path = os.path.join(self.tmpdir, 'report.jsonl')
+        reporter = JsonlReporter(path)
+        reporter.add(PASSED)
+        reporter.close({'tests': 1, 'successful': True})
+        with open(path) as f:
+            last = json.loads(f.readlines()[-1])
+        self.assertEqual(last, {'event': 'summary', 'tests': 1, 'successful': True})
+
+    def test_close_writes_warnings(self):
+        path = os.path.join(self.tmpdir, 'report.jsonl')
+        reporter = JsonlReporter(path)
+        reporter.close({'tests': 1}, warnings=[WARNING])
+        with open(path) as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual([e['event'] for e in events], ['warning', 'summary'])
+        self.assertEqual(events[0]['tests'], WARNING['tests'])
+
+
+class TestJUnitXmlReporter(ReportTestCase):
+    def test_partial_report_is_valid(self):
+        path = os.path.join(self.tmpdir, 'report.xml')
+        reporter = JUnitXmlReporter(path)
+        self.addCleanup(reporter._file.close)
+        reporter.add(PASSED)
+        reporter.add(FAILED)
+        # not closed, e.g. the run was killed
+        suite = ET.parse(path).getroot().find('testsuite')
+        self.assertEqual(suite.get('tests'), '2')
+        self.assertEqual(suite.get('failures'), '1')
+        self.assertEqual(suite.get('time'), '0.750')
+        cases = suite.findall('testcase')
+        self.assertEqual(cases[0].get('classname'), 'tests.test_a.TestA')
+        self.assertEqual(cases[0].get('name'), 'test_ok')
+        failure = cases[1].find('failure')
+        self.assertEqual(failure.get('type'), 'AssertionError')
+        self.assertEqual(failure.get('message'), '1 != 2')
+        self.assertEqual(cases[1].find('system-out').text, 'printed <here>�[0m\n')
+        self.assertIsNone(cases[1].find('system-err'))
+
+    def test_closed_report(self):
+        path = os.path.join(self.tmpdir, 'report.xml')
+        reporter = JUnitXmlReporter(path)
+        reporter.add(SKIPPED)
+        reporter.add(PASSED)
+        reporter.close()
+        root = ET.parse(path).getroot()
+        suite = root.find('testsuite')
+        self.assertEqual(suite.get('skipped'), '1')
+        self.assertEqual(suite.find('testcase/skipped').get('message'), 'not now')
+        self.assertEqual(len(suite.findall('testcase')), 2)
+
+    def test_warnings_in_system_err(self):
+        path = os.path.join(self.tmpdir, 'report.xml')
+        reporter = JUnitXmlReporter(path)
+        reporter.add(PASSED)
+        reporter.close(warnings=[WARNING])
+        suite = ET.parse(path).getroot().find('testsuite')
+        self.assertEqual(suite.find('system-err').text,
+                         "src/a.py:3: RuntimeWarning: overflow <x> (x1000)")
+
+    def test_subtest_name(self):
+        path = os.path.join(self.tmpdir, 'report.xml')
+        reporter = JUnitXmlReporter(path)
+        reporter.add({**FAILED, 'id': 'tests.test_a.TestA.test_x (i=1.5)'})
+        reporter.close()
+        case = ET.parse(path).getroot().find('testsuite/testcase')
+        self.assertEqual(case.get('classname'), 'tests.test_a.TestA')
+        self.assertEqual(case.get('name'), 'test_x (i=1.5)')
+
+    def test_fixture_error_name(self):
+        path = os.path.join(self.tmpdir, 'report.xml')
+        reporter = JUnitXmlReporter(path)
+        reporter.add({**FAILED, 'id': 'setUpClass (tests.test_a.TestA)', 'outcome': 'error'})
+        reporter.add({**FAILED, 'id': 'tearDownModule (tests.test_a)', 'outcome': 'error'})
+        reporter.close()
+        cases = ET.parse(path).getroot().findall('testsuite/testcase')
+        self.assertEqual([(c.get('classname'), c.get('name')) for c in cases],
+                         [('tests.test_a.TestA', 'setUpClass'), ('tests.test_a', 'tearDownModule')])
+
+
+class _Recorder:
+    def __init__(self):
+        self.events = []
+
+    def add(self, event):
+        self.events.append(event)
+
+
+class TestResultEvents(unittest.TestCase):
+    """Events sent by RichTestResult through a real run."""
+
+    def _run(self, test_class):
+        recorder = _Recorder()
+        runner = RichTestRunner(buffer=True, reporters=[recorder])
+        runner.console.file.close()
+        runner.console = Console(file=StringIO(), width=80)
+        suite = unittest.defaultTestLoader.loadTestsFromTestCase(test_class)
+        with contextlib.redirect_stdout(StringIO()):  # unittest echoes failing output
+            result = runner.run(suite)
+        return result, {e['id'].rsplit('.', 1)[-1]: e for e in recorder.events}
+
+    def test_outcomes(self):
+        class _Sample(unittest.TestCase):
+            def test_error(self):
+                raise ValueError("bad value")
+
+            def test_fail(self):
+                print("some output")
+                self.assertEqual(1, 2)
+
+            def test_pass(self):
+                pass
+
+            @unittest.skip("not now")
+            def test_skip(self):
+                pass
+
+            def test_subtests(self):
+                for i in range(2):
+                    with self.subTest(i=i):
+                        self.assertEqual(i, 0)
+
+            @unittest.expectedFailure
+            def test_xfail(self):
+                self.fail()
+
+        result, events = self._run(_Sample)
+        self.assertEqual(events['test_pass']['outcome'], 'passed')
+        self.assertEqual(events['test_pass']['module'], _Sample.__module__)
+        self.assertGreaterEqual(events['test_pass']['duration'], 0)
+        self.assertEqual(events['test_skip']['outcome'], 'skipped')
+        self.assertEqual(events['test_skip']['message'], 'not now')
+        self.assertEqual(events['test_xfail']['outcome'], 'expected_failure')
+        fail = events['test_fail']
+        self.assertEqual(fail['outcome'], 'failed')
+        self.assertEqual(fail['exception'], 'AssertionError')
+        self.assertEqual(fail['message'], '1 != 2')
+        self.assertIn('some output', fail['stdout'])
+        self.assertIn('Traceback', fail['traceback'])
+        error = events['test_error']
+        self.assertEqual(error['outcome'], 'error')
+        self.assertEqual(error['message'], 'bad value')
+        self.assertEqual(events['test_subtests (i=1)']['outcome'], 'failed')
+        self.assertEqual(summary(result)['tests'], 6)
+        self.assertFalse(summary(result)['successful'])
+
+    def test_failing_set_up_class(self):
+        class _Sample(unittest.TestCase):
+            @classmethod
+            def setUpClass(cls):
+                raise ValueError("no fixture")
+
+            def test_pass(self):
+                pass
+
+        _, events = self._run(_Sample)
+        [event] = events.values()  # test_pass did not run
+        self.assertEqual(event['outcome'], 'error')
+        self.assertEqual(event['module'], _Sample.__module__)
+        self.assertEqual(event['message'], 'no fixture')
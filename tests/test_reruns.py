@@ -0,0 +1,186 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from rich.console import Console
+
+from rutlib import cache, isolated, reruns
+from rutlib.output import RichTestRunner
+from rutlib.runner import RutRunner, StreamingSuite
+from rutlib.watchdog import Watchdog
+from tests.helpers import CacheTestCase
+
+
+class TestReruns(CacheTestCase):
+    class _Sample(unittest.TestCase):
+        runs = 0
+
+        def test_flaky(self):
+            type(self).runs += 1
+            self.assertGreater(type(self).runs, 1)
+
+        def test_broken(self):
+            for i in range(2):
+                with self.subTest(i=i):
+                    self.assertEqual(i, 0)
+
+        def test_ok(self):
+            pass
+
+    class _BrokenFixture(unittest.TestCase):
+        @classmethod
+        def setUpClass(cls):
+            raise RuntimeError("broken")
+
+        def test_never_runs(self):
+            pass
+
+    class _Hangs(unittest.TestCase):
+        rut_timeout = 0.2
+
+        def test_hangs(self):
+            threading.Event().wait(10)
+
+    def setUp(self):
+        super().setUp()
+        self._Sample.runs = 0
+        self.result = unittest.TestResult()
+        unittest.TestSuite([unittest.defaultTestLoader.loadTestsFromTestCase(cls)
+                            for cls in (self._Sample, self._BrokenFixture)]).run(self.result)
+        self.prefix = f'{__name__}.TestReruns._Sample'
+
+    def test_failed_ids(self):
+        self.assertEqual(reruns.failed_ids(self.result), [f'{self.prefix}.test_broken', f'{self.prefix}.test_flaky'])
+
+    def test_rerun_in_process(self):
+        flaky, failing = reruns.rerun(reruns.failed_ids(self.result), 3)
+        self.assertEqual(flaky, [f'{self.prefix}.test_flaky'])
+        self.assertEqual(failing, [f'{self.prefix}.test_broken'])
+
+    def test_rerun_in_process_within_budgets(self):
+        watchdog = Watchdog(interval=0.02)
+        start = time.perf_counter()
+        for _ in range(2):  # the watchdog is started again for each run
+            with watchdog.running():
+                self.assertEqual(reruns.run_in_process([f'{__name__}.TestReruns._Hangs.test_hangs'],
+                                                       [watchdog]), set())
+        self.assertLess(time.perf_counter() - start, 5)
+        self.assertEqual(len(watchdog.exceeded), 2)
+
+    def test_rerun_stops_when_all_pass(self):
+        calls = []
+
+        def run(test_ids):
+            calls.append(test_ids)
+            return set(test_ids[:1])
+        self.assertEqual(reruns.rerun(['a', 'b'], 5, run), (['a', 'b'], []))
+        self.assertEqual(calls, [['a', 'b'], ['b']])
+
+    def test_discard_failures(self):
+        reruns.discard_failures(self.result, [f'{self.prefix}.test_broken', f'{self.prefix}.test_flaky'])
+        self.assertEqual(self.result.failures, [])
+        self.assertEqual(len(self.result.errors), 1)  # setUpClass error
+
+    def test_quarantine(self):
+        test_id = f'{self.prefix}.test_broken'
+        self.assertTrue(reruns.is_quarantined(test_id, [test_id]))
+        self.assertTrue(reruns.is_quarantined(test_id, [self.prefix]))
+        self.assertFalse(reruns.is_quarantined(test_id, [self.prefix[:-1]]))
+
+    def test_flake_statistics(self):
+        reruns.record_flakes(['t1'], ['t2'])
+        reruns.record_flakes([], ['t1'])
+        stats = cache.load_flakes()
+        self.assertEqual((stats['t1']['flaky'], stats['t1']['failed']), (1, 1))
+        self.assertIn("flaky in 1 of 2 failing runs", reruns.summary(['t1'], []))
+
+
+class TestRerunsInRun(CacheTestCase):
+    """Reruns happen before the failures and the summary are printed."""
+
+    class _Flaky(unittest.TestCase):
+        runs = 0
+
+        def test_flaky(self):
+            type(self).runs += 1
+            self.assertGreater(self.runs, 1)
+
+        def test_pass(self):
+            pass
+
+    def setUp(self):
+        super().setUp()
+        self._Flaky.runs = 0
+
+    def _run(self, runner_class=None):
+        runner = RutRunner('tests', None, False, False, [], reruns=2)
+        runner.uptodate_modules = {}
+        suite = StreamingSuite(unittest.defaultTestLoader.loadTestsFromTestCase(self._Flaky))
+        with patch('sys.stdout', new_callable=StringIO) as stdout, \
+                patch('sys.stderr', new_callable=StringIO) as stderr:
+            result = runner.run_tests(suite, runner_class=runner_class)
+        return result, stdout.getvalue(), stderr.getvalue()
+
+    def test_summary(self):
+        output = StringIO()
+
+        class _Runner(RichTestRunner):
+            def __init__(self, **kwargs):
+                super().__init__(**kwargs)
+                self.console.file.close()
+                self.console = Console(file=output, width=120)
+
+        result, stdout, _ = self._run(_Runner)
+        self.assertTrue(result.wasSuccessful())
+        self.assertIn("1 flaky tests passed on rerun", stdout)
+        self.assertNotIn("FAIL", output.getvalue())
+        self.assertIn("1 passed, 1 flaky", output.getvalue())
+
+    def test_plain_summary(self):
+        result, stdout, stderr = self._run()
+        self.assertTrue(result.wasSuccessful())
+        self.assertIn("1 flaky tests passed on rerun", stdout)
+        self.assertNotIn("FAIL:", stderr)
+        self.assertTrue(stderr.rstrip().endswith("OK"), stderr)
+
+
+class TestIsolated(unittest.TestCase):
+    def test_run_in_new_process(self):
+        project = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, project, ignore_errors=True)
+        (project / 'tests').mkdir()
+        (project / 'pyproject.toml').write_text('[tool.rut]\nsource_dirs = ["tests"]\n')
+        (project / 'tests' / 'test_p.py').write_text(
+            "import unittest\n"
+            "class T(unittest.TestCase):\n"
+            "    def test_ok(self): pass\n"
+            "    def test_bad(self):\n"
+            "        print('x' * 200_000)\n"  # over the capture limit: saved in the captures
+            "        self.fail()\n")
+        captures = project / cache.CAPTURES_DIR
+        captures.mkdir(parents=True)
+        (captures / 'saved.stdout').write_text('output of the run starting the process')
+        cwd = os.getcwd()
+        os.chdir(project)
+        self.addCleanup(os.chdir, cwd)
+        environ = {'PYTHONPATH': os.pathsep.join(filter(None, [str(Path(reruns.__file__).parents[1]),
+                                                              os.environ.get('PYTHONPATH')]))}
+        with patch.dict(os.environ, environ):
+            passed = isolated.run(['test_p.T.test_bad', 'test_p.T.test_ok'])
+        self.assertEqual(passed, {'test_p.T.test_ok'})
+        self.assertIsNone(isolated.run(['test_p.T.test_missing']))
+        self.assertEqual(isolated.command(['a.T.x', 'b.T.y']), 'rut --ids a.T.x,b.T.y')
+        self.assertTrue((captures / 'saved.stdout').exists())
+        saved = list(captures.glob('*test_bad*'))
+        self.assertTrue(saved)
+        for path in saved:
+            path.unlink()
+        with patch.dict(os.environ, environ):
+            self.assertEqual(isolated.run(['test_p.T.test_bad'], save_captures=False), set())
+        self.assertEqual([path.name for path in captures.iterdir()], ['saved.stdout'])
@@ -1,11 +1,16 @@
+import json
 import logging
 import os
 import sys
+import tempfile
+import types
 import unittest
 import warnings
+from io import StringIO
 from unittest.mock import patch
-from rutlib.runner import RutRunner, InvalidAsyncTestError, WarningCollector
-from rutlib.output import RichTestRunner
+from rutlib.runner import RutError, RutRunner, InvalidAsyncTestError, StreamingSuite, WarningCollector, session_resources_env
+from rich.console import Console
+from rutlib.output import ProgressRenderer, RichTestResult, RichTestRunner
 
 class TestWarningCollector(unittest.TestCase):
     def setUp(self):
@@ -16,10 +21,32 @@ class TestWarningCollector(unittest.TestCase):
 
     def test_collects_runtime_warnings(self):
         self.wc.setup([])
-        with patch.object(self.wc, 'collected', []):
+        with patch.object(self.wc, 'collected', {}):
             warnings.warn("This is a test warning", RuntimeWarning)
             self.assertEqual(len(self.wc.collected), 1)
-            self.assertIn("This is a test warning", self.wc.collected[0][0])
+            self.assertIn("This is a test warning", self.wc.events()[0]['message'])
+
+    def test_aggregates_occurrences(self):
+        wc = WarningCollector(categories=[DeprecationWarning], max_warnings=2)
+        shown = []
+        with warnings.catch_warnings():
+            warnings.showwarning = lambda *args: shown.append(args)
+            wc.setup([])
+            for test_id in ('t1', 't2', 't3', 't4'):
+                wc.start_test(types.SimpleNamespace(id=lambda test_id=test_id: test_id))
+                for _ in range(2):
+                    warnings.warn("old api", DeprecationWarning)
+                wc.stop_test(None)
+            warnings.warn("other", DeprecationWarning)
+            warnings.warn("dropped", DeprecationWarning)
+            warnings.warn("not collected", RuntimeWarning)
+        events = wc.events()
+        self.assertEqual([(e['message'], e['count']) for e in events], [("old api", 8), ("other", 1)])
+        self.assertEqual(events[0]['tests'], ['t1', 't2', 't3'])
+        self.assertEqual(events[1]['tests'], [])
+        self.assertEqual(wc.dropped, 1)
+        # first occurrences only, and warnings not collected
+        self.assertEqual([str(args[0]) for args in shown], ["old api", "other", "not collected"])
 
     def test_by_default_warning_no_raise(self):
         with warnings.catch_warnings():
@@ -184,6 +211,93 @@ class TestRunnerHooks(unittest.TestCase):
         self.assertTrue(result.wasSuccessful())
 
 
+class TestSessionResources(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.dict(os.environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.env = session_resources_env('tests')
+        os.environ.pop(self.env, None)
+        self.calls = []
+        self.runner = RutRunner(test_dir='tests', keyword=None, failfast=False, capture=False, warning_filters=[])
+        self.runner.conftest = types.SimpleNamespace(
+            rut_session_setup=lambda: self.calls.append('setup'),
+            rut_session_resources=lambda: {'db': 'sqlite:///tmp/db'},
+            rut_worker_setup=lambda resources: self.calls.append(('worker', resources)),
+            rut_session_teardown=lambda: self.calls.append('teardown'),
+        )
+
+    def test_resources_created_once_and_inherited(self):
+        self.runner._start_session()
+        self.assertEqual(json.loads(os.environ[self.env]), {'db': 'sqlite:///tmp/db'})
+        # A process started by the run only gets the worker setup
+        child = RutRunner(test_dir='tests', keyword=None, failfast=False, capture=False, warning_filters=[])
+        child.conftest = self.runner.conftest
+        child._start_session()
+        child._end_session()
+        self.runner._end_session()
+        self.assertNotIn(self.env, os.environ)
+        worker = ('worker', {'db': 'sqlite:///tmp/db'})
+        self.assertEqual(self.calls, ['setup', worker, worker, 'teardown'])
+
+    def test_resources_must_be_serializable(self):
+        self.runner.conftest.rut_session_resources = lambda: {'db': object()}
+        with self.assertRaisesRegex(RutError, 'JSON serializable'):
+            self.runner._start_session()
+        self.assertEqual(self.calls, ['setup', 'teardown'])
+
+    def test_teardown_when_worker_setup_raises(self):
+        def worker_setup(resources):
+            raise RuntimeError("no database")
+        self.runner.conftest.rut_worker_setup = worker_setup
+        with self.assertRaisesRegex(RuntimeError, 'no database'):
+            self.runner._start_session()
+        self.assertEqual(self.calls, ['setup', 'teardown'])
+        self.assertNotIn(self.env, os.environ)
+
+    def test_other_test_dir_does_not_inherit(self):
+        self.runner._start_session()
+        other = RutRunner(test_dir='tests/samples', keyword=None, failfast=False, capture=False, warning_filters=[])
+        other.conftest = self.runner.conftest
+        other._start_session()
+        other._end_session()
+        self.runner._end_session()
+        worker = ('worker', {'db': 'sqlite:///tmp/db'})
+        self.assertEqual(self.calls, ['setup', worker, 'setup', worker, 'teardown', 'teardown'])
+
+
+class TestPlainRunner(unittest.TestCase):
+    """--no-color runs use unittest's TextTestRunner, with the same reports and durations."""
+
+    class _Sample(unittest.TestCase):
+        def test_pass(self):
+            pass
+
+        def test_fail(self):
+            print("output of failing test")
+            self.fail("boom")
+
+    def test_reports_and_durations(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'report.jsonl')
+            runner = RutRunner('tests', None, False, False, [], report_jsonl=path)
+            runner.uptodate_modules = {}
+            suite = StreamingSuite(unittest.defaultTestLoader.loadTestsFromTestCase(self._Sample))
+            with patch('sys.stderr', new_callable=StringIO):
+                result = runner.run_tests(suite)
+            with open(path, encoding='utf-8') as f:
+                events = [json.loads(line) for line in f]
+        prefix = f'{__name__}.TestPlainRunner._Sample'
+        self.assertEqual([(e['event'], e.get('id'), e.get('outcome')) for e in events], [
+            ('test', f'{prefix}.test_fail', 'failed'),
+            ('test', f'{prefix}.test_pass', 'passed'),
+            ('summary', None, None),
+        ])
+        self.assertIn("output of failing test", events[0]['stdout'])
+        self.assertEqual(list(result.test_durations), [f'{prefix}.test_pass'])
+        self.assertEqual(list(result.module_durations), [__name__])
+
+
 class TestLoggingCapture(unittest.TestCase):
     def setUp(self):
         self.original_handlers = logging.root.handlers[:]
@@ -254,3 +368,145 @@ class TestTopologicalSorting(unittest.TestCase):
             'test_middle',
             'test_apple',
         ])
+
+
+class TestScheduleUnits(unittest.TestCase):
+    class _Mixin:
+        def test_shared(self):
+            pass
+
+    class _First(_Mixin, unittest.TestCase):
+        def test_first(self):
+            pass
+
+    class _Second(_Mixin, unittest.TestCase):
+        def test_second(self):
+            pass
+
+    def _sort(self, costs):
+        runner = RutRunner('tests', None, False, False, [], alpha=True)
+        suite = unittest.TestSuite(unittest.defaultTestLoader.loadTestsFromTestCase(cls)
+                                   for cls in (self._First, self._Second))
+        with patch('rutlib.runner.load_fixture_costs', return_value=costs):
+            suite = runner.sort_tests(suite)
+        return runner, list(suite)
+
+    def test_classes_are_not_interleaved(self):
+        # test_shared, defined first, is shared by both classes
+        _, tests = self._sort({})
+        self.assertEqual([(type(t).__name__, t._testMethodName) for t in tests], [
+            ('_First', 'test_shared'), ('_First', 'test_first'),
+            ('_Second', 'test_shared'), ('_Second', 'test_second'),
+        ])
+
+    def test_cheap_module_split_at_class_level(self):
+        first = f'{__name__}.TestScheduleUnits._First'
+        runner, _ = self._sort({first: 20.0})
+        self.assertEqual([(u.name, len(u.tests), u.fixture_cost) for u in runner.schedule_units], [
+            (first, 2, 20.0), (f'{__name__}.TestScheduleUnits._Second', 2, 0.0),
+        ])
+
+    def test_expensive_module_is_one_unit(self):
+        runner, _ = self._sort({__name__: 5.0})
+        self.assertEqual([(u.name, len(u.tests), u.fixture_cost) for u in runner.schedule_units],
+                         [(__name__, 4, 5.0)])
+
+
+class TestStreamingSuite(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.names = [f'rut_streaming_{c}' for c in 'abcd']
+        for name in self.names:
+            module = types.ModuleType(name)
+            module.setUpModule = lambda name=name: self.events.append(('setUp', name))
+            module.tearDownModule = lambda name=name: self.events.append(('tearDown', name))
+            module.Test = type('Test', (unittest.TestCase,), {
+                '__module__': name,
+                'test_one': lambda test: self.events.append(('test', test.id())),
+                'test_two': lambda test: None,
+            })
+            sys.modules[name] = module
+        self.addCleanup(lambda: [sys.modules.pop(name, None) for name in self.names])
+
+    def _suite(self, evict_modules=False):
+        loader = unittest.TestLoader()
+        return StreamingSuite(
+            (loader.loadTestsFromTestCase(sys.modules[name].Test) for name in self.names),
+            evict_modules=evict_modules)
+
+    def test_instances_created_on_iteration(self):
+        suite = self._suite()
+        self.assertEqual(suite.countTestCases(), 8)
+        first = list(suite)
+        second = list(suite)
+        self.assertEqual([t.id() for t in first], [t.id() for t in second])
+        self.assertIsNot(first[0], second[0])
+
+    def test_run_releases_plan(self):
+        suite = self._suite()
+        result = unittest.TestResult()
+        suite.run(result)
+        self.assertEqual(result.testsRun, 8)
+        self.assertEqual(list(suite), [])
+        self.assertEqual(suite.countTestCases(), 8)
+
+    def test_evict_modules(self):
+        suite = self._suite(evict_modules=True)
+        # iterating outside of run() does not evict
+        list(suite)
+        self.assertTrue(all(name in sys.modules for name in self.names))
+        result = unittest.TestResult()
+        suite.run(result)
+        self.assertTrue(result.wasSuccessful())
+        # every module was torn down, even if evicted
+        self.assertEqual([e for e in self.events if e[0] == 'tearDown'],
+                         [('tearDown', name) for name in self.names])
+        self.assertEqual([name in sys.modules for name in self.names],
+                         [False, False, True, True])
+
+    def test_interleaved_module_not_evicted(self):
+        # --failure-first may run a module's classes apart
+        state = {}
+        first = sys.modules[self.names[0]]
+        first.setUpModule = lambda: state.update(ready=True)
+        first.tearDownModule = lambda: state.update(ready=False)
+        first.Later = type('Later', (unittest.TestCase,), {
+            '__module__': first.__name__,
+            'test_ready': lambda test: test.assertTrue(state['ready']),
+        })
+        loader = unittest.TestLoader()
+        classes = [sys.modules[name].Test for name in self.names] + [first.Later]
+        suite = StreamingSuite((loader.loadTestsFromTestCase(cls) for cls in classes), evict_modules=True)
+        result = unittest.TestResult()
+        suite.run(result)
+        self.assertTrue(result.wasSuccessful(), result.failures)
+        self.assertEqual(result.testsRun, 9)
+        self.assertEqual([name in sys.modules for name in self.names],
+                         [True, False, False, True])
+
+    def test_eviction_waits_for_rendering(self):
+        for name in self.names:
+            sys.modules[name].__file__ = os.path.abspath(f'{name}.py')
+        console = Console(file=StringIO(), width=80)
+        result = RichTestResult(console, buffer=False)
+        # Not started: progress output stays queued until stop()
+        result._renderer = ProgressRenderer(console)
+        self._suite(evict_modules=True).run(result)
+        self.assertTrue(all(name in sys.modules for name in self.names))
+        result._renderer.stop()
+        output = console.file.getvalue()
+        self.assertTrue(all(f'{name}.py' in output for name in self.names), output)
+        self.assertEqual([name in sys.modules for name in self.names],
+                         [False, False, True, True])
+
+    def test_custom_init_kept_as_instance(self):
+        class _Param(unittest.TestCase):
+            def __init__(self, value):
+                super().__init__('test_it')
+                self.value = value
+
+            def test_it(self):
+                pass
+
+        suite = StreamingSuite([_Param(1), _Param(2)])
+        self.assertEqual([t.value for t in suite], [1, 2])
@@ -0,0 +1,73 @@
+import re
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from rutlib.sampling import OUTSIDE_TESTS, SamplingProfiler
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        time.sleep(0.0005)
+
+
+class _Sample(unittest.TestCase):
+    def test_it(self):
+        pass
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = Path(tempfile.mkdtemp())
+        self.samples_dir = self.tmpdir / 'samples'
+        p = patch('rutlib.cache.SAMPLES_DIR', self.samples_dir)
+        p.start()
+        self.addCleanup(p.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_collapsed_stacks(self):
+        profiler = SamplingProfiler(interval=0.001)
+        test = _Sample('test_it')
+        with profiler.running():
+            _busy(0.03)
+            profiler.start_test(test)
+            _busy(0.05)
+            profiler.stop_test(test)
+        self.assertGreater(profiler.samples, 0)
+
+        lines = (self.samples_dir / 'run.collapsed').read_text().splitlines()
+        for line in lines:
+            self.assertRegex(line, r'^[^;]+(;[^;]+)* \d+$')
+        self.assertEqual(sum(int(line.rsplit(' ', 1)[1]) for line in lines), profiler.samples)
+        roots = {line.split(';', 1)[0] for line in lines}
+        self.assertEqual(roots, {OUTSIDE_TESTS, test.id()})
+        self.assertTrue(any('_busy (' in line for line in lines))
+
+        module_lines = (self.samples_dir / f'{__name__}.collapsed').read_text().splitlines()
+        self.assertTrue(module_lines)
+        self.assertTrue(all(line.startswith(test.id() + ';') for line in module_lines))
+
+    def test_internal_frames_omitted(self):
+        profiler = SamplingProfiler()
+        stack = profiler._stack(_frame_via_unittest())
+        self.assertFalse(any(re.search(r'unittest[/\\]', label) for label in stack))
+        self.assertTrue(stack[-1].startswith('_capture_frame ('))
+
+
+def _capture_frame():
+    import sys
+    return sys._getframe()
+
+
+def _frame_via_unittest():
+    # called through unittest's frames (case.py)
+    result = []
+    case = unittest.FunctionTestCase(lambda: result.append(_capture_frame()))
+    case.run(unittest.TestResult())
+    return result[0]
@@ -0,0 +1,152 @@
+import os
+import sys
+import tempfile
+import time
+import unittest
+import unittest.case
+import unittest.suite
+
+from rutlib.timing import PhaseTimer, format_phases
+
+
+def setUpModule():
+    pass
+
+
+class _Fixtures(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        time.sleep(0.01)
+
+    def setUp(self):
+        time.sleep(0.01)
+
+    def test_it(self):
+        time.sleep(0.02)
+
+    def tearDown(self):
+        self.addCleanup(time.sleep, 0.01)
+
+
+class _Other(unittest.TestCase):
+    def test_other(self):
+        pass
+
+
+class TestPhaseTimer(unittest.TestCase):
+    class _Failing(unittest.TestCase):
+        def test_fails(self):
+            self.assertEqual(1, 2)  # failing line
+
+        def test_subtests(self):
+            for i in range(2):
+                with self.subTest(i=i):
+                    time.sleep(0.01)
+
+    class _FailingSetUp(unittest.TestCase):
+        def setUp(self):
+            self.addCleanup(time.sleep, 0.01)
+            raise RuntimeError("setUp")
+
+        def test_it(self):
+            pass
+
+    def _run(self, *classes):
+        timer = PhaseTimer()
+        suite = unittest.TestSuite(
+            unittest.defaultTestLoader.loadTestsFromTestCase(cls) for cls in classes)
+        with timer.timing_run():
+            suite.run(unittest.TestResult())
+        return timer
+
+    def test_test_phases(self):
+        timer = self._run(_Fixtures)
+        phases = timer.items[('test', f'{__name__}._Fixtures.test_it')]
+        self.assertGreaterEqual(phases['setUp'], 0.01)
+        self.assertGreaterEqual(phases['call'], 0.02)
+        self.assertLess(phases['call'], 0.03)
+        # cleanups count as tear down
+        self.assertGreaterEqual(phases['tearDown'], 0.01)
+
+    def test_class_and_module_phases(self):
+        timer = self._run(_Fixtures, _Other)
+        class_phases = timer.items[('class', f'{__name__}._Fixtures')]
+        self.assertGreaterEqual(class_phases['setUpClass'], 0.01)
+        self.assertIn('tearDownClass', class_phases)
+        module_phases = timer.items[('module', __name__)]
+        self.assertEqual(set(module_phases), {'setUpModule', 'tearDownModule'})
+        # setUpModule is timed once for the module, not per test
+        self.assertLess(module_phases['setUpModule'], 0.01)
+
+    def test_nested_phases_are_exclusive(self):
+        timer = PhaseTimer()
+        timer._timed('module', 'a', 'setUpModule', lambda: (
+            time.sleep(0.01),
+            timer._timed('module', 'b', 'tearDownModule', time.sleep, 0.02)))
+        self.assertLess(timer.items[('module', 'a')]['setUpModule'], 0.02)
+        self.assertGreaterEqual(timer.items[('module', 'b')]['tearDownModule'], 0.02)
+
+    def test_fixture_costs(self):
+        timer = PhaseTimer()
+        suite = unittest.TestSuite(
+            unittest.defaultTestLoader.loadTestsFromTestCase(cls) for cls in (_Fixtures, _Other))
+        with timer.timing_fixtures():
+            suite.run(unittest.TestResult())
+        self.assertNotIn(('test', f'{__name__}._Fixtures.test_it'), timer.items)
+        costs = timer.fixture_costs()
+        self.assertGreaterEqual(costs[f'{__name__}._Fixtures'], 0.01)
+        self.assertLess(costs[__name__], 0.01)
+
+    def test_failure_traceback_shows_test_line(self):
+        timer = PhaseTimer()
+        result = unittest.TestResult()
+        with timer.timing_run():
+            unittest.defaultTestLoader.loadTestsFromTestCase(self._Failing).run(result)
+        [(_, text)] = result.failures
+        self.assertIn("self.assertEqual(1, 2)  # failing line", text)
+        self.assertNotIn("rutlib", text)
+        # sub-tests are part of the call
+        phases = timer.items[('test', f'{__name__}.TestPhaseTimer._Failing.test_subtests')]
+        self.assertGreaterEqual(phases['call'], 0.02)
+
+    def test_failing_setup(self):
+        timer = self._run(self._FailingSetUp)
+        phases = timer.items[('test', f'{__name__}.TestPhaseTimer._FailingSetUp.test_it')]
+        self.assertEqual(set(phases), {'setUp', 'tearDown'})
+        self.assertGreaterEqual(phases['tearDown'], 0.01)
+
+    def test_patches_restored(self):
+        original = unittest.suite.TestSuite._handleClassSetUp
+        original_executor = unittest.case._Outcome.testPartExecutor
+        self._run(_Other)
+        self.assertIs(unittest.suite.TestSuite._handleClassSetUp, original)
+        self.assertIs(unittest.case._Outcome.testPartExecutor, original_executor)
+
+    def test_import_time(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with open(os.path.join(tmpdir, 'test_slow_import.py'), 'w') as f:
+                f.write("import time\ntime.sleep(0.02)\n")
+            timer = PhaseTimer()
+            try:
+                with timer.timing_imports():
+                    unittest.TestLoader().discover(tmpdir, top_level_dir=tmpdir)
+            finally:
+                sys.modules.pop('test_slow_import', None)
+                sys.path.remove(tmpdir)
+        self.assertGreaterEqual(timer.items[('module', 'test_slow_import')]['import'], 0.02)
+
+    def test_slowest(self):
+        timer = PhaseTimer()
+        timer.items = {
+            ('test', 'a'): {'call': 0.1},
+            ('test', 'b'): {'setUp': 0.2, 'call': 0.3},
+            ('module', 'm'): {'import': 0.4},
+        }
+        self.assertEqual([row[2] for row in timer.slowest(2)], ['b', 'm'])
+        self.assertEqual(len(timer.slowest(0)), 3)
+
+
+class TestFormatPhases(unittest.TestCase):
+    def test_order_and_small_phases_omitted(self):
+        phases = {'call': 1.0, 'setUp': 0.25, 'tearDown': 0.0001}
+        self.assertEqual(format_phases(phases), 'setUp 0.250s, call 1.000s')
@@ -0,0 +1,108 @@
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+
+from rutlib.runner import RutRunner
+from rutlib.watchdog import BudgetExceededError, Watchdog
+
+
+class _MonitoredResult(unittest.TestResult):
+    def __init__(self, watchdog):
+        super().__init__()
+        self.watchdog = watchdog
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.watchdog.start_test(test)
+
+    def stopTest(self, test):
+        self.watchdog.stop_test(test)
+        super().stopTest(test)
+
+
+class TestWatchdog(unittest.TestCase):
+    class _Hangs(unittest.TestCase):
+        rut_timeout = 0.2
+
+        def test_hangs(self):
+            threading.Event().wait(10)
+
+        def test_passes(self):
+            pass
+
+    class _SetUpClassHangs(unittest.TestCase):
+        rut_timeout = 0.2
+
+        @classmethod
+        def setUpClass(cls):
+            threading.Event().wait(10)
+
+        def test_never_runs(self):
+            pass
+
+    class _Slow(unittest.TestCase):
+        def test_first(self):
+            time.sleep(0.2)
+
+        def test_second(self):
+            time.sleep(10)
+
+    def _run(self, watchdog, *tests):
+        result = _MonitoredResult(watchdog)
+        start = time.perf_counter()
+        with watchdog.running():
+            unittest.TestSuite(tests).run(result)
+        self.assertLess(time.perf_counter() - start, 5)
+        return result
+
+    def test_hanging_test_is_an_error_with_stacks(self):
+        watchdog = Watchdog(interval=0.02)
+        result = self._run(watchdog, self._Hangs('test_hangs'), self._Hangs('test_passes'))
+        self.assertEqual(result.testsRun, 2)
+        self.assertEqual(len(result.errors), 1)
+        test, err = result.errors[0]
+        self.assertEqual(test.id(), self._Hangs('test_hangs').id())
+        self.assertIn('BudgetExceededError', err)
+        self.assertIn("Thread 'MainThread'", err)
+        self.assertIn('in test_hangs', err)
+        self.assertTrue(err.strip().endswith('test_hangs exceeded its timeout of 0.2s'))
+        self.assertEqual(len(watchdog.exceeded), 1)
+
+    def test_hanging_class_fixture_is_an_error(self):
+        result = self._run(Watchdog(interval=0.02), self._SetUpClassHangs('test_never_runs'))
+        self.assertEqual(result.testsRun, 0)
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('setUpClass exceeded its timeout', result.errors[0][1])
+
+    def test_module_timeout(self):
+        watchdog = Watchdog(module_timeout=0.3, interval=0.02)
+        result = self._run(watchdog, self._Slow('test_first'), self._Slow('test_second'))
+        self.assertEqual([test._testMethodName for test, _ in result.errors], ['test_second'])
+        self.assertIn(f'module {__name__} exceeded its timeout of 0.3s', result.errors[0][1])
+
+    def test_memory_limit(self):
+        watchdog = Watchdog(memory_limit_mb=100, interval=0.02)
+        with mock.patch('rutlib.watchdog._rss', return_value=200 * 1024 * 1024):
+            result = self._run(watchdog, self._Slow('test_second'))
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('exceeded the memory limit of 100 MB (RSS 200 MB)', result.errors[0][1])
+
+    def test_class_attribute_overrides_default(self):
+        result = self._run(Watchdog(timeout=60, interval=0.02), self._Hangs('test_hangs'))
+        self.assertEqual(len(result.errors), 1)
+
+    def test_interrupt_only_with_pending_message(self):
+        watchdog = Watchdog()
+        frame = sys._getframe()  # called by unittest's _callTestMethod
+        watchdog._interrupt(None, frame)
+        watchdog._pending = "over budget"
+        with self.assertRaises(BudgetExceededError):
+            watchdog._interrupt(None, frame)
+        self.assertIsNone(watchdog._pending)
+
+    def test_runner_enables_watchdog_for_class_budgets(self):
+        suite = unittest.TestSuite([unittest.TestSuite([self._Slow('test_first'), self._Hangs('test_passes')])])
+        self.assertTrue(RutRunner._declares_budgets(suite))
+        self.assertFalse(RutRunner._declares_budgets(unittest.TestSuite([self._Slow('test_first')])))